@@ -11,62 +11,88 @@ from services.sensor_service import SHT31Sensor
 from services.relay_service import RelayService
 from services.log_reader_service import LogReaderService
 from services.indicator_service import IndicatorService
+from services.event_broadcaster import EventBroadcaster
 from config import Config
+import time
 
-app = Flask(__name__)
-CORS(app)
-
-# Initialize services using static defaults from Config.
-parameter_service = ParameterService("config.json")
-logging_service = LoggingService(Config.INITIAL_LOG_FILE)
-station_service = StationService(logging_service, Config)
-# Test lgpio with RelayService
-print("Initializing RelayService to test lgpio...")
-relay_service = RelayService()
-print("RelayService initialized successfully! lgpio is working.")
-sensor = SHT31Sensor()
-regulation_service = RegulationService(sensor, station_service, parameter_service, logging_service, relay_service)
-log_reader_service = LogReaderService(parameter_service)
+def create_app():
+    """
+    Baut die Anwendung mit allen Services. Nichts davon laeuft beim Import: die Prozesse
+    des parallelen Log-Scans ("spawn") importieren __main__ erneut und duerfen weder
+    GPIO noch LoggingService oder Regelung ein zweites Mal starten.
+    Gunicorn ruft die Factory auf ("app:create_app()").
+    """
+    app = Flask(__name__)
+    CORS(app)
 
+    # Initialize services using static defaults from Config.
+    parameter_service = ParameterService("config.json")
+    logging_service = LoggingService(Config.INITIAL_LOG_FILE, parameter_service.get_config().get("logging", {}))
+    station_service = StationService(logging_service, Config)
+    # Stationsdaten im Hintergrund aktualisieren; Regelung und API warten nie auf das Netz
+    station_service.start_refresher(parameter_service)
+    # Test lgpio with RelayService
+    print("Initializing RelayService to test lgpio...")
+    relay_service = RelayService()
+    print("RelayService initialized successfully! lgpio is working.")
+    sensor = SHT31Sensor()
+    regulation_service = RegulationService(sensor, station_service, parameter_service, logging_service, relay_service)
+    log_reader_service = LogReaderService(parameter_service, logging_service)
+    # Push-Stream (/api/stream) fuer Status- und Relaisaenderungen
+    event_broadcaster = EventBroadcaster(parameter_service.get_config().get("stream", {}))
+    regulation_service.set_broadcaster(event_broadcaster)
+    relay_service.set_broadcaster(event_broadcaster)
 
-# Start background services (e.g., regulation thread)
-regulation_service.start()
+    # Start background services (e.g., regulation thread)
+    regulation_service.start()
 
-# Initialize the new IndicatorService.
-indicator_service = IndicatorService()
-# Turn on the run LED to indicate that the system is powered and running.
-indicator_service.set_run_led(True)
+    # Initialize the new IndicatorService.
+    indicator_service = IndicatorService()
+    # Turn on the run LED to indicate that the system is powered and running.
+    indicator_service.set_run_led(True)
 
-# Dependency Injection: Store services in app.config for use in routes.
-app.config["PARAMETER_SERVICE"] = parameter_service
-app.config["LOGGING_SERVICE"] = logging_service
-app.config["STATION_SERVICE"] = station_service
-app.config["REGULATION_SERVICE"] = regulation_service
-app.config["RELAY_SERVICE"] = relay_service
-app.config["LOG_READER_SERVICE"] = log_reader_service
-app.config["INDICATOR_SERVICE"] = indicator_service
+    # Dependency Injection: Store services in app.config for use in routes.
+    app.config["PARAMETER_SERVICE"] = parameter_service
+    app.config["LOGGING_SERVICE"] = logging_service
+    app.config["STATION_SERVICE"] = station_service
+    app.config["REGULATION_SERVICE"] = regulation_service
+    app.config["RELAY_SERVICE"] = relay_service
+    app.config["LOG_READER_SERVICE"] = log_reader_service
+    app.config["INDICATOR_SERVICE"] = indicator_service
+    app.config["EVENT_BROADCASTER"] = event_broadcaster
+    app.config["COMPRESSION"] = parameter_service.get_config().get("compression", {})
 
+    # Test: Relais für 5 Sekunden einschalten, dann ausschalten
+    relay_service.turn_on(delay=0, auto=True)  # Sofort einschalten
+    time.sleep(5)
+    relay_service.turn_off(delay=0, auto=True)  # Nach 5 Sekunden ausschalten
 
-import time
+    # Register blueprints:
+    # The views blueprint serves HTML templates at root URLs.
+    app.register_blueprint(views_bp)
+    # The API blueprint serves JSON endpoints under /api.
+    app.register_blueprint(api_bp, url_prefix="/api")
+    return app
 
-# Test: Relais für 5 Sekunden einschalten, dann ausschalten
-relay_service.turn_on(delay=0, auto=True)  # Sofort einschalten
-time.sleep(5)
-relay_service.turn_off(delay=0, auto=True)  # Nach 5 Sekunden ausschalten
 
+def shutdown(app):
+    """
+    Stoppt die Hintergrund-Threads und gibt GPIO frei.
+    """
+    app.config["REGULATION_SERVICE"].stop()
+    app.config["EVENT_BROADCASTER"].close()
+    app.config["LOG_READER_SERVICE"].close()
+    app.config["STATION_SERVICE"].close()
+    app.config["LOGGING_SERVICE"].close()
+    app.config["RELAY_SERVICE"].cleanup()
+    app.config["INDICATOR_SERVICE"].cleanup()
 
-# Register blueprints:
-# The views blueprint serves HTML templates at root URLs.
-app.register_blueprint(views_bp);
-# The API blueprint serves JSON endpoints under /api.
-app.register_blueprint(api_bp, url_prefix="/api");
 
 if __name__ == "__main__":
+    app = create_app()
     try:
         app.run(host="0.0.0.0", port=5000, threaded=True)
     except KeyboardInterrupt:
         print("Shutting down...")
     finally:
-        regulation_service.stop()
-        relay_service.cleanup()
-        indicator_service.cleanup()
+        shutdown(app)
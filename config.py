@@ -2,4 +2,7 @@ class Config:
     HUMIDITY_URL = "https://data.geo.admin.ch/ch.meteoschweiz.messwerte-luftfeuchtigkeit-10min/ch.meteoschweiz.messwerte-luftfeuchtigkeit-10min_de.json"
     TEMPERATURE_URL = "https://data.geo.admin.ch/ch.meteoschweiz.messwerte-lufttemperatur-10min/ch.meteoschweiz.messwerte-lufttemperatur-10min_de.json"
     CACHE_EXPIRATION_SECONDS = 600  # Cache validity (10 minutes)
+    STATION_CACHE_FILE = "station_cache.json"  # Last good station snapshot, loaded on start (warm start)
+    STATION_CACHE_MAX_AGE = None  # Seconds; older snapshots are dropped on start. None: load any age as stale
+    STATION_PARSE_MODE = "selective"  # "selective": stream feeds, keep compact records; "full": response.json()
     INITIAL_LOG_FILE = "log.json"    # Used as the default on first start (factory reset)
\ No newline at end of file
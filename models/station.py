@@ -1,8 +1,32 @@
 # models/station.py
 class Station:
+    __slots__ = ("station_id", "name", "humidity", "temperature", "coordinates")
+
     def __init__(self, station_id, name, humidity, temperature, coordinates):
         self.station_id = station_id
         self.name = name
         self.humidity = humidity
         self.temperature = temperature
         self.coordinates = coordinates
+
+
+class FeedRecord:
+    """
+    Kompakter Messwert einer Station aus einem MeteoSwiss-Feed (Luftfeuchte oder Temperatur).
+    """
+    __slots__ = ("station_id", "name", "value", "coordinates")
+
+    def __init__(self, station_id, name, value, coordinates=None):
+        self.station_id = station_id
+        self.name = name
+        self.value = value
+        self.coordinates = coordinates
+
+    @classmethod
+    def from_feature(cls, feature, full=True):
+        """
+        Uebernimmt aus einem GeoJSON-Feature nur ID, Name und Wert; die Koordinaten nur mit full.
+        """
+        properties = feature["properties"]
+        coordinates = (feature.get("geometry") or {}).get("coordinates") if full else None
+        return cls(feature.get("id"), properties.get("station_name", "Unknown"), properties.get("value"), coordinates)
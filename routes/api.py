@@ -1,10 +1,122 @@
-from flask import Blueprint, jsonify, request, current_app
+from flask import Blueprint, jsonify, request, current_app, Response, stream_with_context
 from dateutil import parser as dateparser
-import json, os
+from collections import OrderedDict
+import json, os, time, gzip, threading
 
 api_bp = Blueprint("api", __name__)
 
+# ------------------- KOMPRESSION -------------------
+# Standardwerte; app.config["COMPRESSION"] (Abschnitt "compression" in config.json) überschreibt sie
+COMPRESSION_DEFAULTS = {
+    "enabled": True,
+    "min_size": 1024,      # kleinere Antworten lohnen den Aufwand nicht
+    "level": 4,            # gzip-Stufe; auf dem Pi kaum schlechter als 9, aber deutlich schneller
+    "cache_entries": 32,   # komprimierte Antworten mit ETag, die wiederverwendet werden
+}
+COMPRESSIBLE_MIMETYPES = ("application/json",)
+# Die gzip-Variante ist eine andere Darstellung und bekommt ein eigenes ETag ("<etag>-gzip")
+GZIP_ETAG_SUFFIX = "-gzip"
+_gzip_cache = OrderedDict()
+_gzip_lock = threading.Lock()
+
+@api_bp.after_request
+def _compress(response):
+    """
+    Komprimiert JSON-Antworten mit gzip, wenn der Client es akzeptiert. Antworten mit
+    ETag werden pro URL und ETag zwischengespeichert und nicht erneut komprimiert;
+    der komprimierte Körper trägt das ETag mit GZIP_ETAG_SUFFIX. Gestreamte Antworten (NDJSON, CSV, SSE) bleiben unverändert.
+    """
+    options = dict(COMPRESSION_DEFAULTS, **current_app.config.get("COMPRESSION", {}))
+    if (not options["enabled"] or response.status_code != 200 or response.direct_passthrough
+            or response.is_streamed or response.mimetype not in COMPRESSIBLE_MIMETYPES
+            or "Content-Encoding" in response.headers):
+        return response
+    response.vary.add("Accept-Encoding")
+    if not request.accept_encodings["gzip"] or response.content_length < options["min_size"]:
+        return response
+
+    etag, weak = response.get_etag()
+    key = (request.full_path, etag, options["level"]) if etag else None
+    with _gzip_lock:
+        body = _gzip_cache.get(key) if key else None
+        if body is not None:
+            _gzip_cache.move_to_end(key)
+    if body is None:
+        body = gzip.compress(response.get_data(), compresslevel=options["level"], mtime=0)
+        if key:
+            with _gzip_lock:
+                _gzip_cache[key] = body
+                while len(_gzip_cache) > options["cache_entries"]:
+                    _gzip_cache.popitem(last=False)
+    response.set_data(body)
+    response.headers["Content-Encoding"] = "gzip"
+    if etag:
+        response.set_etag(etag + GZIP_ETAG_SUFFIX, weak)
+    return response
+
+# ------------------- BEDINGTE GET-ANFRAGEN -------------------
+def _conditional(version, build):
+    """
+    Beantwortet eine bedingte GET-Anfrage. version ist (ETag-Kennung, Änderungszeitpunkt)
+    des zugrunde liegenden Zustands; passt If-None-Match bzw. If-Modified-Since, wird
+    304 geliefert, ohne build() aufzurufen (kein erneutes Lesen oder Serialisieren).
+    If-None-Match passt auf das ETag der unkomprimierten wie der gzip-Variante.
+    """
+    etag, last_modified = version
+    matched = etag
+    if request.if_none_match:
+        if request.if_none_match.contains(etag + GZIP_ETAG_SUFFIX):
+            matched = etag + GZIP_ETAG_SUFFIX
+        not_modified = request.if_none_match.contains(matched)
+    else:
+        since = request.if_modified_since
+        not_modified = bool(since and last_modified and int(last_modified) <= since.timestamp())
+    if not_modified:
+        # 304 mit dem ETag der Variante, die der Client hat
+        response = Response(status=304)
+        response.set_etag(matched)
+    else:
+        response = build()
+        response.set_etag(etag)
+    if last_modified:
+        response.last_modified = last_modified
+    # Browser sollen jedes Mal nachfragen, aber ihre Kopie mit dem ETag validieren
+    response.headers["Cache-Control"] = "no-cache"
+    return response
+
+def _since_arg():
+    """
+    Der Parameter since als float oder None; ein ungültiger Wert ist ein ValueError (400)
+    statt stillschweigend als fehlend zu gelten.
+    """
+    since = request.args.get("since")
+    if since is None:
+        return None
+    try:
+        return float(since)
+    except ValueError as e:
+        raise ValueError("Invalid since") from e
+
 # ------------------- STATUS ENDPOINT -------------------
+def _build_status(regulation_service, station_service, relay_state):
+    """
+    Ergänzt den Status des RegulationService um den tatsächlichen Relaiszustand
+    (im manuellen Modus) und den Namen der externen Station.
+    """
+    # Basisstatus aus der Regelungslogik
+    status = dict(regulation_service.get_status())
+
+    # Bei manuellem Modus im status regeln wir das Feld "regulation_state" 
+    # auf den echten Relaiszustand (relay_on/relay_off)
+    if status.get("regulation_state") in ["Hand", "Aus", "relay_off", "relay_on"]:
+        status["regulation_state"] = "relay_on" if relay_state["state"] else "relay_off"
+
+    # Zusätzlicher Komfort: Namen der externen Station holen, falls möglich
+    if status.get("api_station") and station_service:
+        station = station_service.get_station(status["api_station"])
+        status["api_station_name"] = station.name if station and station.name else status["api_station"]
+    return status
+
 @api_bp.route("/status", methods=["GET"])
 def get_status():
     """
@@ -18,23 +130,86 @@ def get_status():
         relay_service = current_app.config.get("RELAY_SERVICE")
         if regulation_service is None or relay_service is None:
             raise Exception("Required service not available")
+        return jsonify(_build_status(regulation_service, station_service, relay_service.get_state()))
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
 
-        # Basisstatus aus der Regelungslogik
-        status = regulation_service.get_status()
+# ------------------- SNAPSHOT ENDPOINT -------------------
+SNAPSHOT_SECTIONS = ("status", "relay", "config", "dashboard")
 
-        # Bei manuellem Modus im status regeln wir das Feld "regulation_state" 
-        # auf den echten Relaiszustand (relay_on/relay_off)
-        if status.get("regulation_state") in ["Hand", "Aus", "relay_off", "relay_on"]:
-            actual_state = relay_service.get_state()["state"]
-            status["regulation_state"] = "relay_on" if actual_state else "relay_off"
+@api_bp.route("/snapshot", methods=["GET"])
+def get_snapshot():
+    """
+    GET /api/snapshot?fields=status,relay,config,dashboard&since=...&limit=...
+    Fasst /api/status, /api/relay, /api/config und /api/dashboard in einer Antwort zusammen.
+    Der Relaiszustand wird einmal gelesen und für "status" und "relay" verwendet,
+    damit beide Abschnitte denselben Zeitpunkt zeigen. Ohne fields
+    werden alle Abschnitte geliefert; since und limit gelten für "dashboard".
+    """
+    try:
+        fields = request.args.get("fields")
+        sections = [f for f in fields.split(",") if f] if fields else list(SNAPSHOT_SECTIONS)
+        unknown = [f for f in sections if f not in SNAPSHOT_SECTIONS]
+        if unknown:
+            raise ValueError(f"Unknown snapshot field: {unknown[0]}")
 
-        # Zusätzlicher Komfort: Namen der externen Station holen, falls möglich
-        if status.get("api_station") and station_service:
-            stations = station_service.fetch_stations()
-            station_name = next((s.name for s in stations if s.station_id == status["api_station"]), None)
-            status["api_station_name"] = station_name if station_name else status["api_station"]
+        services = {
+            "status": ("REGULATION_SERVICE", "RELAY_SERVICE"),
+            "relay": ("RELAY_SERVICE",),
+            "config": ("PARAMETER_SERVICE",),
+            "dashboard": ("LOG_READER_SERVICE",),
+        }
+        for section in sections:
+            if any(current_app.config.get(name) is None for name in services[section]):
+                raise Exception("Required service not available")
 
-        return jsonify(status)
+        snapshot = {"timestamp": time.time()}
+        relay_state = current_app.config["RELAY_SERVICE"].get_state() if {"status", "relay"} & set(sections) else None
+        if "relay" in sections:
+            snapshot["relay"] = {"relay_state": relay_state}
+        if "status" in sections:
+            snapshot["status"] = _build_status(current_app.config["REGULATION_SERVICE"],
+                                               current_app.config.get("STATION_SERVICE"), relay_state)
+        if "config" in sections:
+            snapshot["config"] = current_app.config["PARAMETER_SERVICE"].get_config()
+        if "dashboard" in sections:
+            limit = int(request.args.get("limit", 100))
+            since = _since_arg()
+            log_reader = current_app.config["LOG_READER_SERVICE"]
+            if since is None:
+                snapshot["dashboard"] = log_reader.get_status_history(limit=limit)
+            else:
+                snapshot["dashboard"] = log_reader.get_status_since(since, limit=limit)
+        return jsonify(snapshot)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+# ------------------- STREAM ENDPOINT -------------------
+@api_bp.route("/stream", methods=["GET"])
+def get_stream():
+    """
+    GET /api/stream liefert Status- ("status") und Relaisänderungen ("relay") als
+    Server-Sent Events. Beim Verbinden kommt zuerst der letzte Stand jedes Ereignisses.
+    Sind bereits zu viele Clients verbunden, wird 503 geliefert.
+    """
+    try:
+        broadcaster = current_app.config.get("EVENT_BROADCASTER")
+        if broadcaster is None:
+            raise Exception("Event broadcaster not available")
+        try:
+            subscription = broadcaster.subscribe()
+        except RuntimeError as e:
+            return jsonify({"error": str(e)}), 503
+
+        def generate():
+            try:
+                yield from subscription.messages(broadcaster.options["keepalive_interval"])
+            finally:
+                broadcaster.unsubscribe(subscription)
+        return Response(stream_with_context(generate()), mimetype="text/event-stream",
+                        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -43,12 +218,13 @@ def get_status():
 def get_config():
     """
     GET /api/config liefert die aktuelle Konfiguration (z. B. Schwellwerte).
+    Unterstützt ETag/If-None-Match über die Konfigurationsversion.
     """
     try:
         parameter_service = current_app.config.get("PARAMETER_SERVICE")
         if parameter_service is None:
             raise Exception("Parameter service not available")
-        return jsonify(parameter_service.get_config())
+        return _conditional(parameter_service.get_version(), lambda: jsonify(parameter_service.get_config()))
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -100,15 +276,31 @@ def get_sensor():
 def get_stations():
     """
     GET /api/stations liefert eine einfache Übersicht aller abgerufenen Stationen 
-    (ID und Name), basierend auf dem StationService-Cache.
+    (ID und Name), basierend auf dem StationService-Cache. Der ETag folgt der letzten Änderung der Stationsdaten.
     """
     try:
         station_service = current_app.config.get("STATION_SERVICE")
         if station_service is None:
             raise Exception("Station service not available")
         stations = station_service.fetch_stations()
-        stations_list = [{"id": s.station_id, "station_name": s.name} for s in stations]
-        return jsonify({"stations": stations_list})
+
+        def build():
+            stations_list = [{"id": s.station_id, "station_name": s.name} for s in stations]
+            return jsonify({"stations": stations_list})
+        return _conditional(station_service.get_cache_version(), build)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@api_bp.route("/stations/stats", methods=["GET"])
+def get_station_stats():
+    """
+    GET /api/stations/stats liefert Dauer und Ergebnis der letzten Feed-Abrufe des StationService.
+    """
+    try:
+        station_service = current_app.config.get("STATION_SERVICE")
+        if station_service is None:
+            raise Exception("Station service not available")
+        return jsonify(station_service.get_stats())
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -116,8 +308,15 @@ def get_stations():
 @api_bp.route("/logs", methods=["GET"])
 def get_logs():
     """
-    GET /api/logs?start=YYYY-MM-DDT...&end=...&event=...&limit=...
-    Liest gefilterte Logs aus dem LogReaderService.
+    GET /api/logs?start=YYYY-MM-DDT...&end=...&event=...&limit=...&cursor=...&format=...&since=...
+    Liest gefilterte Logs aus dem LogReaderService. Der Header X-Next-Cursor enthält
+    den Cursor für die nächste (ältere) Seite. Mit format=ndjson werden die Einträge
+    neueste zuerst gestreamt; die letzte Zeile lautet {"next_cursor": ...}.
+    Mit since=<Zeitstempel> kommen die ältesten limit neueren Einträge (älteste zuerst) als
+    {"entries": [...], "cursor": ..., "more": ...}; cursor ist der Wert für die nächste
+    since-Abfrage, more=true heißt, dass sofort weitergelesen werden soll. Mit format=ndjson
+    lautet die letzte Zeile dann {"cursor": ..., "more": ...}.
+    Solange nichts Neues geschrieben wurde, liefert If-None-Match 304.
     """
     try:
         log_reader = current_app.config.get("LOG_READER_SERVICE")
@@ -127,9 +326,52 @@ def get_logs():
         end_param = request.args.get("end")
         event_filter = request.args.get("event")
         limit = int(request.args.get("limit", 100))
+        cursor = request.args.get("cursor")
+        since = _since_arg()
+
+        def build():
+            if since is not None:
+                result = log_reader.get_logs_since(since, start_param, end_param, event_filter, limit)
+                if request.args.get("format") == "ndjson":
+                    lines = [json.dumps(entry) + "\n" for entry in result.pop("entries")]
+                    lines.append(json.dumps(result) + "\n")
+                    return Response("".join(lines), mimetype="application/x-ndjson")
+                return jsonify(result)
+
+            page = log_reader.get_logs_page(start_param, end_param, event_filter, limit, cursor)
+            if request.args.get("format") == "ndjson":
+                def generate():
+                    try:
+                        for entry in page:
+                            yield json.dumps(entry) + "\n"
+                        yield json.dumps({"next_cursor": page.next_cursor}) + "\n"
+                    except Exception as e:
+                        yield json.dumps({"error": str(e)}) + "\n"
+                return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+
+            logs = list(page)
+            logs.reverse()
+            response = jsonify(logs)
+            if page.next_cursor:
+                response.headers["X-Next-Cursor"] = page.next_cursor
+            return response
+        return _conditional(log_reader.get_log_version(), build)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
 
-        logs = log_reader.get_filtered_logs(start_param, end_param, event_filter, limit)
-        return jsonify(logs)
+@api_bp.route("/logs/events", methods=["GET"])
+def get_log_event_counts():
+    """
+    GET /api/logs/events liefert die Anzahl Log-Eintraege pro Ereignis,
+    ohne die Logdatei zu scannen (aus den Ereignisindizes).
+    """
+    try:
+        log_reader = current_app.config.get("LOG_READER_SERVICE")
+        if log_reader is None:
+            raise Exception("Log reader service not available")
+        return jsonify({"events": log_reader.get_event_counts()})
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -138,15 +380,122 @@ def get_dashboard_data():
     """
     GET /api/dashboard - Sonder-Endpunkt für die Haupt-Ansicht,
     gibt nur die Logs mit event='status_update' zurück.
+    Solange nichts Neues geschrieben wurde, liefert If-None-Match 304.
+    Mit since=<Zeitstempel> kommen die ältesten limit neueren Einträge als
+    {"entries": [...], "cursor": ..., "more": ...} (wie bei /api/logs).
     """
     try:
         log_reader = current_app.config.get("LOG_READER_SERVICE")
         if log_reader is None:
             raise Exception("Log reader service not available")
         limit = int(request.args.get("limit", 100))
-        logs = log_reader.get_filtered_logs(event_filter="status_update", limit=limit)
-        logs.sort(key=lambda x: x.get("timestamp", 0))
-        return jsonify(logs)
+        since = _since_arg()
+
+        def build():
+            if since is None:
+                return jsonify(log_reader.get_status_history(limit=limit))
+            return jsonify(log_reader.get_status_since(since, limit=limit))
+        return _conditional(log_reader.get_log_version(), build)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@api_bp.route("/logging/stats", methods=["GET"])
+def get_logging_stats():
+    """
+    GET /api/logging/stats liefert die Zaehler des LoggingService
+    (Warteschlangentiefe, verworfene Eintraege, Schreiblatenz).
+    """
+    try:
+        logging_service = current_app.config.get("LOGGING_SERVICE")
+        if logging_service is None:
+            raise Exception("Logging service not available")
+        return jsonify(logging_service.get_stats())
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@api_bp.route("/logs/series", methods=["GET"])
+def get_status_series():
+    """
+    GET /api/logs/series?start=...&end=...&step=<Sekunden>
+    Treppenfunktion der status_update-Werte mit festem Raster, auch wenn nur
+    Aenderungen geloggt werden (Totband-Modus).
+    """
+    try:
+        log_reader = current_app.config.get("LOG_READER_SERVICE")
+        if log_reader is None:
+            raise Exception("Log reader service not available")
+        step = request.args.get("step", 60, type=float)
+        series = log_reader.get_status_series(request.args.get("start"), request.args.get("end"), step)
+        return jsonify(series)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@api_bp.route("/logs/export", methods=["GET"])
+def export_logs():
+    """
+    GET /api/logs/export?format=csv&start=...&end=...&event=...
+    Streamt den Bereich zeilenweise als CSV (älteste zuerst); die Felder von
+    "status" werden als eigene Spalten ausgegeben.
+    """
+    try:
+        log_reader = current_app.config.get("LOG_READER_SERVICE")
+        if log_reader is None:
+            raise Exception("Log reader service not available")
+        if request.args.get("format", "csv") != "csv":
+            raise ValueError("Unsupported export format")
+        chunks = log_reader.export_csv(request.args.get("start"), request.args.get("end"),
+                                       request.args.get("event"))
+        return Response(stream_with_context(chunks), mimetype="text/csv",
+                        headers={"Content-Disposition": "attachment; filename=humisense-log.csv"})
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@api_bp.route("/logs/aggregate", methods=["GET"])
+def get_log_aggregate():
+    """
+    GET /api/logs/aggregate?field=status.difference&bucket=300&agg=mean,min,max&start=...&end=...&event=...
+    Aggregiert ein Feld serverseitig in Zeitfenstern; die Antwort wächst mit der Anzahl
+    Fenster, nicht mit der Anzahl Messungen. Ohne start/end: die letzten 24 Stunden.
+    """
+    try:
+        log_reader = current_app.config.get("LOG_READER_SERVICE")
+        if log_reader is None:
+            raise Exception("Log reader service not available")
+        bucket = request.args.get("bucket", 300, type=float)
+        aggregates = [a for a in request.args.get("agg", "mean,min,max").split(",") if a]
+        result = log_reader.get_aggregate(request.args.get("field"), bucket, aggregates,
+                                          request.args.get("start"), request.args.get("end"),
+                                          request.args.get("event"))
+        return jsonify(result)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@api_bp.route("/history", methods=["GET"])
+def get_history():
+    """
+    GET /api/history?start=...&end=...&resolution=<Sekunden>
+    Verdichteter Verlauf (min/max/mean/last je Feld, Relais-Laufzeit) aus der
+    groebsten passenden Rollup-Stufe. Ohne start/end: die letzten 24 Stunden.
+    """
+    try:
+        log_reader = current_app.config.get("LOG_READER_SERVICE")
+        if log_reader is None:
+            raise Exception("Log reader service not available")
+        resolution = request.args.get("resolution", type=int)
+        max_points = request.args.get("max_points", 1000, type=int)
+        history = log_reader.get_history(request.args.get("start"), request.args.get("end"),
+                                         resolution, max_points)
+        return jsonify(history)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
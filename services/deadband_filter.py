@@ -0,0 +1,54 @@
+# services/deadband_filter.py
+import threading
+
+# Standard-Totbaender je Feld (Einheit des Feldes)
+DEFAULT_DEADBANDS = {
+    "local_temperature": 0.1,
+    "local_humidity": 0.5,
+    "inside_absolute_humidity": 0.05,
+    "api_temperature": 0.1,
+    "api_humidity": 0.5,
+    "outside_absolute_humidity": 0.05,
+    "difference": 0.05,
+}
+
+
+class DeadbandFilter:
+    """
+    Entscheidet, ob ein status_update geschrieben werden muss: nur wenn sich ein Feld
+    um mehr als sein Totband gegenueber der zuletzt geschriebenen Messung bewegt hat,
+    sich ein nicht-numerisches Feld (z. B. regulation_state) geaendert hat oder das
+    Heartbeat-Intervall abgelaufen ist.
+    """
+
+    def __init__(self, deadbands=None, heartbeat_interval=300):
+        self.deadbands = dict(DEFAULT_DEADBANDS)
+        self.deadbands.update(deadbands or {})
+        self.heartbeat_interval = heartbeat_interval
+        self.lock = threading.Lock()
+        self._last_status = None
+        self._last_ts = None
+
+    def should_write(self, ts, status):
+        with self.lock:
+            if self._last_status is None or ts - self._last_ts >= self.heartbeat_interval \
+                    or self._changed(status):
+                self._last_status = dict(status)
+                self._last_ts = ts
+                return True
+            return False
+
+    def _changed(self, status):
+        last = self._last_status
+        if status.keys() != last.keys():
+            return True
+        for key, value in status.items():
+            previous = last[key]
+            band = self.deadbands.get(key)
+            if band is None or value is None or previous is None \
+                    or not isinstance(value, (int, float)) or not isinstance(previous, (int, float)):
+                if value != previous:
+                    return True
+            elif abs(value - previous) > band:
+                return True
+        return False
@@ -0,0 +1,142 @@
+# services/event_broadcaster.py
+import json, threading, logging
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+
+class Subscription:
+    """
+    Begrenzter Nachrichtenpuffer eines einzelnen Stream-Clients.
+    """
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.closed = False
+        self.dropped = 0
+        self._messages = deque()
+        self._cond = threading.Condition()
+
+    def offer(self, message, policy):
+        """
+        Legt eine Nachricht ab. Gibt False zurueck, wenn der Client wegen vollem Puffer
+        (Richtlinie "disconnect") oder weil er schon getrennt ist, keine Nachrichten mehr erhaelt.
+        """
+        with self._cond:
+            if self.closed:
+                return False
+            if len(self._messages) >= self.maxsize:
+                if policy == "disconnect":
+                    self.closed = True
+                    self._cond.notify_all()
+                    return False
+                self._messages.popleft()
+                self.dropped += 1
+            self._messages.append(message)
+            self._cond.notify_all()
+            return True
+
+    def close(self):
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+
+    def messages(self, keepalive_interval=15):
+        """
+        Generator fuer die HTTP-Antwort: liefert wartende Nachrichten gebuendelt und nach
+        keepalive_interval Sekunden ohne Nachricht einen SSE-Kommentar. Endet mit close().
+        """
+        while True:
+            with self._cond:
+                if not self._messages and not self.closed:
+                    self._cond.wait(keepalive_interval)
+                if self.closed:
+                    return
+                batch = list(self._messages)
+                self._messages.clear()
+            yield "".join(batch) if batch else ": keepalive\n\n"
+
+
+class EventBroadcaster:
+    """
+    Verteilt Zustandsaenderungen (RegulationService, RelayService) als Server-Sent Events
+    an alle verbundenen Clients. Jede Nachricht wird einmal serialisiert; jeder Client hat
+    einen begrenzten Puffer, langsame Clients werden getrennt oder verlieren alte Nachrichten.
+    Neue Clients erhalten zuerst die letzte Nachricht jedes Ereignistyps (Snapshot).
+    """
+
+    # Standardwerte fuer den Abschnitt "stream" in config.json
+    DEFAULT_OPTIONS = {
+        "client_queue_size": 50,           # max. wartende Nachrichten pro Client
+        "slow_client_policy": "disconnect",  # "disconnect" oder "drop_oldest"
+        "max_clients": 20,                 # jeder Client belegt einen Thread (gunicorn --threads im Dockerfile)
+        "keepalive_interval": 15,          # Sekunden bis zum Keepalive-Kommentar
+    }
+
+    SLOW_CLIENT_POLICIES = ("disconnect", "drop_oldest")
+
+    def __init__(self, options=None):
+        self.options = dict(self.DEFAULT_OPTIONS)
+        self.options.update({k: v for k, v in (options or {}).items() if k in self.DEFAULT_OPTIONS})
+        if self.options["slow_client_policy"] not in self.SLOW_CLIENT_POLICIES:
+            raise ValueError(f"Invalid slow client policy: {self.options['slow_client_policy']}")
+        self.lock = threading.Lock()
+        self._subscribers = set()
+        self._latest = {}
+        self._published = 0
+        self._disconnected = 0
+
+    @staticmethod
+    def format_message(event, data):
+        return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+    def publish(self, event, data):
+        """
+        Serialisiert data einmal und verteilt es an alle Clients.
+        """
+        message = self.format_message(event, data)
+        with self.lock:
+            self._latest[event] = message
+            self._published += 1
+            subscribers = list(self._subscribers)
+        for subscription in subscribers:
+            if not subscription.offer(message, self.options["slow_client_policy"]):
+                logger.info("Disconnecting slow stream client")
+                self.unsubscribe(subscription, slow=True)
+
+    def subscribe(self):
+        """
+        Meldet einen Client an; sein Puffer enthaelt sofort den aktuellen Snapshot.
+        Wirft RuntimeError, wenn bereits max_clients verbunden sind.
+        """
+        with self.lock:
+            if len(self._subscribers) >= self.options["max_clients"]:
+                raise RuntimeError("Too many stream clients")
+            subscription = Subscription(self.options["client_queue_size"])
+            for message in self._latest.values():
+                subscription.offer(message, "drop_oldest")
+            self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription, slow=False):
+        subscription.close()
+        with self.lock:
+            if subscription in self._subscribers:
+                self._subscribers.discard(subscription)
+                if slow:
+                    self._disconnected += 1
+
+    def close(self):
+        with self.lock:
+            subscribers = list(self._subscribers)
+            self._subscribers.clear()
+        for subscription in subscribers:
+            subscription.close()
+
+    def get_stats(self):
+        with self.lock:
+            return {
+                "clients": len(self._subscribers),
+                "published": self._published,
+                "disconnected_slow_clients": self._disconnected,
+            }
@@ -0,0 +1,98 @@
+# services/geojson_stream.py
+import codecs, json
+
+_decoder = json.JSONDecoder()
+WHITESPACE = " \t\n\r"
+
+
+class _TextBuffer:
+    """
+    Dekodiert Byte-Stuecke schrittweise zu Text und haelt nur den noch nicht gelesenen Rest.
+    """
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._utf8 = codecs.getincrementaldecoder("utf-8")()
+        self.text = ""
+        self.pos = 0
+        self.eof = False
+
+    def fill(self):
+        """
+        Haengt das naechste Stueck an; False am Ende des Datenstroms.
+        """
+        if self.eof:
+            return False
+        for chunk in self._chunks:
+            text = self._utf8.decode(chunk)
+            if text:
+                self.text = self.text[self.pos:] + text
+                self.pos = 0
+                return True
+        self.eof = True
+        self.text = self.text[self.pos:] + self._utf8.decode(b"", final=True)
+        self.pos = 0
+        return False
+
+    def peek(self):
+        """
+        Naechstes Zeichen nach Leerraum (ohne es zu verbrauchen); "" am Ende.
+        """
+        while True:
+            while self.pos < len(self.text) and self.text[self.pos] in WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.text):
+                return self.text[self.pos]
+            if not self.fill():
+                return ""
+
+    def take(self, allowed):
+        char = self.peek()
+        if not char or char not in allowed:
+            raise ValueError(f"Invalid GeoJSON: expected one of {allowed!r}, got {char!r}")
+        self.pos += 1
+        return char
+
+    def value(self):
+        """
+        Dekodiert den naechsten JSON-Wert; liest bei Bedarf weitere Stuecke nach.
+        """
+        self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.text, self.pos)
+            except json.JSONDecodeError:
+                if not self.fill():
+                    raise
+                continue
+            # Eine Zahl am Pufferende koennte im naechsten Stueck weitergehen
+            if end == len(self.text) and self.fill():
+                continue
+            self.pos = end
+            return value
+
+
+def iter_features(chunks):
+    """
+    Generator: die Eintraege von "features" einer GeoJSON-FeatureCollection, einzeln
+    dekodiert aus Byte-Stuecken (z. B. response.iter_content()). Es liegt immer nur ein
+    Feature vollstaendig im Speicher; nach dem Feature-Array wird nicht weitergelesen.
+    """
+    buffer = _TextBuffer(chunks)
+    buffer.take("{")
+    if buffer.peek() == "}":
+        return
+    while True:
+        key = buffer.value()
+        buffer.take(":")
+        if key == "features":
+            buffer.take("[")
+            if buffer.peek() == "]":
+                return
+            while True:
+                yield buffer.value()
+                if buffer.take(",]") == "]":
+                    return
+        buffer.value()
+        if buffer.take(",}") == "}":
+            return
@@ -0,0 +1,327 @@
+# services/log_index.py
+"""
+Sidecar-Indizes fuer die Log-Segmente.
+
+SparseTimeIndex: duenner Zeitindex (Zeitstempel -> Byte-Offset) ungefaehr
+alle index_stride Bytes. Damit springt der LogReaderService bei start/end
+direkt in den passenden Bereich und dekodiert nur die Zeilen darin.
+
+EventIndex: pro Ereignistyp eine Posting-Liste der Byte-Offsets aller
+Zeilen dieses Typs (eine Datei je Ereignis im Verzeichnis "<segment>.events").
+Seltene Ereignisse werden so ohne Scan gefunden; die Anzahl pro Ereignis
+ergibt sich direkt aus der Dateigroesse.
+
+Die Offsets beziehen sich immer auf den unkomprimierten Inhalt.
+"""
+import json, os, re, struct, logging
+from array import array
+from bisect import bisect_left, bisect_right
+from services import log_segments
+
+logger = logging.getLogger(__name__)
+
+
+class SparseTimeIndex:
+    SUFFIX = ".tsidx"
+    RECORD = struct.Struct("<dQ")  # Zeitstempel, Byte-Offset des Zeilenanfangs
+
+    def __init__(self, path, stride=4096):
+        self.path = path
+        self.stride = stride
+        self.timestamps = []
+        self.offsets = []
+        self._file = None
+        self._pending = []
+
+    @classmethod
+    def for_segment(cls, segment_path, stride=4096):
+        return cls(log_segments.sidecar_path(segment_path, cls.SUFFIX), stride)
+
+    # ---------- Schreiben (LoggingService) ----------
+
+    def note(self, ts, offset):
+        """
+        Merkt sich eine Zeile als Indexpunkt, falls seit dem letzten Punkt
+        mindestens stride Bytes geschrieben wurden.
+        """
+        if self.offsets and offset - self.offsets[-1] < self.stride:
+            return
+        self.timestamps.append(ts)
+        self.offsets.append(offset)
+        self._pending.append(self.RECORD.pack(ts, offset))
+
+    def flush(self):
+        if not self._pending:
+            return
+        if self._file is None:
+            self._file = open(self.path, "ab")
+        self._file.write(b"".join(self._pending))
+        self._file.flush()
+        self._pending = []
+
+    def close(self):
+        self.flush()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    # ---------- Lesen ----------
+
+    def load(self):
+        """
+        Laedt den Index; liefert False, wenn keine Indexdatei existiert.
+        """
+        try:
+            with open(self.path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return False
+        usable = len(data) - len(data) % self.RECORD.size
+        self.timestamps = []
+        self.offsets = []
+        for ts, offset in self.RECORD.iter_unpack(data[:usable]):
+            self.timestamps.append(ts)
+            self.offsets.append(offset)
+        return True
+
+    def is_valid_for(self, segment_path):
+        """
+        Stichprobe: der letzte Indexpunkt muss auf eine Zeile mit genau diesem Zeitstempel zeigen.
+        """
+        if not self.offsets:
+            return False
+        try:
+            if os.path.getsize(segment_path) < self.offsets[-1]:
+                return False
+            with open(segment_path, "rb") as f:
+                f.seek(self.offsets[-1])
+                return json.loads(f.readline()).get("timestamp") == self.timestamps[-1]
+        except (OSError, ValueError, AttributeError):
+            return False
+
+    def rebuild(self, segment):
+        """
+        Baut den Index fuer ein Segment neu auf. Dekodiert wird nur je eine Zeile pro Indexpunkt.
+        """
+        self.timestamps = []
+        self.offsets = []
+        self._pending = []
+        offset = 0
+        with log_segments.open_segment(segment, "rb") as f:
+            for line in f:
+                if not self.offsets or offset - self.offsets[-1] >= self.stride:
+                    try:
+                        self.note(json.loads(line)["timestamp"], offset)
+                    except (ValueError, KeyError, TypeError):
+                        pass
+                offset += len(line)
+        tmp = self.path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(b"".join(self._pending))
+        os.replace(tmp, self.path)
+        self._pending = []
+
+    def lookup(self, start_time=None, end_time=None):
+        """
+        Liefert den Byte-Bereich (lo, hi), der alle Zeilen mit start <= ts <= end enthaelt.
+        hi=None bedeutet Dateiende.
+        """
+        lo, hi = 0, None
+        if start_time:
+            j = bisect_left(self.timestamps, start_time)
+            lo = self.offsets[j - 1] if j > 0 else 0
+        if end_time:
+            k = bisect_right(self.timestamps, end_time)
+            hi = self.offsets[k] if k < len(self.offsets) else None
+        return lo, hi
+
+
+def load_time_index(segment, stride=4096):
+    """
+    Liefert einen gueltigen Zeitindex fuer ein Segment oder None.
+    Fehlende oder veraltete Indizes rotierter Segmente werden bei Bedarf neu gebaut;
+    den Index des aktiven Segments pflegt ausschliesslich der LoggingService.
+    """
+    index = SparseTimeIndex.for_segment(segment.path, stride)
+    if index.load() and (segment.compression is not None or index.is_valid_for(segment.path)):
+        return index
+    if segment.active:
+        return None
+    try:
+        index.rebuild(segment)
+    except OSError as e:
+        logger.error("Error rebuilding time index for %s: %s", segment.path, e)
+        return None
+    return index
+
+
+# json.dumps schreibt das Ereignis immer in dieser Form
+EVENT_TOKEN = re.compile(rb'"event": "((?:[^"\\]|\\.)*)"')
+
+
+def extract_event(line):
+    """
+    Liest den Ereignisnamen aus einer Rohzeile (bytes), ohne die ganze Zeile zu dekodieren.
+    """
+    match = EVENT_TOKEN.search(line)
+    if match:
+        return json.loads(b'"' + match.group(1) + b'"')
+    try:
+        return json.loads(line).get("event")
+    except (ValueError, AttributeError):
+        return None
+
+
+class EventIndex:
+    SUFFIX = ".events"
+    OFFSET_SIZE = array("Q").itemsize
+
+    def __init__(self, path):
+        self.path = path
+        self._files = {}
+        self._pending = {}
+
+    @classmethod
+    def for_segment(cls, segment_path):
+        return cls(log_segments.sidecar_path(segment_path, cls.SUFFIX))
+
+    def _event_path(self, event):
+        return os.path.join(self.path, re.sub(r"[^A-Za-z0-9_.-]", "_", event) + ".idx")
+
+    # ---------- Schreiben (LoggingService) ----------
+
+    def note(self, event, offset):
+        if event:
+            self._pending.setdefault(event, array("Q")).append(offset)
+
+    def flush(self):
+        if not self._pending:
+            return
+        os.makedirs(self.path, exist_ok=True)
+        for event, offsets in self._pending.items():
+            f = self._files.get(event)
+            if f is None:
+                f = self._files[event] = open(self._event_path(event), "ab")
+            f.write(offsets.tobytes())
+            f.flush()
+        self._pending = {}
+
+    def close(self):
+        self.flush()
+        for f in self._files.values():
+            f.close()
+        self._files = {}
+
+    # ---------- Lesen ----------
+
+    def exists(self):
+        return os.path.isdir(self.path)
+
+    def counts(self):
+        """
+        Anzahl Eintraege pro Ereignis, ohne die Posting-Listen zu lesen.
+        """
+        counts = {}
+        try:
+            names = os.listdir(self.path)
+        except OSError:
+            return counts
+        for name in names:
+            if name.endswith(".idx"):
+                size = os.path.getsize(os.path.join(self.path, name))
+                counts[name[:-4]] = size // self.OFFSET_SIZE
+        return counts
+
+    def count(self, event):
+        try:
+            return os.path.getsize(self._event_path(event)) // self.OFFSET_SIZE
+        except OSError:
+            return 0
+
+    def offsets(self, event):
+        """
+        Posting-Liste eines Ereignisses (aufsteigende Offsets); leer, wenn es nie vorkam.
+        """
+        offsets = array("Q")
+        try:
+            with open(self._event_path(event), "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return offsets
+        offsets.frombytes(data[:len(data) - len(data) % self.OFFSET_SIZE])
+        return offsets
+
+    def _last_offset(self, event):
+        try:
+            with open(self._event_path(event), "rb") as f:
+                size = f.seek(0, os.SEEK_END)
+                size -= size % self.OFFSET_SIZE
+                if not size:
+                    return None
+                f.seek(size - self.OFFSET_SIZE)
+                return array("Q", f.read(self.OFFSET_SIZE))[0]
+        except OSError:
+            return None
+
+    def is_valid_for(self, segment_path):
+        """
+        Stichprobe: der groesste Offset muss auf eine Zeile des passenden Ereignisses zeigen.
+        """
+        last_event, last_offset = None, -1
+        for event in self.counts():
+            offset = self._last_offset(event)
+            if offset is not None and offset > last_offset:
+                last_event, last_offset = event, offset
+        if last_event is None:
+            return False
+        try:
+            with open(segment_path, "rb") as f:
+                f.seek(last_offset)
+                event = extract_event(f.readline())
+        except OSError:
+            return False
+        return event is not None and os.path.basename(self._event_path(event)) == last_event + ".idx"
+
+    def rebuild(self, segment):
+        """
+        Baut alle Posting-Listen eines Segments neu auf (nur der Ereignisname wird gelesen).
+        """
+        self.close()
+        tmp = self.path + ".tmp"
+        if os.path.isdir(tmp):
+            _remove_dir(tmp)
+        building = EventIndex(tmp)
+        offset = 0
+        with log_segments.open_segment(segment, "rb") as f:
+            for line in f:
+                building.note(extract_event(line), offset)
+                offset += len(line)
+        building.flush()
+        building.close()
+        os.makedirs(tmp, exist_ok=True)
+        if os.path.isdir(self.path):
+            _remove_dir(self.path)
+        os.replace(tmp, self.path)
+
+
+def _remove_dir(path):
+    for name in os.listdir(path):
+        os.remove(os.path.join(path, name))
+    os.rmdir(path)
+
+
+def load_event_index(segment):
+    """
+    Liefert einen gueltigen Ereignisindex fuer ein Segment oder None (wie load_time_index).
+    """
+    index = EventIndex.for_segment(segment.path)
+    if index.exists() and (segment.compression is not None or index.is_valid_for(segment.path)):
+        return index
+    if segment.active:
+        return None
+    try:
+        index.rebuild(segment)
+    except OSError as e:
+        logger.error("Error rebuilding event index for %s: %s", segment.path, e)
+        return None
+    return index
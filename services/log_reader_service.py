@@ -1,16 +1,296 @@
 # services/log_reader_service.py
-import json, os
+import base64, csv, io, json, math, multiprocessing, os, re, sys, threading, time
+from array import array
+from bisect import bisect_left
+from functools import lru_cache
+from itertools import islice
+from collections import deque, Counter
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
 from dateutil import parser as dateparser
-from file_read_backwards import FileReadBackwards
+from services import log_segments
+from services.log_index import load_time_index, load_event_index, extract_event
+from services.telemetry_store import TelemetryStore, FLOAT_FIELDS
+from services.rollup_store import RollupStore
+from services.sqlite_log_backend import SqliteLogStore
+
+# LoggingService schreibt "event" als ersten und "timestamp" als letzten Schluessel (json.dumps)
+LEADING_EVENT = re.compile(rb'^\{"event": "((?:[^"\\]|\\.)*)"')
+TRAILING_TIMESTAMP = re.compile(rb'"timestamp": ([-+0-9.eE]+)\}\s*$')
+
+
+@lru_cache(maxsize=32)
+def event_token(event):
+    """
+    Ereignisname so, wie er in der Rohzeile steht (JSON-kodiert, ohne Anfuehrungszeichen).
+    """
+    return json.dumps(event)[1:-1].encode("ascii")
+
+
+def line_timestamp(line):
+    """
+    Zeitstempel einer Rohzeile (bytes) ohne Dekodieren; None bei anderem Format.
+    """
+    match = TRAILING_TIMESTAMP.search(line)
+    if match is None:
+        return None
+    try:
+        return float(match.group(1))
+    except ValueError:
+        return None
+
+
+def prefilter(line, start_time=None, end_time=None, token=None):
+    """
+    Schnelle Vorpruefung auf der Rohzeile (bytes): False, wenn die Zeile sicher nicht passt.
+    Zeilen in anderem Format werden durchgelassen und erst beim Dekodieren geprueft.
+    token ist das Ergebnis von event_token(Ereignisname).
+    """
+    if token is not None:
+        match = LEADING_EVENT.match(line)
+        if match is not None and match.group(1) != token:
+            return False
+    if start_time or end_time:
+        ts = line_timestamp(line)
+        if ts is not None and ((start_time and ts < start_time) or (end_time and ts > end_time)):
+            return False
+    return True
+
+
+def match_line(line, start_time=None, end_time=None, event_filter=None):
+    """
+    Dekodiert eine Rohzeile, wenn sie im Zeitbereich liegt und zum Ereignisfilter passt; sonst None.
+    """
+    if not prefilter(line, start_time, end_time, event_token(event_filter) if event_filter else None):
+        return None
+    try:
+        entry = json.loads(line)
+    except Exception:
+        return None
+    ts = entry.get("timestamp")
+    if ts is None:
+        return None
+    if start_time and ts < start_time:
+        return None
+    if end_time and ts > end_time:
+        return None
+    if event_filter and entry.get("event") != event_filter:
+        return None
+    return entry
+
+
+def split_ranges(f, lo, hi, chunk_size):
+    """
+    Teilt den Byte-Bereich [lo, hi) einer Binaerdatei in Teilbereiche von etwa chunk_size,
+    deren Grenzen auf Zeilenanfaengen liegen. lo muss ein Zeilenanfang sein.
+    """
+    ranges = []
+    start = lo
+    while start < hi:
+        boundary = start + chunk_size
+        if boundary >= hi:
+            ranges.append((start, hi))
+            break
+        f.seek(boundary - 1)
+        # Bis zum Ende der angeschnittenen Zeile vorruecken
+        boundary += len(f.readline()) - 1
+        ranges.append((start, min(boundary, hi)))
+        start = boundary
+    return ranges
+
+
+def scan_range(path, lo, hi, start_time, end_time, event_filter, limit):
+    """
+    Arbeitsfunktion des Prozesspools: die letzten limit passenden Eintraege im
+    Byte-Bereich [lo, hi) einer unkomprimierten Datei, aelteste zuerst.
+    """
+    matches = deque(maxlen=limit)
+    with open(path, "rb") as f:
+        f.seek(lo)
+        offset = lo
+        for line in f:
+            if offset >= hi:
+                break
+            offset += len(line)
+            entry = match_line(line, start_time, end_time, event_filter)
+            if entry is not None:
+                matches.append(entry)
+    return list(matches)
+
+
+def _isoformat(ts):
+    return datetime.fromtimestamp(ts, tz=timezone.utc).isoformat()
+
+
+def encode_cursor(ts, skip):
+    """
+    Opaker Cursor fuer /api/logs: Zeitstempel des aeltesten gelieferten Eintrags und die
+    Anzahl bereits gelieferter Eintraege mit genau diesem Zeitstempel.
+    """
+    raw = json.dumps({"ts": ts, "skip": skip}, separators=(",", ":")).encode("ascii")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor):
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        return float(data["ts"]), int(data["skip"])
+    except (ValueError, KeyError, TypeError) as e:
+        raise ValueError("Invalid cursor") from e
+
+
+class LogPage:
+    """
+    Iterator ueber eine Seite von Log-Eintraegen (neueste zuerst). Nach dem vollstaendigen
+    Durchlauf enthaelt next_cursor den Cursor der naechsten (aelteren) Seite oder None.
+    """
+
+    def __init__(self, entries, limit, cursor_ts=None, skip=0):
+        self._entries = entries
+        self.limit = limit
+        self._cursor_ts = cursor_ts
+        self._skip = skip
+        self.next_cursor = None
+
+    def __iter__(self):
+        entries = iter(self._entries)
+        count, last_ts, ties = 0, None, 0
+        try:
+            # Die ersten skip Eintraege (gleicher Zeitstempel wie der Cursor) kamen schon
+            for _ in range(self._skip):
+                if next(entries, None) is None:
+                    return
+            for entry in entries:
+                ts = entry["timestamp"]
+                ties = ties + 1 if ts == last_ts else 1
+                last_ts = ts
+                count += 1
+                yield entry
+        except Exception as e:
+            raise Exception("Error reading log file") from e
+        if count >= self.limit and last_ts is not None:
+            if last_ts == self._cursor_ts:
+                ties += self._skip
+            self.next_cursor = encode_cursor(last_ts, ties)
+
+
+def since_page(entries, after, limit):
+    """
+    Nimmt aus entries (strikt nach after, aelteste zuerst) die aeltesten limit Eintraege.
+    Eintraege mit dem Zeitstempel des letzten werden nicht getrennt, damit der Cursor
+    (Zeitstempel des letzten Eintrags) nichts ueberspringt. more zeigt an, dass noch
+    weitere Eintraege folgen und der Client sofort nachfragen soll.
+    """
+    page = []
+    more = False
+    for entry in entries:
+        if len(page) >= max(limit, 1) and entry["timestamp"] != page[-1]["timestamp"]:
+            more = True
+            break
+        page.append(entry)
+    return {"entries": page, "cursor": page[-1]["timestamp"] if page else after, "more": more}
+
+
+# Feste CSV-Spalten des Exports; alle weiteren Felder landen als JSON in "details"
+STATUS_COLUMNS = FLOAT_FIELDS + ("api_station", "regulation_state")
+CSV_COLUMNS = ("timestamp", "time", "event") + tuple(f"status.{c}" for c in STATUS_COLUMNS) + ("details",)
+
+
+def csv_row(entry):
+    """
+    Flacht einen Log-Eintrag in die Spalten von CSV_COLUMNS ab.
+    """
+    status = entry.get("status") if isinstance(entry.get("status"), dict) else {}
+    rest = {k: v for k, v in entry.items() if k not in ("timestamp", "event", "status")}
+    extra_status = {k: v for k, v in status.items() if k not in STATUS_COLUMNS}
+    if extra_status or ("status" in entry and not isinstance(entry["status"], dict)):
+        rest["status"] = extra_status or entry["status"]
+    ts = entry.get("timestamp")
+    row = [ts, _isoformat(ts) if isinstance(ts, (int, float)) else "", entry.get("event", "")]
+    row.extend("" if status.get(c) is None else status[c] for c in STATUS_COLUMNS)
+    row.append(json.dumps(rest) if rest else "")
+    return row
+
 
 class LogReaderService:
-    def __init__(self, parameter_service):
+    # Erlaubte Aggregate fuer get_aggregate
+    AGGREGATES = ("count", "sum", "mean", "min", "max")
+    # Ab dieser Bereichsgroesse (Bytes) wird ein unkomprimiertes Segment parallel gelesen;
+    # ueberschreibbar mit "logging": {"parallel_scan_threshold": ...}, 0 schaltet es ab
+    PARALLEL_SCAN_THRESHOLD = 64 * 1024 * 1024
+    # Mindestgroesse eines Teilbereichs, damit sich die Uebergabe an einen Prozess lohnt
+    PARALLEL_MIN_CHUNK = 4 * 1024 * 1024
+    # Hoechstgroesse eines Teilbereichs und hoechstes limit fuer den parallelen Scan: jeder
+    # Teilbereich kommt als dekodierte Liste zurueck, groessere Abfragen lesen sequentiell
+    PARALLEL_MAX_CHUNK = 16 * 1024 * 1024
+    PARALLEL_MAX_LIMIT = 10000
+
+    def __init__(self, parameter_service, logging_service=None):
         self.parameter_service = parameter_service
+        # Optional: laufender LoggingService fuer Daten, die nur im Speicher liegen
+        self.logging_service = logging_service
+        # Prozesspool fuer parallele Scans, wird beim ersten grossen Scan erzeugt
+        self._pool = None
+        self._pool_workers = 0
+        self._pool_lock = threading.Lock()
 
-    def get_filtered_logs(self, start_param=None, end_param=None, event_filter=None, limit=100):
+    def close(self):
+        """
+        Beendet den Prozesspool der parallelen Scans, falls er gestartet wurde.
+        """
+        with self._pool_lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def _log_file(self):
         config = self.parameter_service.get_config()
-        log_file = config.get("logging", {}).get("log_file", "log.json")
+        return config.get("logging", {}).get("log_file", "log.json")
+
+    def _live_logging_service(self):
+        """
+        Der laufende LoggingService, sofern er in die konfigurierte Logdatei schreibt.
+        """
+        logging_service = self.logging_service
+        if logging_service is None:
+            return None
+        if os.path.abspath(logging_service.log_file) != os.path.abspath(self._log_file()):
+            return None
+        return logging_service
+
+    def get_log_version(self):
+        """
+        Liefert (Versionskennung, Zeitpunkt der letzten Aenderung) des Logs fuer ETag/Last-Modified:
+        die Schreibsequenz des laufenden LoggingService, sonst Groesse und Aenderungszeit der Dateien.
+        """
+        logging_service = self._live_logging_service()
+        if logging_service is not None:
+            return logging_service.get_write_version()
+        store = self._sqlite_store()
+        log_file = self._log_file()
+        paths = [store.path, store.path + "-wal"] if store is not None else [log_file]
+        paths.append(TelemetryStore.path_for(log_file))
+        parts, modified = [], 0.0
+        for path in paths:
+            try:
+                st = os.stat(path)
+            except OSError:
+                parts.append("0")
+                continue
+            parts.append(f"{st.st_mtime_ns:x}.{st.st_size:x}")
+            modified = max(modified, st.st_mtime)
+        return "log-" + "-".join(parts), modified
+
+    def _sqlite_store(self):
+        """
+        SqliteLogStore, wenn in config.json "logging": {"backend": "sqlite"} gesetzt ist, sonst None.
+        """
+        options = self.parameter_service.get_config().get("logging", {})
+        if options.get("backend") != "sqlite":
+            return None
+        return SqliteLogStore(options.get("sqlite_file") or SqliteLogStore.path_for(self._log_file()))
 
+    def _parse_range(self, start_param, end_param):
         start_time = None
         end_time = None
         try:
@@ -20,29 +300,501 @@ class LogReaderService:
                 end_time = dateparser.isoparse(end_param).timestamp()
         except Exception as e:
             raise ValueError("Invalid date format") from e
+        return start_time, end_time
 
-        filtered_logs = []
+    def get_filtered_logs(self, start_param=None, end_param=None, event_filter=None, limit=100):
+        start_time, end_time = self._parse_range(start_param, end_param)
         try:
-            with FileReadBackwards(log_file, encoding="utf-8") as frb:
-                for line in frb:
-                    try:
-                        entry = json.loads(line)
-                    except Exception:
-                        continue
-                    ts = entry.get("timestamp")
-                    if ts is None:
-                        continue
-                    if start_time and ts < start_time:
-                        continue
-                    if end_time and ts > end_time:
-                        continue
-                    if event_filter and entry.get("event") != event_filter:
+            filtered_logs = list(self._iter_logs(start_time, end_time, event_filter, limit))
+        except Exception as e:
+            raise Exception("Error reading log file") from e
+        filtered_logs.reverse()
+        return filtered_logs
+
+    def get_logs_page(self, start_param=None, end_param=None, event_filter=None, limit=100, cursor=None):
+        """
+        Eine Seite passender Eintraege als LogPage (neueste zuerst, wird erst beim Iterieren gelesen).
+        Mit cursor geht es direkt vor dem aeltesten Eintrag der vorherigen Seite weiter.
+        """
+        start_time, end_time = self._parse_range(start_param, end_param)
+        cursor_ts, skip = decode_cursor(cursor) if cursor else (None, 0)
+        if cursor_ts is not None:
+            if end_time and end_time < cursor_ts:
+                cursor_ts, skip = None, 0
+            else:
+                end_time = cursor_ts
+        return LogPage(self._iter_logs(start_time, end_time, event_filter, limit + skip),
+                       limit, cursor_ts, skip)
+
+    def get_logs_since(self, since, start_param=None, end_param=None, event_filter=None, limit=100):
+        """
+        Die aeltesten limit Eintraege strikt nach since (aelteste zuerst) als
+        {"entries", "cursor", "more"} (siehe since_page).
+        """
+        start_time, end_time = self._parse_range(start_param, end_param)
+        try:
+            return since_page(self.iter_after(since, start_time, end_time, event_filter), since, limit)
+        except Exception as e:
+            raise Exception("Error reading log file") from e
+
+    def iter_after(self, after, start_time=None, end_time=None, event_filter=None):
+        """
+        Generator: passende Eintraege strikt nach after, aelteste zuerst. Vorwaertsscan ab
+        after, aus dem Ringpuffer, wenn dieser den Bereich sicher abdeckt.
+        """
+        lower = max(after, start_time or after)
+        logging_service = self._live_logging_service()
+        if logging_service is not None:
+            recent = logging_service.recent_entries(event_filter, lower, end_time, sys.maxsize)
+            if recent is not None:
+                yield from (entry for entry in reversed(recent) if entry["timestamp"] > after)
+                return
+        for entry in self.iter_range(lower, end_time, event_filter):
+            if entry["timestamp"] > after:
+                yield entry
+
+    def _iter_logs(self, start_time, end_time, event_filter, limit):
+        """
+        Generator: bis zu limit passende Eintraege, neueste zuerst.
+        """
+        logging_service = self._live_logging_service()
+        if logging_service is not None:
+            # Juengste Eintraege ohne Plattenzugriff aus dem Ringpuffer
+            recent = logging_service.recent_entries(event_filter, start_time, end_time, limit)
+            if recent is not None:
+                yield from recent
+                return
+        store = self._sqlite_store()
+        if store is not None:
+            yield from store.query(start_time, end_time, event_filter, limit)
+            return
+        remaining = limit
+        # Vom aktiven Segment rueckwaerts durch die rotierten (ggf. komprimierten) Segmente
+        for segment in reversed(log_segments.list_segments(self._log_file())):
+            if remaining <= 0:
+                break
+            if end_time and segment.start is not None and segment.start > end_time:
+                continue
+            if start_time and segment.end is not None and segment.end <= start_time:
+                break
+            for entry in self._read_segment(segment, start_time, end_time, event_filter, remaining):
+                remaining -= 1
+                yield entry
+
+    def _status_ring(self):
+        """
+        Der laufende LoggingService, wenn sein Ringpuffer jede Messung enthaelt, sonst None.
+        Im Totband-Modus enthaelt nur der Telemetriespeicher jede Messung.
+        """
+        logging_service = self._live_logging_service()
+        if logging_service is not None and logging_service.options.get("status_mode") == "every_tick":
+            return logging_service
+        return None
+
+    def get_status_history(self, limit=100):
+        """
+        Die letzten limit status_update-Eintraege (aelteste zuerst) fuer das Dashboard.
+        Kommt aus dem Ringpuffer des laufenden LoggingService, sonst aus dem binaeren
+        Telemetriespeicher, falls vorhanden, sonst aus dem Log.
+        """
+        logging_service = self._status_ring()
+        if logging_service is not None:
+            recent = logging_service.recent_entries("status_update", limit=limit)
+            if recent is not None:
+                recent.reverse()
+                return recent
+        store = TelemetryStore(TelemetryStore.path_for(self._log_file()))
+        if len(store):
+            return store.latest(limit)
+        try:
+            logs = list(self._iter_logs(None, None, "status_update", limit))
+        except Exception as e:
+            raise Exception("Error reading log file") from e
+        logs.reverse()
+        return logs
+
+    def get_status_since(self, since, limit=100):
+        """
+        Die aeltesten limit status_update-Eintraege strikt nach since fuer das
+        inkrementelle Nachladen des Dashboards, als {"entries", "cursor", "more"}.
+        Gleiche Quellen wie get_status_history.
+        """
+        logging_service = self._status_ring()
+        if logging_service is not None:
+            recent = logging_service.recent_entries("status_update", start_time=since, limit=sys.maxsize)
+            if recent is not None:
+                newer = (entry for entry in reversed(recent) if entry["timestamp"] > since)
+                return since_page(newer, since, limit)
+        store = TelemetryStore(TelemetryStore.path_for(self._log_file()))
+        if len(store):
+            return since_page(store.iter_after(since), since, limit)
+        try:
+            return since_page(self.iter_after(since, event_filter="status_update"), since, limit)
+        except Exception as e:
+            raise Exception("Error reading log file") from e
+
+    def get_status_series(self, start_param, end_param=None, step=60, max_points=5000):
+        """
+        Rekonstruiert aus den (im Totband-Modus spaerlichen) status_update-Eintraegen eine
+        Treppenfunktion mit festem Raster: jeder Rasterpunkt traegt den zuletzt
+        geschriebenen Status. Liefert Eintraege im Format von /api/dashboard.
+        """
+        start_time, end_time = self._parse_range(start_param, end_param)
+        if start_time is None:
+            raise ValueError("start is required")
+        end_time = end_time or time.time()
+        if step <= 0 or (end_time - start_time) / step > max_points:
+            raise ValueError("Too many points, increase step")
+
+        # Gueltiger Status zu Beginn: letzte Messung vor start
+        before = self.get_filtered_logs(end_param=_isoformat(start_time), event_filter="status_update", limit=1)
+        current = before[-1] if before else None
+        series = []
+        grid = start_time
+
+        def fill_until(ts):
+            # Rasterpunkte vor ts tragen den bisher gueltigen Status
+            nonlocal grid
+            while grid <= end_time and grid < ts:
+                if current is not None:
+                    series.append({"event": "status_update", "status": current.get("status"),
+                                   "timestamp": grid, "sample_timestamp": current["timestamp"]})
+                grid += step
+
+        try:
+            # Vorwaerts gestreamt: nur die jeweils letzte Messung wird gehalten
+            for sample in self.iter_range(start_time, end_time, "status_update"):
+                fill_until(sample["timestamp"])
+                current = sample
+        except Exception as e:
+            raise Exception("Error reading log file") from e
+        fill_until(math.inf)
+        return series
+
+    def get_history(self, start_param=None, end_param=None, resolution=None, max_points=1000):
+        """
+        Verdichteter Verlauf aus der passenden Rollup-Stufe; Standard sind die letzten 24 Stunden.
+        """
+        start_time, end_time = self._parse_range(start_param, end_param)
+        end_time = end_time or time.time()
+        start_time = start_time or end_time - 86400
+        if start_time >= end_time:
+            raise ValueError("start must be before end")
+        rollups = getattr(self.logging_service, "rollups", None)
+        if rollups is None:
+            # Ohne laufenden LoggingService nur die abgeschlossenen Fenster lesen
+            rollups = RollupStore(self._log_file())
+        return rollups.query(start_time, end_time, resolution, max_points)
+
+    def iter_range(self, start_time=None, end_time=None, event_filter=None):
+        """
+        Generator: alle passenden Eintraege im Bereich, aelteste zuerst, mit konstantem Speicherbedarf
+        (immer sequentiell; der parallele Scan puffert ganze Teilbereiche).
+        """
+        store = self._sqlite_store()
+        if store is not None:
+            yield from store.iter_range(start_time, end_time, event_filter)
+            return
+        for segment in log_segments.list_segments(self._log_file()):
+            if end_time and segment.start is not None and segment.start > end_time:
+                break
+            if start_time and segment.end is not None and segment.end <= start_time:
+                continue
+            lo, hi, offsets = self._segment_plan(segment, start_time, end_time, event_filter)
+            try:
+                if offsets is not None:
+                    yield from self._scan_postings_forward(segment, offsets, start_time, end_time, event_filter)
+                else:
+                    yield from self._scan_forward(segment, lo, hi, start_time, end_time, event_filter)
+            except FileNotFoundError:
+                # Segment wurde waehrend des Lesens komprimiert oder geloescht
+                continue
+
+    def export_csv(self, start_param=None, end_param=None, event_filter=None, rows_per_chunk=500):
+        """
+        Liefert einen Generator, der den Bereich als CSV (aelteste zuerst) in Textstuecken
+        erzeugt. Der Bereich wird sofort geprueft, gelesen wird erst beim Iterieren.
+        """
+        start_time, end_time = self._parse_range(start_param, end_param)
+
+        def generate():
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(CSV_COLUMNS)
+            rows = 0
+            for entry in self.iter_range(start_time, end_time, event_filter):
+                writer.writerow(csv_row(entry))
+                rows += 1
+                if rows >= rows_per_chunk:
+                    yield buffer.getvalue()
+                    buffer.seek(0)
+                    buffer.truncate()
+                    rows = 0
+            yield buffer.getvalue()
+
+        return generate()
+
+    def get_aggregate(self, field, bucket, aggregates=("mean", "min", "max"), start_param=None,
+                      end_param=None, event_filter=None, max_buckets=5000):
+        """
+        Aggregiert ein numerisches Feld (Punktpfad, z. B. "status.difference") in Zeitfenstern
+        von bucket Sekunden, in einem Durchlauf ueber den Bereich. Standard sind die letzten 24 Stunden.
+        """
+        aggregates = tuple(aggregates)
+        unknown = [a for a in aggregates if a not in self.AGGREGATES]
+        if unknown or not aggregates:
+            raise ValueError(f"Invalid aggregate: {', '.join(unknown) or '(none)'}")
+        if not field:
+            raise ValueError("field is required")
+        if bucket <= 0:
+            raise ValueError("bucket must be positive")
+        start_time, end_time = self._parse_range(start_param, end_param)
+        end_time = end_time or time.time()
+        start_time = start_time or end_time - 86400
+        if start_time >= end_time:
+            raise ValueError("start must be before end")
+        first = start_time - start_time % bucket
+        count = int(math.ceil((end_time - first) / bucket)) or 1
+        if count > max_buckets:
+            raise ValueError("Too many buckets, increase bucket")
+
+        # Ein Eintrag je Fenster in flachen Arrays statt eines Dicts pro Messung
+        counts = array("L", bytes(array("L").itemsize * count))
+        sums = array("d", [0.0]) * count
+        mins = array("d", [math.inf]) * count
+        maxs = array("d", [-math.inf]) * count
+        path = field.split(".")
+        try:
+            # Vorwaerts mit konstantem Speicher (auch durch komprimierte Segmente)
+            for entry in self.iter_range(start_time, end_time, event_filter):
+                value = entry
+                for key in path:
+                    value = value.get(key) if isinstance(value, dict) else None
+                if not isinstance(value, (int, float)) or isinstance(value, bool):
+                    continue
+                i = int((entry["timestamp"] - first) // bucket)
+                if not 0 <= i < count:
+                    continue
+                counts[i] += 1
+                sums[i] += value
+                if value < mins[i]:
+                    mins[i] = value
+                if value > maxs[i]:
+                    maxs[i] = value
+        except Exception as e:
+            raise Exception("Error reading log file") from e
+
+        buckets = []
+        for i in range(count):
+            n = counts[i]
+            values = {"count": n, "sum": round(sums[i], 4),
+                      "mean": round(sums[i] / n, 4) if n else None,
+                      "min": mins[i] if n else None, "max": maxs[i] if n else None}
+            row = {"start": first + i * bucket}
+            row.update((agg, values[agg]) for agg in aggregates)
+            buckets.append(row)
+        return {"field": field, "bucket": bucket, "start": start_time, "end": end_time, "buckets": buckets}
+
+    def _segment_plan(self, segment, start_time, end_time, event_filter):
+        """
+        Bestimmt ueber die Indizes, was in einem Segment zu lesen ist: den Byte-Bereich
+        (lo, hi) um [start, end] und bei seltenen Ereignissen die Posting-Liste darin (sonst None).
+        """
+        lo, hi = 0, None
+        if start_time or end_time:
+            index = load_time_index(segment)
+            if index is not None:
+                lo, hi = index.lookup(start_time, end_time)
+        if event_filter:
+            # Seltene Ereignisse direkt ueber ihre Posting-Liste lesen statt das Segment zu scannen
+            events = load_event_index(segment)
+            if events is not None and events.count(event_filter) * 4 < sum(events.counts().values()):
+                offsets = events.offsets(event_filter)
+                first = bisect_left(offsets, lo)
+                last = bisect_left(offsets, hi) if hi is not None else len(offsets)
+                return lo, hi, offsets[first:last]
+        return lo, hi, None
+
+    def _read_segment(self, segment, start_time, end_time, event_filter, limit):
+        """
+        Generator: bis zu limit passende Eintraege eines Segments, neueste zuerst.
+        Ueber den Zeitindex wird nur der Byte-Bereich um [start, end] gelesen.
+        """
+        lo, hi, offsets = self._segment_plan(segment, start_time, end_time, event_filter)
+        if offsets is not None:
+            yield from self._read_postings(segment, offsets, start_time, end_time, event_filter, limit)
+            return
+        f = self._open_plain(segment)
+        if f is not None:
+            with f:
+                ranges = self._parallel_ranges(f, lo, hi) if limit <= self.PARALLEL_MAX_LIMIT else None
+                if ranges is not None:
+                    yield from self._scan_parallel(segment, reversed(ranges), start_time, end_time,
+                                                   event_filter, limit)
+                else:
+                    yield from self._read_plain_backwards(f, lo, hi, start_time, end_time, event_filter, limit)
+            return
+        # Komprimierte Segmente lassen sich nur vorwaerts lesen: die letzten Treffer behalten
+        matches = deque(self._scan_forward(segment, lo, hi, start_time, end_time, event_filter), maxlen=limit)
+        yield from reversed(matches)
+
+    def _parallel_ranges(self, f, lo, hi):
+        """
+        Teilbereiche fuer einen parallelen Scan von [lo, hi) der geoeffneten Datei f,
+        oder None, wenn der Bereich unter der Schwelle liegt bzw. nur ein Prozess zur Verfuegung steht.
+        """
+        options = self.parameter_service.get_config().get("logging", {})
+        threshold = options.get("parallel_scan_threshold", self.PARALLEL_SCAN_THRESHOLD)
+        workers = options.get("parallel_scan_workers") or os.cpu_count() or 1
+        if hi is None:
+            hi = os.fstat(f.fileno()).st_size
+        if not threshold or workers < 2 or hi - lo < threshold:
+            return None
+        # Mehrere Teilbereiche pro Prozess, damit ein Scan mit limit frueh aufhoeren kann
+        chunk_size = min(self.PARALLEL_MAX_CHUNK, max(self.PARALLEL_MIN_CHUNK, (hi - lo) // (workers * 4)))
+        return split_ranges(f, lo, hi, chunk_size)
+
+    def _executor(self):
+        with self._pool_lock:
+            if self._pool is None:
+                options = self.parameter_service.get_config().get("logging", {})
+                workers = options.get("parallel_scan_workers") or os.cpu_count() or 1
+                # "spawn": der Pool wird aus einem Prozess mit laufenden Threads gestartet
+                self._pool = ProcessPoolExecutor(max_workers=workers,
+                                                 mp_context=multiprocessing.get_context("spawn"))
+                self._pool_workers = workers
+            return self._pool
+
+    def _scan_parallel(self, segment, ranges, start_time, end_time, event_filter, limit):
+        """
+        Generator: liest die absteigenden Teilbereiche im Prozesspool und liefert die neuesten
+        limit Eintraege, neueste zuerst (wie _read_plain_backwards). Jeder Teilbereich liefert
+        hoechstens limit Eintraege; es sind hoechstens zwei Teilbereiche pro Prozess
+        gleichzeitig in Arbeit.
+        """
+        pool = self._executor()
+        ranges = iter(ranges)
+        pending = deque()
+
+        def submit_next():
+            for lo, hi in islice(ranges, 1):
+                pending.append(pool.submit(scan_range, segment.path, lo, hi, start_time, end_time,
+                                           event_filter, limit))
+
+        for _ in range(self._pool_workers * 2):
+            submit_next()
+        remaining = limit
+        try:
+            while pending:
+                entries = pending.popleft().result()
+                submit_next()
+                for entry in reversed(entries):
+                    yield entry
+                    remaining -= 1
+                    if remaining <= 0:
+                        return
+        finally:
+            for future in pending:
+                future.cancel()
+
+    def _scan_forward(self, segment, lo, hi, start_time, end_time, event_filter):
+        """
+        Generator: passende Eintraege im Byte-Bereich [lo, hi) eines Segments, aelteste zuerst.
+        """
+        with log_segments.open_segment(segment, "rb") as f:
+            if lo:
+                f.seek(lo)
+            offset = lo
+            for line in f:
+                if hi is not None and offset >= hi:
+                    break
+                offset += len(line)
+                entry = self._match(line, start_time, end_time, event_filter)
+                if entry is not None:
+                    yield entry
+
+    def _scan_postings_forward(self, segment, offsets, start_time, end_time, event_filter):
+        with log_segments.open_segment(segment, "rb") as f:
+            for offset in offsets:
+                f.seek(offset)
+                entry = self._match(f.readline(), start_time, end_time, event_filter)
+                if entry is not None:
+                    yield entry
+
+    def _open_plain(self, segment):
+        """
+        Oeffnet ein unkomprimiertes Segment; None, wenn es komprimiert ist oder inzwischen wurde.
+        """
+        if segment.compression is not None:
+            return None
+        try:
+            return open(segment.path, "rb")
+        except FileNotFoundError:
+            return None
+
+    def _read_postings(self, segment, offsets, start_time, end_time, event_filter, limit):
+        """
+        Generator: genau die Zeilen an den gegebenen Offsets, neueste zuerst.
+        """
+        f = self._open_plain(segment)
+        if f is not None:
+            found = 0
+            with f:
+                for offset in reversed(offsets):
+                    f.seek(offset)
+                    entry = self._match(f.readline(), start_time, end_time, event_filter)
+                    if entry is None:
                         continue
-                    filtered_logs.append(entry)
-                    if len(filtered_logs) >= limit:
+                    yield entry
+                    found += 1
+                    if found >= limit:
                         break
+            return
+        # Komprimiert: nur vorwaerts springen
+        matches = deque(self._scan_postings_forward(segment, offsets, start_time, end_time, event_filter),
+                        maxlen=limit)
+        yield from reversed(matches)
+
+    def get_event_counts(self):
+        """
+        Anzahl Eintraege pro Ereignis ueber alle Segmente, direkt aus den Ereignisindizes.
+        """
+        store = self._sqlite_store()
+        if store is not None:
+            try:
+                return store.event_counts()
+            except Exception as e:
+                raise Exception("Error reading log file") from e
+
+        log_file = self._log_file()
+        counts = Counter()
+        try:
+            for segment in log_segments.list_segments(log_file):
+                events = load_event_index(segment)
+                if events is not None:
+                    counts.update(events.counts())
+                    continue
+                # Aktives Segment ohne Index (Writer laeuft nicht): einmal scannen
+                with log_segments.open_segment(segment, "rb") as f:
+                    counts.update(event for event in map(extract_event, f) if event)
         except Exception as e:
             raise Exception("Error reading log file") from e
+        return dict(counts)
 
-        filtered_logs.reverse()
-        return filtered_logs
+    def _read_plain_backwards(self, f, lo, hi, start_time, end_time, event_filter, limit):
+        if hi is None:
+            hi = os.fstat(f.fileno()).st_size
+        found = 0
+        # Kein Abbruch am ersten aelteren Eintrag: ohne RTC kann die Uhr springen, die
+        # Zeitstempel im Segment sind nicht sicher monoton. Die Untergrenze lo kommt aus dem Zeitindex.
+        for line in log_segments.iter_lines_backwards(f, lo, hi):
+            entry = self._match(line, start_time, end_time, event_filter)
+            if entry is None:
+                continue
+            yield entry
+            found += 1
+            if found >= limit:
+                break
+
+    def _match(self, line, start_time, end_time, event_filter):
+        return match_line(line, start_time, end_time, event_filter)
@@ -0,0 +1,297 @@
+# services/log_segments.py
+"""
+Hilfsfunktionen fuer die segmentierte Ablage des Event-Logs.
+
+Die aktive Logdatei (z. B. "log.json") wird beim Wechsel der Zeitperiode
+umbenannt in "log-<Periode>.json" (Periode in UTC, z. B. "20250301T0000Z")
+und anschliessend im Hintergrund mit gzip oder lzma komprimiert.
+Ueberschreitet die Gesamtgroesse das Budget, werden die aeltesten Segmente
+ausgeduennt (nur noch jede n-te status_update-Zeile) oder geloescht.
+"""
+import gzip, lzma, json, os, re, shutil, logging
+from datetime import datetime, timezone
+
+logger = logging.getLogger(__name__)
+
+ROTATION_INTERVALS = {"hour": 3600, "day": 86400}
+COMPRESSION_SUFFIXES = {"gzip": ".gz", "lzma": ".xz"}
+LABEL_FORMAT = "%Y%m%dT%H%MZ"
+# Endungen der Sidecar-Indizes (siehe services/log_index.py), die mit dem Segment wandern
+SIDECAR_SUFFIXES = (".tsidx", ".events")
+# Blockgroesse beim Rueckwaertslesen
+BLOCK_SIZE = 64 * 1024
+
+
+class LogSegment:
+    def __init__(self, path, start, end=None, compression=None, thinned=False, active=False):
+        self.path = path
+        # Zeitbereich [start, end) des Segments; end=None fuer das aktive Segment
+        self.start = start
+        self.end = end
+        self.compression = compression
+        self.thinned = thinned
+        self.active = active
+
+    def size(self):
+        try:
+            return os.path.getsize(self.path)
+        except OSError:
+            return 0
+
+
+def rotation_interval(rotation):
+    """
+    Liefert die Segmentlaenge in Sekunden ("hour", "day" oder Zahl); None = keine Rotation.
+    """
+    if rotation in (None, "none", 0):
+        return None
+    if rotation in ROTATION_INTERVALS:
+        return ROTATION_INTERVALS[rotation]
+    return int(rotation)
+
+
+def period_start(ts, interval):
+    return ts - (ts % interval)
+
+
+def _split_name(log_file):
+    directory, base = os.path.split(log_file)
+    stem, ext = os.path.splitext(base)
+    return directory, stem, ext
+
+
+def rotated_path(log_file, start, thinned=False):
+    """
+    Pfad eines rotierten (noch unkomprimierten) Segments, das bei start beginnt.
+    """
+    directory, stem, ext = _split_name(log_file)
+    label = datetime.fromtimestamp(start, tz=timezone.utc).strftime(LABEL_FORMAT)
+    return os.path.join(directory, f"{stem}-{label}{'.thin' if thinned else ''}{ext}")
+
+
+def sidecar_path(segment_path, suffix):
+    """
+    Pfad einer Sidecar-Datei; unabhaengig davon, ob das Segment komprimiert ist.
+    """
+    for compressed_suffix in COMPRESSION_SUFFIXES.values():
+        if segment_path.endswith(compressed_suffix):
+            segment_path = segment_path[:-len(compressed_suffix)]
+            break
+    return segment_path + suffix
+
+
+def move_sidecars(segment_path, target_path):
+    for suffix in SIDECAR_SUFFIXES:
+        source = sidecar_path(segment_path, suffix)
+        if os.path.exists(source):
+            os.replace(source, sidecar_path(target_path, suffix))
+
+
+def remove_sidecars(segment_path):
+    for suffix in SIDECAR_SUFFIXES:
+        path = sidecar_path(segment_path, suffix)
+        try:
+            if os.path.isdir(path):
+                shutil.rmtree(path)
+            else:
+                os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def _segment_pattern(log_file):
+    _, stem, ext = _split_name(log_file)
+    return re.compile(rf"^{re.escape(stem)}-(\d{{8}}T\d{{4}}Z)(\.thin)?{re.escape(ext)}(\.gz|\.xz)?$")
+
+
+def read_first_timestamp(path):
+    """
+    Liest den Zeitstempel der ersten gueltigen Zeile (fuer das aktive Segment).
+    """
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    return json.loads(line)["timestamp"]
+                except (ValueError, KeyError, TypeError):
+                    continue
+    except OSError:
+        pass
+    return None
+
+
+def list_segments(log_file):
+    """
+    Liefert alle Segmente aufsteigend nach Startzeit; das aktive Segment steht am Ende.
+    """
+    directory, _, _ = _split_name(log_file)
+    pattern = _segment_pattern(log_file)
+    found = {}
+    try:
+        names = os.listdir(directory or ".")
+    except OSError:
+        names = []
+    for name in names:
+        match = pattern.match(name)
+        if not match:
+            continue
+        start = datetime.strptime(match.group(1), LABEL_FORMAT).replace(tzinfo=timezone.utc).timestamp()
+        suffix = match.group(3)
+        compression = {v: k for k, v in COMPRESSION_SUFFIXES.items()}.get(suffix)
+        segment = LogSegment(os.path.join(directory, name), start, compression=compression,
+                             thinned=bool(match.group(2)))
+        # Waehrend der Komprimierung existieren kurz beide Varianten: unkomprimiert bevorzugen
+        if start in found and found[start].compression is None:
+            continue
+        found[start] = segment
+    segments = [found[k] for k in sorted(found)]
+    if os.path.exists(log_file):
+        segments.append(LogSegment(log_file, read_first_timestamp(log_file), active=True))
+    for current, following in zip(segments, segments[1:]):
+        current.end = following.start
+    return segments
+
+
+def open_segment(segment, mode="rt"):
+    """
+    Oeffnet ein Segment passend zu seiner Kompression. Wurde es inzwischen
+    komprimiert, wird die komprimierte Variante geoeffnet.
+    """
+    candidates = [(segment.path, segment.compression)]
+    if segment.compression is None and not segment.active:
+        candidates += [(segment.path + suffix, name) for name, suffix in COMPRESSION_SUFFIXES.items()]
+    for path, compression in candidates:
+        try:
+            return _open(path, compression, mode)
+        except FileNotFoundError:
+            continue
+    raise FileNotFoundError(segment.path)
+
+
+def open_path(path, mode="rt"):
+    """
+    Oeffnet eine Logdatei; die Kompression ergibt sich aus der Endung.
+    """
+    compression = next((name for name, suffix in COMPRESSION_SUFFIXES.items() if path.endswith(suffix)), None)
+    return _open(path, compression, mode)
+
+
+def iter_lines_backwards(f, lo, hi, block_size=BLOCK_SIZE):
+    """
+    Liefert die Zeilen (bytes) im Bereich [lo, hi) einer Binaerdatei von hinten nach vorne.
+    lo muss ein Zeilenanfang sein.
+    """
+    pos = hi
+    tail = b""
+    while pos > lo:
+        size = min(block_size, pos - lo)
+        pos -= size
+        f.seek(pos)
+        lines = (f.read(size) + tail).split(b"\n")
+        # Der erste Teil kann eine angeschnittene Zeile sein
+        tail = lines[0]
+        for line in reversed(lines[1:]):
+            if line:
+                yield line
+    if tail:
+        yield tail
+
+
+def _open(path, compression, mode):
+    kwargs = {"encoding": "utf-8"} if "t" in mode else {}
+    if compression == "gzip":
+        return gzip.open(path, mode, **kwargs)
+    if compression == "lzma":
+        return lzma.open(path, mode, **kwargs)
+    return open(path, mode.replace("t", ""), **kwargs)
+
+
+def compress_segment(segment, compression):
+    """
+    Komprimiert ein rotiertes Segment ueber eine temporaere Datei und ersetzt es danach atomar.
+    """
+    if segment.active or segment.compression is not None or compression not in COMPRESSION_SUFFIXES:
+        return segment
+    target = segment.path + COMPRESSION_SUFFIXES[compression]
+    tmp = target + ".tmp"
+    with open(segment.path, "rb") as src, _open(tmp, compression, "wb") as dst:
+        while True:
+            chunk = src.read(1024 * 1024)
+            if not chunk:
+                break
+            dst.write(chunk)
+    os.replace(tmp, target)
+    os.remove(segment.path)
+    return LogSegment(target, segment.start, segment.end, compression, segment.thinned)
+
+
+def thin_segment(segment, log_file, thin_interval, compression):
+    """
+    Duennt ein Segment aus: alle Ereignisse bleiben erhalten, status_update-Zeilen
+    nur noch eine pro thin_interval Sekunden.
+    """
+    suffix = COMPRESSION_SUFFIXES.get(compression, "")
+    target = rotated_path(log_file, segment.start, thinned=True) + suffix
+    tmp = target + ".tmp"
+    last_kept = None
+    with open_segment(segment, "rt") as src, _open(tmp, compression if suffix else None, "wt") as dst:
+        for line in src:
+            if '"status_update"' in line:
+                try:
+                    ts = json.loads(line)["timestamp"]
+                except (ValueError, KeyError, TypeError):
+                    continue
+                if last_kept is not None and ts - last_kept < thin_interval:
+                    continue
+                last_kept = ts
+            dst.write(line)
+    os.replace(tmp, target)
+    if target != segment.path:
+        os.remove(segment.path)
+    # Offsets stimmen nach dem Ausduennen nicht mehr
+    remove_sidecars(segment.path)
+
+
+def run_maintenance(log_file, compression, max_total_size, budget_policy, thin_interval):
+    """
+    Komprimiert alle rotierten Segmente und setzt das Groessenbudget durch.
+    """
+    for segment in list_segments(log_file):
+        if not segment.active and segment.compression is None:
+            try:
+                compress_segment(segment, compression)
+            except OSError as e:
+                logger.error("Error compressing log segment %s: %s", segment.path, e)
+
+    if not max_total_size:
+        return
+    segments = list_segments(log_file)
+    total = sum(s.size() for s in segments)
+    if budget_policy == "thin":
+        # Erst die aeltesten Segmente ausduennen ...
+        for segment in segments:
+            if total <= max_total_size:
+                return
+            if segment.active or segment.thinned:
+                continue
+            size = segment.size()
+            try:
+                thin_segment(segment, log_file, thin_interval, compression)
+            except OSError as e:
+                logger.error("Error thinning log segment %s: %s", segment.path, e)
+                continue
+            thinned = [s for s in list_segments(log_file) if s.start == segment.start]
+            total -= size - (thinned[0].size() if thinned else 0)
+        segments = list_segments(log_file)
+    # ... und wenn das nicht reicht, die aeltesten loeschen
+    for segment in segments:
+        if total <= max_total_size or segment.active:
+            break
+        size = segment.size()
+        try:
+            os.remove(segment.path)
+            remove_sidecars(segment.path)
+            total -= size
+            logger.info("Dropped log segment %s to stay within size budget", segment.path)
+        except OSError as e:
+            logger.error("Error dropping log segment %s: %s", segment.path, e)
@@ -1,18 +1,566 @@
-import json, time, threading
+import json, time, threading, os, struct, sqlite3, heapq, logging, atexit
+from collections import deque
+from services import log_segments
+from services.log_index import SparseTimeIndex, EventIndex
+from services.telemetry_store import TelemetryStore, pack_status, RECORD as TELEMETRY_RECORD
+from services.rollup_store import RollupStore, DEFAULT_TIERS
+from services.deadband_filter import DeadbandFilter
+from services.sqlite_log_backend import SqliteLogStore
+
+logger = logging.getLogger(__name__)
+
 
 class LoggingService:
-    def __init__(self, log_file):
+    """
+    Schreibt Log-Eintraege als JSON-Zeilen in eine Logdatei.
+
+    Die Aufrufer (Regelungs-Loop, Flask-Threads) legen die Eintraege nur in
+    eine begrenzte Warteschlange; ein Hintergrund-Thread schreibt sie
+    gebuendelt (Group Commit) ueber ein dauerhaft offenes Dateihandle.
+    Eine langsame SD-Karte kann die Regelung so nie blockieren.
+
+    Die Logdatei wird pro Zeitperiode (Stunde/Tag) in Segmente rotiert, die ein
+    Wartungs-Thread komprimiert und innerhalb eines Groessenbudgets haelt
+    (siehe services/log_segments.py). Zu jedem Segment pflegt der Writer
+    einen duennen Zeitindex und Posting-Listen pro Ereignis (siehe services/log_index.py).
+    Die Messwerte der status_update-Eintraege landen zusaetzlich im binaeren
+    Telemetriespeicher (siehe services/telemetry_store.py) und in die
+    Verdichtungsstufen fuer lange Zeitraeume (siehe services/rollup_store.py).
+    Mit "backend": "sqlite" gehen die Zeilen statt in die Segmente gebuendelt in
+    eine SQLite-Datenbank (siehe services/sqlite_log_backend.py).
+    Die zuletzt geschriebenen Eintraege haelt der Writer pro Ereignis in einem
+    Ringpuffer, aus dem das Dashboard ohne Dateizugriff bedient wird (recent_entries).
+    """
+
+    # Standardwerte fuer den Abschnitt "logging" in config.json
+    DEFAULT_OPTIONS = {
+        "batch_size": 50,               # Batch wird spaetestens bei dieser Groesse geschrieben ...
+        "flush_interval": 1.0,          # ... oder nach so vielen Sekunden
+        "fsync": "interval",            # "always", "interval" oder "never"
+        "fsync_interval": 30.0,         # Sekunden zwischen zwei fsync bei "interval"
+        "queue_size": 10000,            # max. Anzahl wartender Eintraege
+        "overflow_policy": "drop_oldest",  # "drop_oldest", "drop_newest" oder "block"
+        "block_timeout": 0.5,           # max. Wartezeit bei "block", danach wird verworfen
+        "rotation": "day",              # "hour", "day", Sekunden oder "none"
+        "compression": "gzip",          # "gzip", "lzma" oder "none" fuer rotierte Segmente
+        "max_total_size_mb": 500,       # Budget fuer alle Segmente zusammen (0 = unbegrenzt)
+        "budget_policy": "thin",        # "thin" (erst ausduennen) oder "drop"
+        "thin_interval": 300,           # ausgeduennt: eine status_update-Zeile pro x Sekunden
+        "maintenance_interval": 600,    # Sekunden zwischen zwei Budget-Pruefungen
+        "index_stride": 4096,           # Bytes zwischen zwei Punkten im Zeitindex
+        "telemetry": True,              # status_update zusaetzlich binaer speichern
+        "telemetry_max_records": 2592000,  # ca. 30 Tage bei 1 Hz (0 = unbegrenzt)
+        "rollups": True,                # Verdichtungsstufen fuer /api/history pflegen
+        "rollup_tiers": [list(t) for t in DEFAULT_TIERS],  # [Sekunden, Aufbewahrung in Tagen]
+        "status_mode": "every_tick",    # "every_tick" oder "deadband" (nur Aenderungen ins Log)
+        "deadbands": {},                # Totband je Feld, ergaenzt DEFAULT_DEADBANDS
+        "heartbeat_interval": 300,      # im Totband-Modus spaetestens alle x Sekunden schreiben
+        "backend": "file",              # "file" (JSON-Segmente) oder "sqlite"
+        "sqlite_file": "",              # Datenbankpfad; leer = "<log>.db"
+        "recent_size": 500,             # Eintraege pro Ereignis im Ringpuffer
+        "recent_seed_lines": 20000,     # beim Start hoechstens so viele Zeilen vom Log-Ende laden
+    }
+
+    OVERFLOW_POLICIES = ("drop_oldest", "drop_newest", "block")
+    FSYNC_POLICIES = ("always", "interval", "never")
+    STATUS_MODES = ("every_tick", "deadband")
+    BACKENDS = ("file", "sqlite")
+
+    def __init__(self, log_file, options=None):
         # Pfad zur Logdatei, z. B. "log.json"
         self.log_file = log_file
-        # Lock für Thread-Sicherheit
+        self.options = dict(self.DEFAULT_OPTIONS)
+        self.options.update({k: v for k, v in (options or {}).items() if k in self.DEFAULT_OPTIONS})
+        if self.options["overflow_policy"] not in self.OVERFLOW_POLICIES:
+            raise ValueError(f"Invalid overflow policy: {self.options['overflow_policy']}")
+        if self.options["fsync"] not in self.FSYNC_POLICIES:
+            raise ValueError(f"Invalid fsync policy: {self.options['fsync']}")
+        if self.options["status_mode"] not in self.STATUS_MODES:
+            raise ValueError(f"Invalid status mode: {self.options['status_mode']}")
+        if self.options["backend"] not in self.BACKENDS:
+            raise ValueError(f"Invalid logging backend: {self.options['backend']}")
+
+        # Lock + Condition schuetzen Warteschlange und Zaehler
         self.lock = threading.Lock()
+        self._cond = threading.Condition(self.lock)
+        self._pending = deque()
+        self._closing = False
+        self._flush_requested = False
+
+        # Zaehler fuer das Monitoring
+        self._accepted = 0        # angenommene Eintraege
+        self._settled = 0         # geschriebene + nachtraeglich verworfene Eintraege
+        self._written = 0
+        self._dropped = 0
+        self._batches = 0
+        self._write_errors = 0
+        self._max_queue_depth = 0
+        self._last_flush_latency = 0.0
+        self._max_flush_latency = 0.0
+        self._total_flush_latency = 0.0
+        # Schreibsequenz fuer bedingte GET-Anfragen; Startzeit unterscheidet Neustarts
+        self._started_at = time.time()
+        self._write_sequence = 0
+        self._last_write_time = self._started_at
+
+        self._file = None
+        self._offset = 0
+        self._time_index = None
+        self._event_index = None
+        self._sqlite = None
+        if self.options["backend"] == "sqlite":
+            self._sqlite = SqliteLogStore(self.options["sqlite_file"] or SqliteLogStore.path_for(log_file),
+                                          "FULL" if self.options["fsync"] == "always" else "NORMAL")
+        self._telemetry = TelemetryStore(TelemetryStore.path_for(log_file)) if self.options["telemetry"] else None
+        self.rollups = RollupStore(log_file, self.options["rollup_tiers"]) if self.options["rollups"] else None
+        self._deadband = None
+        if self.options["status_mode"] == "deadband":
+            self._deadband = DeadbandFilter(self.options["deadbands"], self.options["heartbeat_interval"])
+        self._suppressed = 0
+        # Ringpuffer der zuletzt geschriebenen Eintraege je Ereignis (vom Writer gepflegt)
+        self._recent = {}
+        self._recent_lock = threading.Lock()
+        self._recent_since = None  # ab diesem Zeitstempel vollstaendig; None = noch nicht geladen
+        self._last_fsync = time.monotonic()
+        self._rotation_interval = log_segments.rotation_interval(self.options["rotation"])
+        self._active_period = None
+        self._rotations = 0
+
+        # Wartung (Komprimierung, Budget) laeuft einmal beim Start und nach jeder Rotation
+        self._maintenance_needed = threading.Event()
+        self._maintenance_needed.set()
+
+        self._writer = threading.Thread(target=self._writer_loop, name="log-writer", daemon=True)
+        self._writer.start()
+        self._maintenance = threading.Thread(target=self._maintenance_loop, name="log-maintenance", daemon=True)
+        self._maintenance.start()
+        atexit.register(self.close)
 
     def log(self, entry: dict):
         """
-        Ergaenzt den Eintrag um einen Zeitstempel und schreibt ihn als JSON-Zeile ins Logfile.
+        Ergaenzt den Eintrag um einen Zeitstempel und stellt ihn zum Schreiben bereit.
+        Gibt False zurueck, wenn der Eintrag wegen voller Warteschlange verworfen wurde.
         """
         entry["timestamp"] = time.time()
-        # Mit Lock absichern, damit keine zwei Threads gleichzeitig schreiben
-        with self.lock:
-            with open(self.log_file, "a") as f:
-                f.write(json.dumps(entry) + "\n")
+        # Sofort serialisieren: Aufrufer duerfen das Dict danach weiterverwenden
+        return self._enqueue([self._make_item(entry)]) == 1
+
+    def log_many(self, entries):
+        """
+        Schreibt mehrere Eintraege mit einem einzigen Zugriff auf die Warteschlange.
+        Gibt die Anzahl der angenommenen Eintraege zurueck.
+        """
+        items = []
+        for entry in entries:
+            entry["timestamp"] = time.time()
+            items.append(self._make_item(entry))
+        return self._enqueue(items)
+
+    def _make_item(self, entry):
+        """
+        Eintrag fuer die Warteschlange: (Zeitstempel, Ereignis, JSON-Zeile, Telemetrie-Datensatz,
+        Kopie des Eintrags fuer den Ringpuffer). Im Totband-Modus sind JSON-Zeile und Kopie None,
+        wenn sich der Status nicht nennenswert geaendert hat; Telemetrie und Rollups erhalten
+        trotzdem jede Messung.
+        """
+        record = None
+        if entry.get("event") == "status_update":
+            status = entry.get("status") or {}
+            if self._telemetry is not None or self.rollups is not None:
+                try:
+                    record = pack_status(entry["timestamp"], status)
+                except (TypeError, struct.error):
+                    record = None
+            if self._deadband is not None and not self._deadband.should_write(entry["timestamp"], status):
+                with self._cond:
+                    self._suppressed += 1
+                return (entry["timestamp"], entry.get("event"), None, record, None)
+        line = json.dumps(entry)
+        # Flache Kopie: der Aufrufer darf das Dict danach weiterverwenden
+        return (entry["timestamp"], entry.get("event"), line, record, dict(entry))
+
+    def _enqueue(self, items):
+        accepted = 0
+        policy = self.options["overflow_policy"]
+        max_size = self.options["queue_size"]
+        with self._cond:
+            for item in items:
+                if self._closing:
+                    self._dropped += 1
+                    continue
+                if len(self._pending) >= max_size:
+                    if policy == "drop_oldest":
+                        # Aeltesten Eintrag opfern, er gilt damit als erledigt
+                        self._pending.popleft()
+                        self._dropped += 1
+                        self._settled += 1
+                    elif policy == "block":
+                        deadline = time.monotonic() + self.options["block_timeout"]
+                        while len(self._pending) >= max_size and not self._closing:
+                            remaining = deadline - time.monotonic()
+                            if remaining <= 0:
+                                break
+                            self._cond.wait(remaining)
+                        if len(self._pending) >= max_size or self._closing:
+                            self._dropped += 1
+                            continue
+                    else:
+                        self._dropped += 1
+                        continue
+                self._pending.append(item)
+                self._accepted += 1
+                accepted += 1
+            depth = len(self._pending)
+            if depth > self._max_queue_depth:
+                self._max_queue_depth = depth
+            if accepted:
+                self._cond.notify_all()
+        return accepted
+
+    def _writer_loop(self):
+        """
+        Hintergrund-Thread: sammelt Eintraege, bis batch_size erreicht oder
+        flush_interval abgelaufen ist, und schreibt sie dann in einem Rutsch.
+        """
+        self._seed_recent()
+        while True:
+            with self._cond:
+                while not self._pending and not self._closing:
+                    self._cond.wait()
+                deadline = time.monotonic() + self.options["flush_interval"]
+                while (len(self._pending) < self.options["batch_size"]
+                       and not self._flush_requested and not self._closing):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                batch = list(self._pending)
+                self._pending.clear()
+                self._flush_requested = False
+                closing = self._closing
+                # Blockierte Produzenten aufwecken, es ist wieder Platz
+                self._cond.notify_all()
+
+            if batch:
+                self._write_batch(batch, force_fsync=closing)
+
+            with self._cond:
+                self._settled += len(batch)
+                self._cond.notify_all()
+                if closing and not self._pending:
+                    break
+
+    def _write_batch(self, items, force_fsync=False):
+        started = time.monotonic()
+        written = 0
+        try:
+            if self._sqlite is not None:
+                # Unterdrueckte Messungen (Totband) haben keine Zeile, zaehlen aber als erledigt
+                self._sqlite.insert_many([item[:3] for item in items if item[2] is not None])
+                written = len(items)
+            else:
+                chunk = []
+                for item in items:
+                    ts = item[0]
+                    # Beim Wechsel der Zeitperiode zuerst das aktive Segment abschliessen
+                    if self._needs_rotation(ts):
+                        written += self._write_lines(chunk)
+                        chunk = []
+                        self._rotate(ts)
+                    chunk.append(item)
+                written += self._write_lines(chunk)
+            self._remember(items)
+            records = [item[3] for item in items if item[3] is not None]
+            if self._telemetry is not None:
+                self._telemetry.append(records)
+            if self.rollups is not None:
+                for record in records:
+                    ts, *values, _, state = TELEMETRY_RECORD.unpack(record)
+                    self.rollups.add(ts, values, state)
+            policy = self.options["fsync"]
+            if (self._file is not None or self._sqlite is not None) and (
+                    force_fsync or policy == "always"
+                    or (policy == "interval" and started - self._last_fsync >= self.options["fsync_interval"])):
+                # SQLite synchronisiert selbst beim Commit (PRAGMA synchronous)
+                if self._file is not None:
+                    os.fsync(self._file.fileno())
+                if self._telemetry is not None:
+                    self._telemetry.fsync()
+                self._last_fsync = started
+        except (OSError, sqlite3.Error) as e:
+            logger.error("Error writing log batch to %s: %s", self.log_file, e)
+            self._close_file()
+        latency = time.monotonic() - started
+        with self._cond:
+            if written:
+                # Auch unterdrueckte Messungen zaehlen: sie aendern Telemetrie und Rollups
+                self._write_sequence += written
+                self._last_write_time = time.time()
+                # Unterdrueckte Messungen (Totband) zaehlen nicht als geschriebene Zeilen
+                self._written += written - sum(1 for item in items if item[2] is None)
+                self._batches += 1
+                self._last_flush_latency = latency
+                self._total_flush_latency += latency
+                self._max_flush_latency = max(self._max_flush_latency, latency)
+            if written < len(items):
+                self._write_errors += 1
+                self._dropped += len(items) - written
+
+    def _write_lines(self, items):
+        # Im Totband-Modus unterdrueckte Messungen haben keine Zeile, zaehlen aber als erledigt
+        lines = [item for item in items if item[2] is not None]
+        if not lines:
+            return len(items)
+        if self._file is None:
+            self._open_active()
+        # json.dumps erzeugt reines ASCII, Zeichen = Bytes
+        offset = self._offset
+        for ts, event, line, *_ in lines:
+            self._time_index.note(ts, offset)
+            self._event_index.note(event, offset)
+            offset += len(line) + 1
+        self._file.write(("\n".join(item[2] for item in lines) + "\n").encode("ascii"))
+        self._file.flush()
+        self._offset = offset
+        self._time_index.flush()
+        self._event_index.flush()
+        return len(items)
+
+    def _seed_recent(self):
+        """
+        Fuellt die Ringpuffer beim Start aus dem Ende des Logs (hoechstens recent_seed_lines Zeilen).
+        """
+        entries = []
+        failed = False
+        limit = self.options["recent_seed_lines"]
+        try:
+            if self._sqlite is not None:
+                entries = self._sqlite.query(limit=limit)
+            else:
+                with open(self.log_file, "rb") as f:
+                    for line in log_segments.iter_lines_backwards(f, 0, os.fstat(f.fileno()).st_size):
+                        if len(entries) >= limit:
+                            break
+                        try:
+                            entry = json.loads(line)
+                        except ValueError:
+                            continue
+                        if isinstance(entry, dict) and entry.get("timestamp") is not None:
+                            entries.append(entry)
+        except FileNotFoundError:
+            pass
+        except (OSError, sqlite3.Error) as e:
+            logger.error("Error loading recent log entries from %s: %s", self.log_file, e)
+            failed = True
+        # Ganzes Log geladen (keine rotierten Segmente, weniger als limit Zeilen): nichts fehlt
+        whole_log = not failed and len(entries) < limit and (
+            self._sqlite is not None or not any(not s.active for s in log_segments.list_segments(self.log_file)))
+        with self._recent_lock:
+            for entry in reversed(entries):
+                self._remember_entry(entry)
+            if whole_log:
+                self._recent_since = 0.0
+            else:
+                # Aeltere Eintraege liegen nur noch auf der Platte
+                self._recent_since = entries[-1]["timestamp"] if entries else time.time()
+
+    def _remember(self, items):
+        with self._recent_lock:
+            for item in items:
+                if item[4] is not None:
+                    self._remember_entry(item[4])
+
+    def _remember_entry(self, entry):
+        event = entry.get("event")
+        ring = self._recent.get(event)
+        if ring is None:
+            ring = self._recent[event] = deque(maxlen=self.options["recent_size"])
+        ring.append(entry)
+
+    def recent_entries(self, event_filter=None, start_time=None, end_time=None, limit=100):
+        """
+        Beantwortet eine Log-Abfrage aus den Ringpuffern (neueste zuerst, wie im Log geschrieben).
+        Geliefert werden Kopien, der Ringpuffer bleibt unveraendert.
+        Gibt None zurueck, wenn die Puffer nicht sicher alle passenden Eintraege enthalten.
+        """
+        with self._recent_lock:
+            if self._recent_since is None:
+                return None
+            rings = [self._recent.get(event_filter, ())] if event_filter else list(self._recent.values())
+            # Ab hier fehlt nichts: volle Puffer haben ihre aeltesten Eintraege schon verdraengt
+            since = self._recent_since
+            for ring in rings:
+                if ring and len(ring) == ring.maxlen:
+                    since = max(since, ring[0]["timestamp"])
+            results = []
+            if limit > 0:
+                merged = heapq.merge(*(reversed(ring) for ring in rings),
+                                     key=lambda entry: entry["timestamp"], reverse=True)
+                for entry in merged:
+                    ts = entry["timestamp"]
+                    if end_time and ts > end_time:
+                        continue
+                    if start_time and ts < start_time:
+                        break
+                    results.append(dict(entry))
+                    if len(results) >= limit:
+                        break
+        if results and len(results) >= limit and results[-1]["timestamp"] >= since:
+            return results
+        if (start_time or 0.0) >= since:
+            return results
+        return None
+
+    def _open_active(self):
+        self._file = open(self.log_file, "ab")
+        self._offset = self._file.tell()
+        self._time_index = SparseTimeIndex.for_segment(self.log_file, self.options["index_stride"])
+        if self._offset and not (self._time_index.load() and self._time_index.is_valid_for(self.log_file)):
+            # Fehlender oder veralteter Index (z. B. nach Absturz): einmalig neu aufbauen
+            self._time_index.rebuild(log_segments.LogSegment(self.log_file, None, active=True))
+        self._event_index = EventIndex.for_segment(self.log_file)
+        if self._offset and not (self._event_index.exists() and self._event_index.is_valid_for(self.log_file)):
+            self._event_index.rebuild(log_segments.LogSegment(self.log_file, None, active=True))
+        if self._rotation_interval and self._active_period is None:
+            first_ts = log_segments.read_first_timestamp(self.log_file)
+            if first_ts is not None:
+                self._active_period = log_segments.period_start(first_ts, self._rotation_interval)
+
+    def _needs_rotation(self, ts):
+        if not self._rotation_interval:
+            return False
+        if self._file is None:
+            self._open_active()
+        period = log_segments.period_start(ts, self._rotation_interval)
+        if self._active_period is None:
+            self._active_period = period
+            return False
+        return period > self._active_period
+
+    def _rotate(self, ts):
+        """
+        Benennt das aktive Segment nach seiner Periode um und beginnt ein neues.
+        """
+        new_period = log_segments.period_start(ts, self._rotation_interval)
+        target = log_segments.rotated_path(self.log_file, self._active_period)
+        existing = [target + suffix for suffix in ("",) + tuple(log_segments.COMPRESSION_SUFFIXES.values())]
+        self._close_file()
+        if any(os.path.exists(path) for path in existing):
+            # Periode gab es schon (z. B. Uhr zurueckgestellt): im aktiven Segment weiterschreiben
+            logger.warning("Log segment %s already exists, skipping rotation", target)
+        elif os.path.exists(self.log_file):
+            os.replace(self.log_file, target)
+            log_segments.move_sidecars(self.log_file, target)
+            self._rotations += 1
+            self._maintenance_needed.set()
+        self._active_period = new_period
+
+    def _maintenance_loop(self):
+        """
+        Hintergrund-Thread: komprimiert rotierte Segmente und setzt das Groessenbudget durch.
+        """
+        while not self._closing:
+            self._maintenance_needed.wait(self.options["maintenance_interval"])
+            self._maintenance_needed.clear()
+            if self._closing:
+                break
+            try:
+                max_total_size = int(self.options["max_total_size_mb"] * 1024 * 1024)
+                if self._sqlite is not None:
+                    self._sqlite.enforce_budget(max_total_size)
+                else:
+                    log_segments.run_maintenance(
+                        self.log_file,
+                        self.options["compression"],
+                        max_total_size,
+                        self.options["budget_policy"],
+                        self.options["thin_interval"],
+                    )
+                max_records = self.options["telemetry_max_records"]
+                # Erst bei 10 % Ueberhang kuerzen, damit die Datei nicht staendig neu geschrieben wird
+                if self._telemetry is not None and max_records and len(self._telemetry) > max_records * 1.1:
+                    self._telemetry.trim(max_records)
+                if self.rollups is not None:
+                    self.rollups.trim()
+            except Exception as e:
+                logger.error("Error during log maintenance: %s", e)
+
+    def _close_file(self):
+        if self._time_index is not None:
+            try:
+                self._time_index.close()
+            except OSError:
+                pass
+            self._time_index = None
+        if self._event_index is not None:
+            try:
+                self._event_index.close()
+            except OSError:
+                pass
+            self._event_index = None
+        if self._file is not None:
+            try:
+                self._file.close()
+            except OSError:
+                pass
+            self._file = None
+
+    def flush(self, timeout=None):
+        """
+        Wartet, bis alle bisher angenommenen Eintraege geschrieben (oder verworfen) sind.
+        Gibt False zurueck, wenn das Timeout vorher abgelaufen ist.
+        """
+        with self._cond:
+            target = self._accepted
+            self._flush_requested = True
+            self._cond.notify_all()
+            return self._cond.wait_for(lambda: self._settled >= target or not self._writer.is_alive(),
+                                       timeout)
+
+    def close(self):
+        """
+        Schreibt alle ausstehenden Eintraege, synchronisiert die Datei und beendet den Writer-Thread.
+        """
+        with self._cond:
+            if self._closing:
+                return
+            self._closing = True
+            self._cond.notify_all()
+        self._maintenance_needed.set()
+        self._writer.join()
+        self._close_file()
+        if self._sqlite is not None:
+            self._sqlite.close()
+        if self._telemetry is not None:
+            self._telemetry.close()
+        if self.rollups is not None:
+            self.rollups.close()
+
+    def get_write_version(self):
+        """
+        Liefert (Versionskennung, Zeitpunkt des letzten Schreibens); die Kennung aendert sich
+        mit jedem geschriebenen Batch.
+        """
+        with self._cond:
+            return f"log-{int(self._started_at * 1000):x}-{self._write_sequence}", self._last_write_time
+
+    def get_stats(self):
+        """
+        Liefert Zaehler zu Warteschlange und Schreiblatenz (Latenzen in Millisekunden).
+        """
+        with self._cond:
+            return {
+                "queue_depth": len(self._pending),
+                "max_queue_depth": self._max_queue_depth,
+                "queue_size": self.options["queue_size"],
+                "accepted": self._accepted,
+                "written": self._written,
+                "dropped": self._dropped,
+                "write_errors": self._write_errors,
+                "batches": self._batches,
+                "rotations": self._rotations,
+                "suppressed": self._suppressed,
+                "last_flush_latency_ms": round(self._last_flush_latency * 1000, 3),
+                "max_flush_latency_ms": round(self._max_flush_latency * 1000, 3),
+                "avg_flush_latency_ms": round(self._total_flush_latency * 1000 / self._batches, 3) if self._batches else 0.0,
+            }
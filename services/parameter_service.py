@@ -1,4 +1,4 @@
-import json, os, threading
+import json, os, threading, time
 
 class ParameterService:
     def __init__(self, filepath):
@@ -8,6 +8,10 @@ class ParameterService:
         self.lock = threading.Lock()
         # Beim Erzeugen wird die Konfiguration sofort geladen (oder neu erstellt)
         self.config = self.load_config()
+        # Versionszähler für bedingte GET-Anfragen (ETag); Ladezeit unterscheidet Neustarts
+        self.loaded_at = time.time()
+        self.version = 0
+        self.updated_at = self.loaded_at
 
     def load_config(self):
         """
@@ -55,5 +59,15 @@ class ParameterService:
         """
         with self.lock:
             self.config.update(new_config)
+            self.version += 1
+            self.updated_at = time.time()
             with open(self.filepath, "w") as f:
                 json.dump(self.config, f, indent=4)
+
+    def get_version(self):
+        """
+        Liefert (Versionskennung, Zeitpunkt der letzten Änderung) der Konfiguration.
+        Die Kennung ändert sich mit jedem update_config.
+        """
+        with self.lock:
+            return f"config-{int(self.loaded_at * 1000):x}-{self.version}", self.updated_at
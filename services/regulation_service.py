@@ -26,6 +26,8 @@ class RegulationService(threading.Thread):
 
         # Letzter bekannter Status in Form eines Dictionaries
         self.status = {}
+        # Optionaler EventBroadcaster fuer /api/stream; wird via set_broadcaster() gesetzt
+        self.broadcaster = None
 
     def compute_absolute_humidity(self, rh, t):
         """
@@ -43,16 +45,12 @@ class RegulationService(threading.Thread):
 
     def get_api_station(self):
         """
-        Liest aus den Parametern die 'api_station_id' und sucht
-        in den abgerufenen Stationen den passenden Eintrag.
+        Liest aus den Parametern die 'api_station_id' und holt
+        den passenden Eintrag ueber den ID-Index des StationService.
         """
         config = self.parameter_service.get_config()
         station_id = config.get("api_station_id", "ARO")
-        stations = self.station_service.fetch_stations()
-        for s in stations:
-            if s.station_id == station_id:
-                return s
-        return None
+        return self.station_service.get_station(station_id)
 
     def run(self):
         """
@@ -202,6 +200,8 @@ class RegulationService(threading.Thread):
             status["regulation_state"] = self.state
             self.status = status
             self.logging_service.log({"event": "status_update", "status": self.status})
+            if self.broadcaster:
+                self.broadcaster.publish("status", dict(status, api_station_name=api_station.name if api_station else None))
 
             # Kurze Wartezeit bis zur naechsten Runde
             time.sleep(poll_interval)
@@ -212,6 +212,9 @@ class RegulationService(threading.Thread):
         """
         self._stop_event.set()
 
+    def set_broadcaster(self, broadcaster):
+        self.broadcaster = broadcaster
+
     def get_status(self):
         """
         Liefert den zuletzt erfassten Status (Temperatur, Feuchte,
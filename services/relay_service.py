@@ -31,6 +31,7 @@ class RelayService:
         self.brand_alarm = False   # Emergency mode active?
         self.mode = "Auto"         # Operating mode: "Hand", "Aus" or "Auto"
         self.current_thread = None  # Current delay thread
+        self.broadcaster = None     # Optional EventBroadcaster, set via set_broadcaster()
 
         # Request the two required lines (relay and LED) from gpiochip0
         try:
@@ -69,6 +70,7 @@ class RelayService:
             self.lines.set_value(self.LED_PIN, Value.ACTIVE)
             self.state = True
             logger.info("Relay turned on, state: %s", self.state)
+            self._publish_state()
         else:
             logger.warning("GPIO lines not configured. Cannot turn on relay.")
 
@@ -81,6 +83,7 @@ class RelayService:
             self.lines.set_value(self.LED_PIN, Value.INACTIVE)
             self.state = False
             logger.info("Relay turned off, state: %s", self.state)
+            self._publish_state()
         else:
             logger.warning("GPIO lines not configured. Cannot turn off relay.")
 
@@ -164,6 +167,7 @@ class RelayService:
             raise ValueError("Invalid mode")
         self.mode = mode
         logger.info(f"Mode set to {mode}.")
+        self._publish_state()
         if mode == "Aus":
             if self.current_thread and self.current_thread.is_alive():
                 self.current_thread = None
@@ -177,6 +181,14 @@ class RelayService:
         """
         return {"state": self.state, "mode": self.mode}
 
+    def set_broadcaster(self, broadcaster):
+        self.broadcaster = broadcaster
+
+    def _publish_state(self):
+        """Pushes the current state to /api/stream clients, if a broadcaster is set."""
+        if self.broadcaster:
+            self.broadcaster.publish("relay", self.get_state())
+
     def cleanup(self):
         """
         Releases the GPIO lines.
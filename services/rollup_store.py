@@ -0,0 +1,176 @@
+# services/rollup_store.py
+"""
+Laufend gepflegte Verdichtungsstufen (Rollups) der status_update-Messwerte.
+
+Fuer jede Stufe (z. B. 1 min, 10 min, 1 h) fuehrt der LoggingService pro
+Zeitfenster Minimum, Maximum, Mittelwert und letzten Wert jedes Feldes sowie
+die Sekunden mit eingeschaltetem Relais. Abgeschlossene Fenster werden als
+Datensaetze fester Groesse angehaengt ("<log>.rollup-<Sekunden>.bin"), sodass
+auch ein Monatsverlauf nur wenige hundert Datensaetze liest.
+Das gerade offene Fenster lebt nur im Speicher; nach einem Neustart fehlt
+darum hoechstens ein angebrochenes Fenster pro Stufe.
+"""
+import math, os, struct, threading, time
+from services.telemetry_store import FixedRecordFile, FLOAT_FIELDS, STATE_CODES
+
+# (Aufloesung in Sekunden, Aufbewahrung in Tagen; 0 = unbegrenzt)
+DEFAULT_TIERS = ((60, 14), (600, 180), (3600, 0))
+# Zustaende, in denen das Relais eingeschaltet ist
+ON_STATES = (STATE_CODES["relay_on"], STATE_CODES["Hand"])
+NAN = float("nan")
+
+# Fensterbeginn, Anzahl Messungen, Relais-Sekunden, je Feld min/max/mean/last
+TIER_RECORD = struct.Struct("<dIf" + "4f" * len(FLOAT_FIELDS))
+
+
+def _value(value):
+    return None if math.isnan(value) else round(value, 2)
+
+
+class RollupBucket:
+    def __init__(self, start):
+        self.start = start
+        self.count = 0
+        self.relay_on_seconds = 0.0
+        n = len(FLOAT_FIELDS)
+        self.mins = [math.inf] * n
+        self.maxs = [-math.inf] * n
+        self.sums = [0.0] * n
+        self.counts = [0] * n
+        self.lasts = [NAN] * n
+
+    def add(self, values):
+        self.count += 1
+        for i, value in enumerate(values):
+            if math.isnan(value):
+                continue
+            if value < self.mins[i]:
+                self.mins[i] = value
+            if value > self.maxs[i]:
+                self.maxs[i] = value
+            self.sums[i] += value
+            self.counts[i] += 1
+            self.lasts[i] = value
+
+    def _stats(self, i):
+        if not self.counts[i]:
+            return NAN, NAN, NAN, NAN
+        return self.mins[i], self.maxs[i], self.sums[i] / self.counts[i], self.lasts[i]
+
+    def pack(self):
+        stats = []
+        for i in range(len(FLOAT_FIELDS)):
+            stats.extend(self._stats(i))
+        return TIER_RECORD.pack(self.start, self.count, self.relay_on_seconds, *stats)
+
+    def to_dict(self, resolution):
+        return RollupTier.decode_record(TIER_RECORD.unpack(self.pack()), resolution)
+
+
+class RollupTier(FixedRecordFile):
+    RECORD = TIER_RECORD
+
+    def __init__(self, path, resolution, retention_days=0):
+        super().__init__(path)
+        self.resolution = resolution
+        self.retention_days = retention_days
+
+    @staticmethod
+    def decode_record(values, resolution):
+        start, count, relay_on_seconds, *stats = values
+        bucket = {
+            "start": start,
+            "end": start + resolution,
+            "count": count,
+            "relay_on_seconds": round(relay_on_seconds, 1),
+        }
+        for i, field in enumerate(FLOAT_FIELDS):
+            low, high, mean, last = stats[i * 4:i * 4 + 4]
+            bucket[field] = {"min": _value(low), "max": _value(high), "mean": _value(mean), "last": _value(last)}
+        return bucket
+
+    def decode(self, data, offset):
+        return self.decode_record(self.RECORD.unpack_from(data, offset), self.resolution)
+
+    def max_records(self):
+        return int(self.retention_days * 86400 / self.resolution) if self.retention_days else 0
+
+
+class RollupStore:
+    def __init__(self, log_file, tiers=DEFAULT_TIERS, max_gap=60):
+        self.tiers = [RollupTier(self.path_for(log_file, resolution), resolution, retention)
+                      for resolution, retention in sorted(tuple(t) for t in tiers)]
+        # Groesste Luecke, die noch als Relais-Laufzeit gezaehlt wird (z. B. bei Neustart)
+        self.max_gap = max_gap
+        self.lock = threading.Lock()
+        self._open = {}
+        self._last_sample = None
+
+    @staticmethod
+    def path_for(log_file, resolution):
+        return f"{os.path.splitext(log_file)[0]}.rollup-{resolution}.bin"
+
+    def add(self, ts, values, state_code):
+        """
+        Nimmt eine Messung auf; abgeschlossene Fenster werden sofort angehaengt.
+        """
+        with self.lock:
+            on_seconds = 0.0
+            if self._last_sample is not None:
+                last_ts, was_on = self._last_sample
+                if was_on:
+                    on_seconds = min(max(ts - last_ts, 0.0), self.max_gap)
+            self._last_sample = (ts, state_code in ON_STATES)
+
+            for tier in self.tiers:
+                start = ts - ts % tier.resolution
+                bucket = self._open.get(tier.resolution)
+                if bucket is not None:
+                    # Die Laufzeit seit der letzten Messung gehoert noch zum bisherigen Fenster
+                    bucket.relay_on_seconds += on_seconds
+                    if bucket.start != start:
+                        tier.append([bucket.pack()])
+                        bucket = None
+                if bucket is None:
+                    bucket = self._open[tier.resolution] = RollupBucket(start)
+                bucket.add(values)
+
+    def close(self):
+        for tier in self.tiers:
+            tier.close()
+
+    def trim(self):
+        for tier in self.tiers:
+            max_records = tier.max_records()
+            if max_records and len(tier) > max_records * 1.1:
+                tier.trim(max_records)
+
+    def pick_tier(self, start_time, end_time, resolution=None, max_points=1000):
+        """
+        Waehlt die Stufe: bei angegebener Aufloesung die groebste, die nicht groeber ist;
+        sonst die feinste, die den Bereich mit hoechstens max_points Fenstern abdeckt.
+        Stufen, deren Aufbewahrung den Beginn nicht mehr enthaelt, scheiden aus.
+        """
+        now = time.time()
+        candidates = [t for t in self.tiers
+                      if not t.retention_days or start_time >= now - t.retention_days * 86400]
+        candidates = candidates or self.tiers[-1:]
+        if resolution:
+            finer = [t for t in candidates if t.resolution <= resolution]
+            return finer[-1] if finer else candidates[0]
+        for tier in candidates:
+            if (end_time - start_time) / tier.resolution <= max_points:
+                return tier
+        return candidates[-1]
+
+    def query(self, start_time, end_time, resolution=None, max_points=1000):
+        tier = self.pick_tier(start_time, end_time, resolution, max_points)
+        buckets = tier.read_range(start_time - tier.resolution, end_time)
+        buckets = [b for b in buckets if b["end"] > start_time]
+        with self.lock:
+            bucket = self._open.get(tier.resolution)
+            if bucket is not None and bucket.start <= end_time and bucket.start + tier.resolution > start_time:
+                current = bucket.to_dict(tier.resolution)
+                current["partial"] = True
+                buckets.append(current)
+        return {"resolution": tier.resolution, "start": start_time, "end": end_time, "buckets": buckets}
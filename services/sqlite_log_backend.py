@@ -0,0 +1,193 @@
+# services/sqlite_log_backend.py
+"""
+Optionales SQLite-Backend fuer das Event-Log (config.json: "logging": {"backend": "sqlite"}).
+
+Die Eintraege liegen als JSON-Text in einer Tabelle mit Indizes auf timestamp
+und (event, timestamp); die Datenbank laeuft im WAL-Modus, sodass Lesezugriffe
+der Flask-Threads den Writer nicht blockieren.
+
+Einmaliger Import bestehender Logdateien (inkl. rotierter Segmente):
+    python -m services.sqlite_log_backend log.json [log.db]
+"""
+import json, os, sqlite3, sys, threading, logging
+from services import log_segments
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS log ("
+    " id INTEGER PRIMARY KEY,"
+    " timestamp REAL NOT NULL,"
+    " event TEXT,"
+    " data TEXT NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS log_timestamp ON log (timestamp)",
+    "CREATE INDEX IF NOT EXISTS log_event_timestamp ON log (event, timestamp)",
+)
+
+
+class SqliteLogStore:
+    def __init__(self, path, synchronous="NORMAL"):
+        self.path = path
+        self.synchronous = synchronous
+        self.lock = threading.Lock()
+        self._writer_conn = None
+
+    @staticmethod
+    def path_for(log_file):
+        return os.path.splitext(log_file)[0] + ".db"
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=5, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(f"PRAGMA synchronous={self.synchronous}")
+        for statement in SCHEMA:
+            conn.execute(statement)
+        return conn
+
+    # ---------- Schreiben (LoggingService) ----------
+
+    def insert_many(self, rows):
+        """
+        Schreibt (timestamp, event, json_zeile)-Tupel in einer Transaktion.
+        """
+        if not rows:
+            return 0
+        with self.lock:
+            if self._writer_conn is None:
+                self._writer_conn = self._connect()
+            with self._writer_conn:
+                self._writer_conn.executemany("INSERT INTO log (timestamp, event, data) VALUES (?, ?, ?)", rows)
+        return len(rows)
+
+    def close(self):
+        with self.lock:
+            if self._writer_conn is not None:
+                self._writer_conn.close()
+                self._writer_conn = None
+
+    def enforce_budget(self, max_bytes):
+        """
+        Loescht die aeltesten 10 % der Eintraege, solange die belegten Seiten das Budget
+        ueberschreiten. Freie Seiten werden von SQLite wiederverwendet, die Datei waechst nicht weiter.
+        """
+        if not max_bytes:
+            return
+        with self.lock:
+            if self._writer_conn is None:
+                self._writer_conn = self._connect()
+            conn = self._writer_conn
+            while True:
+                page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+                used = (conn.execute("PRAGMA page_count").fetchone()[0]
+                        - conn.execute("PRAGMA freelist_count").fetchone()[0]) * page_size
+                count = conn.execute("SELECT COUNT(*) FROM log").fetchone()[0]
+                if used <= max_bytes or count < 10:
+                    return
+                with conn:
+                    conn.execute("DELETE FROM log WHERE id <= (SELECT id FROM log ORDER BY id LIMIT 1 OFFSET ?)",
+                                 (count // 10,))
+                logger.info("Deleted oldest log rows to stay within size budget")
+
+    # ---------- Lesen ----------
+
+    def _where(self, start_time, end_time, event_filter):
+        clauses, params = [], []
+        if start_time:
+            clauses.append("timestamp >= ?")
+            params.append(start_time)
+        if end_time:
+            clauses.append("timestamp <= ?")
+            params.append(end_time)
+        if event_filter:
+            clauses.append("event = ?")
+            params.append(event_filter)
+        return (f"WHERE {' AND '.join(clauses)}" if clauses else ""), params
+
+    def query(self, start_time=None, end_time=None, event_filter=None, limit=100):
+        """
+        Wie LogReaderService.get_filtered_logs, aber als indizierte Abfrage; neueste zuerst.
+        """
+        if not os.path.exists(self.path):
+            return []
+        where, params = self._where(start_time, end_time, event_filter)
+        conn = self._connect()
+        try:
+            rows = conn.execute(f"SELECT data FROM log {where} ORDER BY timestamp DESC, id DESC LIMIT ?",
+                                params + [limit]).fetchall()
+        finally:
+            conn.close()
+        return [json.loads(data) for (data,) in rows]
+
+    def iter_range(self, start_time=None, end_time=None, event_filter=None, chunk_size=1000):
+        """
+        Generator: alle passenden Eintraege, aelteste zuerst, in Bloecken von chunk_size Zeilen.
+        """
+        if not os.path.exists(self.path):
+            return
+        where, params = self._where(start_time, end_time, event_filter)
+        conn = self._connect()
+        try:
+            cursor = conn.execute(f"SELECT data FROM log {where} ORDER BY timestamp, id", params)
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                for (data,) in rows:
+                    yield json.loads(data)
+        finally:
+            conn.close()
+
+    def event_counts(self):
+        if not os.path.exists(self.path):
+            return {}
+        conn = self._connect()
+        try:
+            rows = conn.execute("SELECT event, COUNT(*) FROM log WHERE event IS NOT NULL GROUP BY event").fetchall()
+        finally:
+            conn.close()
+        return dict(rows)
+
+
+def import_log_file(log_file, db_path, batch_size=5000):
+    """
+    Importiert alle Segmente einer JSON-Logdatei. Ist die Datenbank schon befuellt,
+    werden nur Eintraege aelter als der aelteste vorhandene uebernommen, ein erneuter
+    Import erzeugt also keine Duplikate.
+    """
+    store = SqliteLogStore(db_path)
+    conn = store._connect()
+    try:
+        oldest = conn.execute("SELECT MIN(timestamp) FROM log").fetchone()[0]
+    finally:
+        conn.close()
+
+    imported = 0
+    batch = []
+    for segment in log_segments.list_segments(log_file):
+        if oldest is not None and segment.start is not None and segment.start >= oldest:
+            break
+        with log_segments.open_segment(segment, "rt") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                    ts = entry["timestamp"]
+                except (ValueError, KeyError, TypeError):
+                    continue
+                if oldest is not None and ts >= oldest:
+                    continue
+                batch.append((ts, entry.get("event"), line.rstrip("\n")))
+                if len(batch) >= batch_size:
+                    imported += store.insert_many(batch)
+                    batch = []
+    imported += store.insert_many(batch)
+    store.close()
+    return imported
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python -m services.sqlite_log_backend <log.json> [log.db]")
+        sys.exit(1)
+    source = sys.argv[1]
+    target = sys.argv[2] if len(sys.argv) > 2 else SqliteLogStore.path_for(source)
+    print(f"Imported {import_log_file(source, target)} log entries into {target}")
@@ -1,98 +1,412 @@
-import requests, time, logging
-from models.station import Station
+import requests, time, logging, threading, random, json, os
+from concurrent.futures import ThreadPoolExecutor
+from types import MappingProxyType
+from requests.adapters import HTTPAdapter
+from models.station import Station, FeedRecord
+from services.geojson_stream import iter_features
 
 class StationService:
+    # Timeout pro Abruf in Sekunden
+    FETCH_TIMEOUT = 5
+    # MeteoSwiss veroeffentlicht die 10-Minuten-Werte im 10-Minuten-Raster, mit etwas Verzoegerung
+    PUBLICATION_CADENCE = 600
+    PUBLICATION_DELAY = 120     # Erfahrungswert: Sekunden nach dem Rasterzeitpunkt
+    REFRESH_JITTER = 30         # zufaellige Streuung, damit nicht alle Geraete gleichzeitig abrufen
+    RETRY_DELAY = 60            # erste Wartezeit nach einem Fehler, verdoppelt sich bis zum Intervall
+    # Groesse der gelesenen Stuecke beim selektiven Parsen
+    STREAM_CHUNK_SIZE = 16 * 1024
+
     def __init__(self, logging_service, config):
         # Zum Loggen von Ereignissen wird ein externer LoggingService uebergeben
         self.logging_service = logging_service
         # config enthaelt wichtige Einstellungen (URLs, Cache-Dauer etc.)
         self.config = config
         self.cached_stations = []
+        # Unveraenderliche Zuordnung ID -> Station, wird pro Aktualisierung einmal neu gebaut
+        self.stations_by_id = MappingProxyType({})
+        # Zeitpunkt der letzten erfolgreichen Pruefung (Abruf oder 304); bestimmt die Cache-Gueltigkeit
         self.last_fetch_time = 0
+        # Zeitpunkt, zu dem sich die Stationsdaten zuletzt tatsaechlich geaendert haben
+        self.updated_time = 0
         # Added fault indicator service; set via set_indicator_service() if needed.
         self.indicator_service = None
+        # Persistente Session: Keep-Alive spart den TLS-Handshake bei jedem Abruf
+        self.session = requests.Session()
+        self.session.mount("https://", HTTPAdapter(pool_connections=2, pool_maxsize=2))
+        # Beide Feeds werden gleichzeitig abgerufen
+        self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="station-fetch")
+        # Dauer und Ergebnis des letzten Abrufs pro URL
+        self.stats_lock = threading.Lock()
+        self.fetch_timings = {}
+        # Pro Feed-URL: ETag, Last-Modified und die zuletzt gelesenen Datensaetze (fuer bedingte Abrufe)
+        self.feeds = {}
+        # Die Datensatzlisten (humidity, temperature), aus denen cached_stations zuletzt kombiniert wurde
+        self._combined_records = (None, None)
+        # "selective": Feeds gestreamt parsen und nur kompakte Datensaetze behalten; "full": response.json()
+        self.parse_mode = getattr(config, "STATION_PARSE_MODE", "full")
+        # 304-Antworten (hits) und vollstaendige Downloads (misses)
+        self.conditional_hits = 0
+        self.conditional_misses = 0
+        # Hintergrund-Aktualisierung; wird via start_refresher() gestartet
+        self.parameter_service = None
+        self._refresher = None
+        self._stop_event = threading.Event()
+        self._refresh_lock = threading.Lock()
+        self.next_refresh = None
+        # Persistenter Cache fuer Warmstarts (config.STATION_CACHE_FILE, None schaltet ihn ab)
+        self.cache_file = getattr(config, "STATION_CACHE_FILE", None)
+        # Optionales Hoechstalter (Sekunden) der Cache-Datei beim Start; None laedt jeden Stand (als veraltet)
+        self.cache_max_age = getattr(config, "STATION_CACHE_MAX_AGE", None)
+        self._load_cache()
 
     def fetch_stations(self):
         """
         Liefert die Liste aller Stationen.
-        Greift nur dann auf die APIs zu, wenn der Cache abgelaufen ist.
+        Laeuft die Hintergrund-Aktualisierung, wird immer sofort der letzte Stand geliefert
+        (auch wenn er veraltet ist). Sonst wird abgerufen, wenn der Cache abgelaufen ist.
         """
-        current_time = time.time()
-        # Wenn Cache noch gueltig, einfach zwischengespeicherte Stationen zurueckgeben
-        if self.cached_stations and (current_time - self.last_fetch_time < self.config.CACHE_EXPIRATION_SECONDS):
+        if self._refresher is not None or self._cache_valid():
             return self.cached_stations
+        with self._refresh_lock:
+            # Ein anderer Thread hat den Cache eventuell schon aktualisiert
+            if not self._cache_valid():
+                self.refresh()
+        return self.cached_stations
+
+    def _cache_valid(self):
+        # Auch ein leeres Ergebnis gilt bis zum Ablauf als gueltig
+        return bool(self.last_fetch_time) and (time.time() - self.last_fetch_time < self.config.CACHE_EXPIRATION_SECONDS)
+
+    def get_cache_state(self):
+        """
+        Zustand des Caches nach Alter: "empty" (noch nie erfolgreich abgerufen),
+        "valid" (juenger als CACHE_EXPIRATION_SECONDS) oder "stale" (aelter, wird aber weiter geliefert).
+        """
+        if not self.last_fetch_time:
+            return "empty"
+        return "valid" if self._cache_valid() else "stale"
+
+    def get_cache_age(self):
+        """
+        Alter des aktuellen Stands in Sekunden seit der letzten erfolgreichen Pruefung, None ohne Stand.
+        """
+        if not self.last_fetch_time:
+            return None
+        return max(0.0, time.time() - self.last_fetch_time)
+
+    def _load_cache(self):
+        """
+        Laedt den zuletzt gespeicherten Stand, damit die Regelung nach einem Neustart sofort
+        Aussenwerte hat, auch ohne Netz. Je nach Alter gilt er als gueltig oder veraltet
+        (siehe get_cache_age); nur mit STATION_CACHE_MAX_AGE werden aeltere Staende verworfen.
+        """
+        if not self.cache_file or not os.path.exists(self.cache_file):
+            return
+        try:
+            with open(self.cache_file, "r") as f:
+                data = json.load(f)
+            fetch_time = float(data["fetch_time"])
+            if self.cache_max_age is not None and time.time() - fetch_time > self.cache_max_age:
+                logging.info(f"Ignoring outdated station cache {self.cache_file}")
+                return
+            stations = [Station(station_id=s["id"], name=s["name"], humidity=s["humidity"],
+                                temperature=s["temperature"], coordinates=s.get("coordinates"))
+                        for s in data["stations"]]
+        except Exception as e:
+            logging.error(f"Error loading station cache {self.cache_file}: {e}")
+            return
+        self._set_stations(stations)
+        self.last_fetch_time = fetch_time
+        self.updated_time = float(data.get("updated_time", fetch_time))
+
+    def _save_cache(self):
+        """
+        Schreibt den aktuellen Stand atomar (temporaere Datei, fsync, os.replace).
+        """
+        if not self.cache_file:
+            return
+        data = {
+            "fetch_time": self.last_fetch_time,
+            "updated_time": self.updated_time,
+            "stations": [{"id": s.station_id, "name": s.name, "humidity": s.humidity,
+                          "temperature": s.temperature, "coordinates": s.coordinates}
+                         for s in self.cached_stations],
+        }
+        tmp = self.cache_file + ".tmp"
+        try:
+            with open(tmp, "w") as f:
+                json.dump(data, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.cache_file)
+        except Exception as e:
+            logging.error(f"Error writing station cache {self.cache_file}: {e}")
 
-        # Frische Daten von zwei APIs holen (Luftfeuchte / Temperatur)
-        humidity_data = self._fetch_data(self.config.HUMIDITY_URL)
-        temperature_data = self._fetch_data(self.config.TEMPERATURE_URL)
+    def refresh(self):
+        """
+        Ruft beide Feeds ab und ersetzt den Cache. Gibt True zurueck, wenn die Daten
+        aktuell sind (neu kombiniert oder per 304 bestaetigt), sonst False.
+        """
+        current_time = time.time()
+        # Frische Daten von zwei APIs holen (Luftfeuchte / Temperatur), parallel
+        humidity_future = self._executor.submit(self._fetch_data, self.config.HUMIDITY_URL)
+        temperature_future = self._executor.submit(self._fetch_data, self.config.TEMPERATURE_URL)
+        humidity_data = humidity_future.result()
+        temperature_data = temperature_future.result()
         # If both APIs return data, clear any fault indication.
         if humidity_data and temperature_data:
             if self.indicator_service:
                 self.indicator_service.set_fault_led(False)
         else:
-            # Falls ein API-Fehler auftritt, turn on fault LED and return cached data (which may be empty).
+            # Falls ein API-Fehler auftritt, turn on fault LED and keep the cached data (which may be empty).
             if self.indicator_service:
                 self.indicator_service.set_fault_led(True)
-            return self.cached_stations
+            return False
+
+        # Ein 304 bestaetigt nur den zuletzt gelesenen Feed; der kann seit der letzten Kombination
+        # neu sein (z. B. 200 fuer einen Feed, Fehler beim anderen). Daher mit den Datensaetzen
+        # der letzten Kombination vergleichen statt mit dem Ergebnis dieses Abrufs.
+        if self.updated_time and humidity_data is self._combined_records[0] \
+                and temperature_data is self._combined_records[1]:
+            # Beide Feeds seit der letzten Kombination unveraendert: nur die Gueltigkeit verlaengern
+            self.last_fetch_time = current_time
+            self._save_cache()
+            return True
 
         # Daten kombinieren und im Cache ablegen
-        self.cached_stations = self._combine_data(humidity_data, temperature_data)
+        self._set_stations(self._combine_data(humidity_data, temperature_data))
+        self._combined_records = (humidity_data, temperature_data)
         self.last_fetch_time = current_time
+        self.updated_time = current_time
+        self._save_cache()
 
         # Logge zusammenfassende Informationen (Anzahl Stationen)
         self._log_aggregate_data()
-        return self.cached_stations
+        return True
+
+    def start_refresher(self, parameter_service):
+        """
+        Startet die Hintergrund-Aktualisierung (stale-while-revalidate): ein Thread ruft die
+        Feeds im Abstand von regulation.api_poll_interval ab, ausgerichtet auf das
+        Veroeffentlichungsraster von MeteoSwiss. fetch_stations() wartet danach nie mehr auf das Netz.
+        """
+        self.parameter_service = parameter_service
+        self._refresher = threading.Thread(target=self._refresh_loop, name="station-refresh", daemon=True)
+        self._refresher.start()
+
+    def _poll_interval(self):
+        regulation = self.parameter_service.get_config().get("regulation", {})
+        return max(1, regulation.get("api_poll_interval", self.config.CACHE_EXPIRATION_SECONDS))
+
+    def _next_refresh(self, now, interval):
+        """
+        Naechster Abrufzeitpunkt nach now. Intervalle ab der Veroeffentlichungskadenz werden auf
+        ein Vielfaches davon aufgerundet und kurz nach einem Veroeffentlichungszeitpunkt angesetzt.
+        """
+        if interval >= self.PUBLICATION_CADENCE:
+            step = -(-interval // self.PUBLICATION_CADENCE) * self.PUBLICATION_CADENCE
+            slot = ((now - self.PUBLICATION_DELAY) // step + 1) * step + self.PUBLICATION_DELAY
+        else:
+            slot = now + interval
+        return slot + random.uniform(0, self.REFRESH_JITTER)
+
+    def _refresh_loop(self):
+        retry_delay = self.RETRY_DELAY
+        if self._cache_valid():
+            # Gueltiger Stand aus der Cache-Datei: erst zum naechsten Rasterzeitpunkt abrufen
+            self.next_refresh = self._next_refresh(time.time(), self._poll_interval())
+            self._stop_event.wait(max(0, self.next_refresh - time.time()))
+        while not self._stop_event.is_set():
+            interval = self._poll_interval()
+            try:
+                with self._refresh_lock:
+                    ok = self.refresh()
+            except Exception as e:
+                logging.error(f"Error refreshing station data: {e}")
+                ok = False
+            now = time.time()
+            if ok:
+                retry_delay = self.RETRY_DELAY
+                self.next_refresh = self._next_refresh(now, interval)
+            else:
+                self.next_refresh = now + min(retry_delay, interval)
+                retry_delay = min(retry_delay * 2, interval)
+            self._stop_event.wait(max(0, self.next_refresh - now))
+
+    def get_station(self, station_id):
+        """
+        Liefert die Station mit der gegebenen ID (oder None) in konstanter Zeit.
+        Aktualisiert den Cache wie fetch_stations, falls er abgelaufen ist.
+        """
+        self.fetch_stations()
+        return self.stations_by_id.get(station_id)
+
+    def _set_stations(self, stations):
+        """
+        Ersetzt den Cache; bei doppelten IDs gilt wie bisher die erste Station.
+        """
+        by_id = {}
+        for station in stations:
+            by_id.setdefault(station.station_id, station)
+        # Erst die Zuordnung, dann die Liste: Leser sehen nie eine Liste ohne passende Zuordnung
+        self.stations_by_id = MappingProxyType(by_id)
+        self.cached_stations = stations
+
+    def get_cache_version(self):
+        """
+        Liefert (Versionskennung, Aenderungszeit) des Stations-Caches; aendert sich nur,
+        wenn ein Abruf neue Daten geliefert hat (nicht bei 304).
+        """
+        return f"stations-{self.updated_time!r}", self.updated_time
+
+    def get_stats(self):
+        """
+        Liefert Dauer (Sekunden), Erfolg und Zeitpunkt des letzten Abrufs pro Feed-URL
+        sowie die Anzahl 304-Antworten (hits) und vollstaendiger Downloads (misses).
+        """
+        with self.stats_lock:
+            return {
+                "fetches": {url: dict(timing) for url, timing in self.fetch_timings.items()},
+                "conditional": {"hits": self.conditional_hits, "misses": self.conditional_misses},
+                "cache": self.get_cache_state(),
+                "cache_age": self.get_cache_age(),
+                "last_fetch_time": self.last_fetch_time,
+                "next_refresh": self.next_refresh,
+            }
 
     def _fetch_data(self, url):
         """
         Hilfsfunktion zum Abruf von JSON-Daten via HTTP.
+        Sendet die gespeicherten ETag/Last-Modified-Werte mit; bei 304 werden die zuletzt
+        gelesenen Datensaetze ohne Download und Parsen wiederverwendet.
+        Liefert die Liste von FeedRecord (bei 304 dasselbe Objekt wie zuvor) bzw. None bei Fehlern.
         """
+        started = time.perf_counter()
+        ok = False
+        feed = self.feeds.get(url)
+        headers = {}
+        if feed:
+            if feed["etag"]:
+                headers["If-None-Match"] = feed["etag"]
+            if feed["last_modified"]:
+                headers["If-Modified-Since"] = feed["last_modified"]
         try:
-            response = requests.get(url, timeout=5)
-            response.raise_for_status()  # Loest bei Fehlercodes eine Exception aus
-            data = response.json()
-            return data.get("features", [])
+            if self.parse_mode == "selective":
+                response = self.session.get(url, timeout=self.FETCH_TIMEOUT, headers=headers, stream=True)
+            else:
+                response = self.session.get(url, timeout=self.FETCH_TIMEOUT, headers=headers)
+            try:
+                if response.status_code == 304 and feed:
+                    ok = True
+                    with self.stats_lock:
+                        self.conditional_hits += 1
+                    return feed["records"]
+                response.raise_for_status()  # Loest bei Fehlercodes eine Exception aus
+                records = self._parse_feed(response)
+            finally:
+                response.close()
+            self.feeds[url] = {
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified"),
+                "records": records,
+            }
+            ok = True
+            with self.stats_lock:
+                self.conditional_misses += 1
+            return records
         except Exception as e:
             logging.error(f"Error fetching data from {url}: {e}")
             if self.indicator_service:
                 self.indicator_service.set_fault_led(True)
             return None
+        finally:
+            with self.stats_lock:
+                self.fetch_timings[url] = {
+                    "seconds": round(time.perf_counter() - started, 3),
+                    "ok": ok,
+                    "time": time.time(),
+                }
+
+    def _parse_feed(self, response):
+        """
+        Wandelt die Features eines Feeds in kompakte FeedRecords um. Im Modus "selective"
+        wird die Antwort gestreamt und Feature fuer Feature dekodiert; Koordinaten werden
+        nur fuer die konfigurierte Station behalten.
+        """
+        if self.parse_mode == "selective":
+            chunks = response.iter_content(chunk_size=self.STREAM_CHUNK_SIZE)
+            features = iter_features(chunks)
+            keep_id = self._configured_station_id()
+        else:
+            chunks = ()
+            features = response.json().get("features", [])
+            keep_id = None
+        records = []
+        for feature in features:
+            try:
+                records.append(FeedRecord.from_feature(feature, full=keep_id is None or feature.get("id") == keep_id))
+            except Exception as e:
+                logging.error(f"Error reading data for station {feature.get('id')}: {e}")
+        # Restliche Bytes lesen, damit die Verbindung wiederverwendet werden kann
+        for _ in chunks:
+            pass
+        return records
+
+    def _configured_station_id(self):
+        """
+        Die in config.json gewaehlte Station; None, solange kein ParameterService bekannt ist.
+        """
+        if self.parameter_service is None:
+            return None
+        return self.parameter_service.get_config().get("api_station_id")
 
     def _combine_data(self, humidity_data, temperature_data):
         """
-        Kombiniert Luftfeuchte- und Temperaturdaten anhand der Stations-ID.
+        Kombiniert Luftfeuchte- und Temperaturdaten anhand der Stations-ID (Hash-Join).
         Erzeugt ein Station-Objekt pro ID (sofern beide Datensaetze vorhanden sind).
         """
+        # Temperaturwerte nach ID; bei doppelten IDs zaehlt der erste
+        temperatures = {}
+        for t in temperature_data:
+            temperatures.setdefault(t.station_id, t)
         combined = []
         for h in humidity_data:
-            station_id = h.get("id")
             # passender Eintrag in temperature_data
-            matching_temp = next((t for t in temperature_data if t.get("id") == station_id), None)
+            matching_temp = temperatures.get(h.station_id)
             if not matching_temp:
                 continue
-            try:
-                station = Station(
-                    station_id=station_id,
-                    name=h["properties"].get("station_name", "Unknown"),
-                    humidity=h["properties"].get("value"),
-                    temperature=matching_temp["properties"].get("value"),
-                    coordinates=h["geometry"].get("coordinates")
-                )
-                combined.append(station)
-            except Exception as e:
-                logging.error(f"Error combining data for station {station_id}: {e}")
+            combined.append(Station(
+                station_id=h.station_id,
+                name=h.name,
+                humidity=h.value,
+                temperature=matching_temp.value,
+                coordinates=h.coordinates
+            ))
         return combined
 
     def _log_aggregate_data(self):
         """
-        Erzeugt einen Log-Eintrag mit der Gesamtanzahl abgerufener Stationen.
+        Erzeugt einen Log-Eintrag mit der Gesamtanzahl abgerufener Stationen
+        und der Dauer der beiden Abrufe.
         """
+        with self.stats_lock:
+            fetch_seconds = {url: timing["seconds"] for url, timing in self.fetch_timings.items()}
         entry = {
             "category": "weather",
-            "data": {"total_stations": len(self.cached_stations)}
+            "data": {"total_stations": len(self.cached_stations), "fetch_seconds": fetch_seconds}
         }
         self.logging_service.log(entry)
-        
+
+    def close(self):
+        """
+        Beendet die Hintergrund-Aktualisierung und die Abruf-Threads und schliesst die HTTP-Verbindungen.
+        """
+        self._stop_event.set()
+        if self._refresher is not None:
+            self._refresher.join(timeout=2 * self.FETCH_TIMEOUT)
+        self._executor.shutdown(wait=False)
+        self.session.close()
+
     # New method to set the indicator service
     def set_indicator_service(self, indicator_service):
         self.indicator_service = indicator_service
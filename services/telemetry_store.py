@@ -0,0 +1,293 @@
+# services/telemetry_store.py
+"""
+Kompakter Binaerspeicher fuer die numerischen Felder der status_update-Eintraege.
+
+Jeder Eintrag ist ein Datensatz fester Groesse (struct); gelesen wird ueber
+mmap, sodass der Verlauf fuer /api/dashboard ein Ausschnitt eines Arrays ist
+statt eines Zeilenscans mit JSON-Dekodierung.
+
+Konvertierung bestehender Logdateien:
+    python -m services.telemetry_store log.json [log-20250301T0000Z.json.gz ...]
+"""
+import math, mmap, os, struct, sys, threading, json
+from abc import ABC, abstractmethod
+from services import log_segments
+
+# Reihenfolge der Float-Felder im Datensatz
+FLOAT_FIELDS = (
+    "local_temperature",
+    "local_humidity",
+    "api_temperature",
+    "api_humidity",
+    "inside_absolute_humidity",
+    "outside_absolute_humidity",
+    "difference",
+)
+STATE_CODES = {"idle": 1, "pending_on": 2, "relay_on": 3, "relay_off": 4, "Hand": 5, "Aus": 6}
+STATE_NAMES = {code: name for name, code in STATE_CODES.items()}
+
+# Zeitstempel, 7 Floats, Stations-ID (4 Zeichen), Zustandscode, Fuellbytes -> 44 Bytes
+RECORD = struct.Struct("<d7f4sB3x")
+NAN = float("nan")
+
+
+def pack_status(ts, status):
+    """
+    Packt einen status_update-Status in einen Datensatz (None -> NaN).
+    """
+    values = [NAN if status.get(field) is None else status[field] for field in FLOAT_FIELDS]
+    station = (status.get("api_station") or "").encode("ascii", "replace")[:4]
+    return RECORD.pack(ts, *values, station, STATE_CODES.get(status.get("regulation_state"), 0))
+
+
+def _value(value):
+    return None if math.isnan(value) else round(value, 2)
+
+
+def unpack_entry(data, offset=0):
+    """
+    Baut aus einem Datensatz wieder einen Log-Eintrag im Format von log.json.
+    """
+    ts, local_t, local_rh, api_t, api_rh, inside_ah, outside_ah, diff, station, state = \
+        RECORD.unpack_from(data, offset)
+    status = {
+        "local_temperature": _value(local_t),
+        "local_humidity": _value(local_rh),
+        "inside_absolute_humidity": _value(inside_ah),
+        "api_station": station.rstrip(b"\0").decode("ascii") or None,
+        "api_temperature": _value(api_t),
+        "api_humidity": _value(api_rh),
+        "outside_absolute_humidity": _value(outside_ah),
+        "difference": _value(diff),
+        "regulation_state": STATE_NAMES.get(state),
+    }
+    return {"event": "status_update", "status": status, "timestamp": ts}
+
+
+class FixedRecordFile(ABC):
+    """
+    Datei aus Datensaetzen fester Groesse, deren erstes Feld ein aufsteigender
+    Zeitstempel (double) ist. Anhaengen, Kuerzen und Bereichslesen ueber mmap.
+    Unterklassen setzen RECORD und implementieren decode.
+    """
+    RECORD = None
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self._file = None
+
+    @abstractmethod
+    def decode(self, data, offset):
+        """
+        Baut aus dem Datensatz an offset den gelesenen Eintrag.
+        """
+
+    # ---------- Schreiben ----------
+
+    def append(self, records):
+        if not records:
+            return
+        with self.lock:
+            if self._file is None:
+                self._file = open(self.path, "ab")
+                # Angeschnittenen Datensatz nach einem Absturz abschneiden
+                size = self._file.seek(0, os.SEEK_END)
+                if size % self.RECORD.size:
+                    self._file.truncate(size - size % self.RECORD.size)
+            self._file.write(b"".join(records))
+            self._file.flush()
+
+    def fsync(self):
+        with self.lock:
+            if self._file is not None:
+                os.fsync(self._file.fileno())
+
+    def close(self):
+        with self.lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def trim(self, max_records):
+        """
+        Behaelt nur die neuesten max_records Datensaetze (wird selten vom Wartungs-Thread aufgerufen).
+        """
+        with self.lock:
+            try:
+                size = os.path.getsize(self.path)
+            except OSError:
+                return
+            count = size // self.RECORD.size
+            if count <= max_records:
+                return
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            tmp = self.path + ".tmp"
+            with open(self.path, "rb") as src, open(tmp, "wb") as dst:
+                src.seek((count - max_records) * self.RECORD.size)
+                while True:
+                    chunk = src.read(1024 * 1024)
+                    if not chunk:
+                        break
+                    dst.write(chunk)
+            os.replace(tmp, self.path)
+
+    # ---------- Lesen ----------
+
+    def _map(self):
+        f = open(self.path, "rb")
+        size = os.fstat(f.fileno()).st_size
+        if size < self.RECORD.size:
+            f.close()
+            return None, None, 0
+        return f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ), size // self.RECORD.size
+
+    def __len__(self):
+        try:
+            return os.path.getsize(self.path) // self.RECORD.size
+        except OSError:
+            return 0
+
+    def latest(self, limit):
+        """
+        Die neuesten limit Eintraege, aelteste zuerst.
+        """
+        return self.read_range(limit=limit)
+
+    def read_range(self, start_time=None, end_time=None, limit=None):
+        """
+        Eintraege mit start <= ts <= end (aelteste zuerst); bei limit die neuesten davon.
+        """
+        try:
+            f, data, count = self._map()
+        except FileNotFoundError:
+            return []
+        if data is None:
+            return []
+        try:
+            first = self._bisect(data, count, start_time) if start_time else 0
+            last = self._bisect(data, count, end_time, right=True) if end_time else count
+            if limit is not None:
+                first = max(first, last - limit)
+            return [self.decode(data, i * self.RECORD.size) for i in range(first, last)]
+        finally:
+            data.close()
+            f.close()
+
+    def iter_after(self, after):
+        """
+        Generator: alle Eintraege mit ts > after, aelteste zuerst (liest die Datei erst beim Iterieren).
+        """
+        try:
+            f, data, count = self._map()
+        except FileNotFoundError:
+            return
+        if data is None:
+            return
+        try:
+            for i in range(self._bisect(data, count, after, right=True), count):
+                yield self.decode(data, i * self.RECORD.size)
+        finally:
+            data.close()
+            f.close()
+
+    def _bisect(self, data, count, ts, right=False):
+        lo, hi = 0, count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            value = struct.unpack_from("<d", data, mid * self.RECORD.size)[0]
+            if value < ts or (right and value == ts):
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+
+class TelemetryStore(FixedRecordFile):
+    RECORD = RECORD
+
+    @staticmethod
+    def path_for(log_file):
+        return os.path.splitext(log_file)[0] + ".telemetry.bin"
+
+    def decode(self, data, offset):
+        return unpack_entry(data, offset)
+
+
+def convert(log_paths, store_path):
+    """
+    Streamt status_update-Zeilen aus bestehenden Logdateien (auch .gz/.xz, in zeitlicher
+    Reihenfolge) in den Binaerspeicher.
+    Vorhandene Datensaetze (z. B. vom laufenden Dienst) bleiben erhalten: uebernommen wird nur,
+    was aufsteigend vor dem ersten vorhandenen Zeitstempel liegt. Geschrieben wird in eine
+    temporaere Datei, die den Speicher danach mit os.replace ersetzt; der Dienst sollte
+    dabei gestoppt sein.
+    Gibt die Anzahl konvertierter Eintraege zurueck.
+    """
+    first = math.inf
+    try:
+        with open(store_path, "rb") as f:
+            head = f.read(RECORD.size)
+        if len(head) == RECORD.size:
+            first = RECORD.unpack(head)[0]
+    except FileNotFoundError:
+        pass
+
+    tmp = store_path + ".convert.tmp"
+    if os.path.exists(tmp):
+        os.remove(tmp)
+    store = TelemetryStore(tmp)
+    converted = 0
+    last = -math.inf
+    batch = []
+    for path in log_paths:
+        with log_segments.open_path(path, "rb") as f:
+            for line in f:
+                if b'"status_update"' not in line:
+                    continue
+                try:
+                    entry = json.loads(line)
+                    ts = float(entry["timestamp"])
+                    # Nur aufsteigend und vor den vorhandenen Datensaetzen (Suche per Bisektion)
+                    if not last < ts < first:
+                        continue
+                    batch.append(pack_status(ts, entry.get("status") or {}))
+                    last = ts
+                except (ValueError, KeyError, TypeError, struct.error):
+                    continue
+                if len(batch) >= 1000:
+                    store.append(batch)
+                    converted += len(batch)
+                    batch = []
+    store.append(batch)
+    converted += len(batch)
+    store.close()
+    if not converted:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        return 0
+
+    if first != math.inf:
+        # Vorhandene (vollstaendige) Datensaetze hinter die konvertierten haengen
+        with open(store_path, "rb") as src, open(tmp, "ab") as dst:
+            size = os.fstat(src.fileno()).st_size
+            remaining = size - size % RECORD.size
+            while remaining:
+                chunk = src.read(min(remaining, 1024 * 1024))
+                if not chunk:
+                    break
+                dst.write(chunk)
+                remaining -= len(chunk)
+    os.replace(tmp, store_path)
+    return converted
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python -m services.telemetry_store <log.json> [more segments ...]")
+        sys.exit(1)
+    paths = sys.argv[1:]
+    target = TelemetryStore.path_for(paths[0])
+    print(f"Converted {convert(paths, target)} status entries into {target}")
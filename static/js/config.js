@@ -1,9 +1,13 @@
 // static/js/config.js
 
+// Zuletzt geladene Konfiguration, damit beim Speichern keine unbekannten Felder verloren gehen
+let loadedConfig = {};
+
 function loadConfig() {
   fetch('/api/config')
     .then(res => res.json())
     .then(cfg => {
+      loadedConfig = cfg;
       if (cfg.api_station_id) {
         document.getElementById('api_station_select').value = cfg.api_station_id;
       }
@@ -37,9 +41,9 @@ function saveConfig() {
       on_delay: parseInt(document.getElementById('on_delay').value),
       on_threshold: parseFloat(document.getElementById('on_threshold').value)
     },
-    logging: {
+    logging: Object.assign({}, loadedConfig.logging, {
       log_file: document.getElementById('log_file').value
-    },
+    }),
     // relay_mode is now controlled via the home page
     relay_mode: "Auto",
     manual_control_enabled: document.getElementById('manualControlToggle').checked
@@ -1,7 +1,14 @@
 // static/js/home.js
 
 let chart; // Chart.js instance
+// Verlauf im Browser: nach dem ersten Laden werden nur neue Einträge nachgeholt
+const MAX_CHART_POINTS = 100;
+let chartEntries = [];
+let chartCursor = null;
 let currentMode = "Auto";
+// Push-Stream: solange verbunden, entfällt das Polling von Status und Relais
+let streamConnected = false;
+let lastRelayState = null;
 const modeMapping = {
   "Auto": { display: "AUTO", image: "/static/images/ss-short-left-3d.png" },
   "Hand": { display: "EIN", image: "/static/images/ss-short-right-3d.png" },
@@ -50,79 +57,82 @@ function initChart() {
   });
 }
 
-function updateChart() {
-  fetch('/api/dashboard')
-    .then(response => response.json())
-    .then(data => {
-      const timestamps = data.map(entry => new Date(entry.timestamp * 1000).toLocaleTimeString());
-      const insideData = data.map(entry => entry.status.inside_absolute_humidity);
-      const outsideData = data.map(entry => entry.status.outside_absolute_humidity);
-      const diffData = data.map(entry => entry.status.difference);
-      
-      if (chart) {
-        chart.data.labels = timestamps;
-        chart.data.datasets[0].data = insideData;
-        chart.data.datasets[1].data = outsideData;
-        chart.data.datasets[2].data = diffData;
-        chart.update();
-      }
-    })
-    .catch(error => {
-      console.error('Error updating chart:', error);
-      showAlert("Fehler beim Laden der Grafikdaten", "error");
-    });
+function renderChart(data) {
+  if (Array.isArray(data)) {
+    chartEntries = data;
+    chartCursor = data.length ? data[data.length - 1].timestamp : null;
+  } else {
+    chartEntries = chartEntries.concat(data.entries).slice(-MAX_CHART_POINTS);
+    chartCursor = data.cursor;
+  }
+  const timestamps = chartEntries.map(entry => new Date(entry.timestamp * 1000).toLocaleTimeString());
+  const insideData = chartEntries.map(entry => entry.status.inside_absolute_humidity);
+  const outsideData = chartEntries.map(entry => entry.status.outside_absolute_humidity);
+  const diffData = chartEntries.map(entry => entry.status.difference);
+  
+  if (chart) {
+    chart.data.labels = timestamps;
+    chart.data.datasets[0].data = insideData;
+    chart.data.datasets[1].data = outsideData;
+    chart.data.datasets[2].data = diffData;
+    chart.update();
+  }
 }
 
-function updateStatus() {
-  fetch('/api/status')
-    .then(response => response.json())
-    .then(data => {
-      let html = '<ul>';
-      html += `<li><strong>Station:</strong> ${data.api_station_name || data.api_station || 'n.a.'}</li>`;
-      html += `<li><strong>Relay:</strong> ${data.regulation_state || 'n.a.'}</li>`;
-      html += `<li><strong>Temp (innen):</strong> ${data.local_temperature} °C</li>`;
-      html += `<li><strong>Luftfeuchtigkeit (innen):</strong> ${data.local_humidity} %</li>`;
-      html += `<li><strong>Inside AH:</strong> ${data.inside_absolute_humidity}</li>`;
-      html += `<li><strong>Outside AH:</strong> ${data.outside_absolute_humidity || 'n.a.'}</li>`;
-      html += `<li><strong>Diff:</strong> ${data.difference || 'n.a.'}</li>`;
-      html += '</ul>';
-      const statusDiv = document.getElementById('status-info');
-      if (statusDiv) {
-        statusDiv.innerHTML = html;
-      } else {
-        console.error("Status info element not found");
-      }
-    })
-    .catch(error => {
-      console.error('Error updating status:', error);
-      // Spezifische Fehlermeldung anzeigen
-      showAlert("ERROR:root:Error reading sensor: [Errno 121] Remote I/O error", "error");
-    });
+function renderStatus(data) {
+  // Im manuellen Modus zeigt der Status den tatsächlichen Relaiszustand
+  let regulationState = data.regulation_state;
+  if (lastRelayState && ["Hand", "Aus"].includes(regulationState)) {
+    regulationState = lastRelayState.state ? "relay_on" : "relay_off";
+  }
+  let html = '<ul>';
+  html += `<li><strong>Station:</strong> ${data.api_station_name || data.api_station || 'n.a.'}</li>`;
+  html += `<li><strong>Relay:</strong> ${regulationState || 'n.a.'}</li>`;
+  html += `<li><strong>Temp (innen):</strong> ${data.local_temperature} °C</li>`;
+  html += `<li><strong>Luftfeuchtigkeit (innen):</strong> ${data.local_humidity} %</li>`;
+  html += `<li><strong>Inside AH:</strong> ${data.inside_absolute_humidity}</li>`;
+  html += `<li><strong>Outside AH:</strong> ${data.outside_absolute_humidity || 'n.a.'}</li>`;
+  html += `<li><strong>Diff:</strong> ${data.difference || 'n.a.'}</li>`;
+  html += '</ul>';
+  const statusDiv = document.getElementById('status-info');
+  if (statusDiv) {
+    statusDiv.innerHTML = html;
+  } else {
+    console.error("Status info element not found");
+  }
 }
 
+function renderVentilator(state) {
+  lastRelayState = state;
+  const ventImg = document.getElementById('ventImg');
+  if (!ventImg) {
+    console.error("Ventilator image element not found");
+    return;
+  }
+  if (state && state.state) {
+    ventImg.src = "/static/images/pl-green-srx-3d.png";
+    ventImg.alt = "Ventilator EIN";
+  } else {
+    ventImg.src = "/static/images/pm-white-sr-3d.png";
+    ventImg.alt = "Ventilator AUS";
+  }
+}
 
-function updateVentilatorStatus() {
-  fetch('/api/relay')
-    .then(response => response.json())
-    .then(data => {
-      const ventImg = document.getElementById('ventImg');
-      if (!ventImg) {
-        console.error("Ventilator image element not found");
-        return;
-      }
-      const relayState = data.relay_state ? data.relay_state.state : false;
-      if (relayState) {
-        ventImg.src = "/static/images/pl-green-srx-3d.png";
-        ventImg.alt = "Ventilator EIN";
-      } else {
-        ventImg.src = "/static/images/pm-white-sr-3d.png";
-        ventImg.alt = "Ventilator AUS";
-      }
-    })
-    .catch(error => {
-      console.error("Error updating ventilator status:", error);
-      showAlert("Fehler beim Laden des Ventilator-Status", "error");
-    });
+function initStream() {
+  if (!window.EventSource) return;
+  const stream = new EventSource('/api/stream');
+  stream.onopen = () => { streamConnected = true; };
+  // EventSource verbindet sich selbst neu; bis dahin wird wieder gepollt
+  stream.onerror = () => { streamConnected = false; };
+  stream.addEventListener('status', event => renderStatus(JSON.parse(event.data)));
+  stream.addEventListener('relay', event => {
+    const state = JSON.parse(event.data);
+    renderVentilator(state);
+    if (state.mode && modeMapping[state.mode]) {
+      currentMode = state.mode;
+      updateManualControlUI(currentMode);
+    }
+  });
 }
 
 function updateManualControlUI(mode) {
@@ -153,26 +163,54 @@ function handleModeToggle() {
   .catch(err => console.error("Error setting mode:", err));
 }
 
-function updateAll() {
-  updateStatus();
-  updateChart();
-  updateVentilatorStatus();
+function applyConfig(cfg) {
+  currentMode = cfg.relay_mode || "Auto";
+  updateManualControlUI(currentMode);
+  if (!cfg.manual_control_enabled) {
+    const manualBox = document.getElementById('manualControlBox');
+    if (manualBox) manualBox.style.display = "none";
+  }
 }
 
-function initHomePage() {
-  initChart();
-  updateAll();
-  fetch('/api/config')
+// Liest weiter, solange der Server weitere neue Einträge meldet (more)
+function catchUpChart() {
+  fetch(`/api/dashboard?since=${chartCursor}`)
     .then(response => response.json())
-    .then(cfg => {
-      currentMode = cfg.relay_mode || "Auto";
-      updateManualControlUI(currentMode);
-      if (!cfg.manual_control_enabled) {
-        const manualBox = document.getElementById('manualControlBox');
-        if (manualBox) manualBox.style.display = "none";
-      }
+    .then(data => {
+      if (data.error) throw new Error(data.error);
+      renderChart(data);
+      if (data.more) catchUpChart();
+    })
+    .catch(error => console.error('Error updating chart:', error));
+}
+
+// Ein Abruf pro Zyklus; Status und Relais nur, solange der Push-Stream getrennt ist
+function updateAll(withConfig = false) {
+  const fields = ["dashboard"];
+  if (!streamConnected) fields.push("relay", "status");
+  if (withConfig) fields.push("config");
+  let url = `/api/snapshot?fields=${fields.join(",")}`;
+  if (chartCursor !== null) url += `&since=${chartCursor}`;
+  fetch(url)
+    .then(response => response.json())
+    .then(data => {
+      if (data.error) throw new Error(data.error);
+      if (data.config) applyConfig(data.config);
+      if (data.relay) renderVentilator(data.relay.relay_state);
+      if (data.status) renderStatus(data.status);
+      renderChart(data.dashboard);
+      if (data.dashboard.more) catchUpChart();
     })
-    .catch(err => console.error("Error loading config:", err));
+    .catch(error => {
+      console.error('Error updating snapshot:', error);
+      showAlert("Fehler beim Laden der Statusdaten", "error");
+    });
+}
+
+function initHomePage() {
+  initChart();
+  initStream();
+  updateAll(true);
   
   const modeImg = document.getElementById('modeImgHome');
   if (modeImg) {
@@ -1,35 +1,94 @@
 // static/js/logs.js
 
+// Filter der aktuellen Ansicht und Cursor der nächsten (älteren) Seite
+let currentParams = {};
+let nextCursor = null;
+
+/**
+ * Append a single log entry as a table row.
+ */
+function appendLogRow(tbody, entry) {
+    const tr = document.createElement("tr");
+    const date = new Date(entry.timestamp * 1000);
+    const formattedDate = date.toLocaleString();
+    const event = entry.event || "";
+    let details = "";
+    if (entry.message) {
+      details = entry.message;
+    } else if (entry.status) {
+      details = JSON.stringify(entry.status);
+    }
+    tr.innerHTML = `<td>${formattedDate}</td><td>${event}</td><td>${details}</td>`;
+    tbody.appendChild(tr);
+  }
+
+/**
+ * Handle one NDJSON line: a log entry, the trailing cursor line or an error.
+ */
+function handleLogLine(tbody, line) {
+    if (!line.trim()) {
+      return;
+    }
+    const data = JSON.parse(line);
+    if (data.error) {
+      throw new Error(data.error);
+    }
+    if ("next_cursor" in data) {
+      nextCursor = data.next_cursor;
+      return;
+    }
+    appendLogRow(tbody, data);
+  }
+
 /**
- * Fetch logs with given query parameters and display them in the log table.
+ * Fetch logs with given query parameters as NDJSON stream (newest first) and
+ * display them in the log table. With append=true the next older page is added.
  */
-function fetchLogs(params) {
+function fetchLogs(params, append = false) {
     const url = new URL(window.location.origin + "/api/logs");
     Object.keys(params).forEach(key => {
       if (params[key]) {
         url.searchParams.append(key, params[key]);
       }
     });
-  
+    url.searchParams.append("format", "ndjson");
+    if (append && nextCursor) {
+      url.searchParams.append("cursor", nextCursor);
+    }
+    currentParams = params;
+
+    const tbody = document.getElementById("log-table").querySelector("tbody");
+    const loadMore = document.getElementById("load-more");
+    if (!append) {
+      tbody.innerHTML = "";  // Clear the table
+    }
+    nextCursor = null;
+    loadMore.style.display = "none";
+
     fetch(url)
-      .then(response => response.json())
-      .then(data => {
-        const tbody = document.getElementById("log-table").querySelector("tbody");
-        tbody.innerHTML = "";  // Clear the table
-        data.forEach(entry => {
-          const tr = document.createElement("tr");
-          const date = new Date(entry.timestamp * 1000);
-          const formattedDate = date.toLocaleString();
-          const event = entry.event || "";
-          let details = "";
-          if (entry.message) {
-            details = entry.message;
-          } else if (entry.status) {
-            details = JSON.stringify(entry.status);
+      .then(response => {
+        if (!response.ok) {
+          return response.json().then(data => { throw new Error(data.error); });
+        }
+        // Zeilen anzeigen, sobald sie ankommen, statt die ganze Antwort zu puffern
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = "";
+        const pump = () => reader.read().then(({ done, value }) => {
+          if (done) {
+            handleLogLine(tbody, buffer);
+            return;
           }
-          tr.innerHTML = `<td>${formattedDate}</td><td>${event}</td><td>${details}</td>`;
-          tbody.appendChild(tr);
+          buffer += decoder.decode(value, { stream: true });
+          const lines = buffer.split("\n");
+          buffer = lines.pop();
+          lines.forEach(line => handleLogLine(tbody, line));
+          return pump();
         });
+        return pump();
+      })
+      .then(() => {
+        loadMore.style.display = nextCursor ? "" : "none";
       })
       .catch(error => {
         console.error("Error fetching logs:", error);
@@ -50,9 +109,11 @@ function fetchLogs(params) {
       const endISO = end ? new Date(end).toISOString() : "";
       fetchLogs({ start: startISO, end: endISO, event: event, limit: 100 });
     });
+    document.getElementById("load-more").addEventListener("click", function() {
+      fetchLogs(currentParams, true);
+    });
     // Initial fetch
     fetchLogs({ limit: 100 });
   }
   
   document.addEventListener("DOMContentLoaded", initLogPage);
-  
\ No newline at end of file
@@ -27,3 +27,117 @@ def test_get_config(api_client):
     response = api_client.get("/api/config")
     assert response.status_code == 200
     # Hier kann man Details checken, z. B. ob JSON-Felder vorhanden sind
+
+def test_config_etag_not_modified():
+    """
+    Testet, dass /api/config bei passendem ETag 304 liefert, ohne die Konfiguration zu lesen.
+    """
+    from unittest.mock import MagicMock
+    app = Flask(__name__)
+    parameter_service = MagicMock()
+    parameter_service.get_version.return_value = ("config-1-0", 1740823200.0)
+    parameter_service.get_config.return_value = {"relay_mode": "Auto"}
+    app.config["PARAMETER_SERVICE"] = parameter_service
+    app.register_blueprint(api_bp, url_prefix="/api")
+    client = app.test_client()
+
+    first = client.get("/api/config")
+    assert first.status_code == 200
+    etag = first.headers["ETag"]
+
+    parameter_service.get_config.reset_mock()
+    second = client.get("/api/config", headers={"If-None-Match": etag})
+    assert second.status_code == 304
+    parameter_service.get_config.assert_not_called()
+
+    parameter_service.get_version.return_value = ("config-1-1", 1740823300.0)
+    assert client.get("/api/config", headers={"If-None-Match": etag}).status_code == 200
+
+def test_snapshot_sections():
+    """
+    Testet, dass /api/snapshot die gewählten Abschnitte liefert und den Relaiszustand
+    nur einmal liest.
+    """
+    from unittest.mock import MagicMock
+    app = Flask(__name__)
+    regulation_service = MagicMock()
+    regulation_service.get_status.return_value = {"regulation_state": "Hand", "difference": 1.5}
+    relay_service = MagicMock()
+    relay_service.get_state.return_value = {"state": True, "mode": "Hand"}
+    log_reader = MagicMock()
+    log_reader.get_status_since.return_value = {"entries": [{"timestamp": 100.0, "status": {"difference": 1.5}}],
+                                                "cursor": 100.0, "more": False}
+    app.config["REGULATION_SERVICE"] = regulation_service
+    app.config["RELAY_SERVICE"] = relay_service
+    app.config["LOG_READER_SERVICE"] = log_reader
+    app.register_blueprint(api_bp, url_prefix="/api")
+    client = app.test_client()
+
+    data = client.get("/api/snapshot?fields=status,relay,dashboard&since=50").get_json()
+    assert set(data) == {"timestamp", "status", "relay", "dashboard"}
+    assert data["status"]["regulation_state"] == "relay_on"
+    assert data["relay"] == {"relay_state": {"state": True, "mode": "Hand"}}
+    assert data["dashboard"] == {"entries": [{"timestamp": 100.0, "status": {"difference": 1.5}}],
+                                 "cursor": 100.0, "more": False}
+    relay_service.get_state.assert_called_once()
+    log_reader.get_status_since.assert_called_once_with(50.0, limit=100)
+
+    assert client.get("/api/snapshot?fields=relay").get_json().keys() == {"timestamp", "relay"}
+    assert client.get("/api/snapshot?fields=weather").status_code == 400
+    # Ohne ParameterService kann "config" nicht geliefert werden
+    assert client.get("/api/snapshot").status_code == 500
+
+def test_gzip_compression_and_reuse():
+    """
+    Testet die gzip-Kompression grosser JSON-Antworten, die Mindestgrösse und die
+    Wiederverwendung des komprimierten Körpers bei gleichem ETag.
+    """
+    import gzip, json
+    from unittest.mock import MagicMock, patch
+    app = Flask(__name__)
+    app.config["COMPRESSION"] = {"min_size": 200}
+    parameter_service = MagicMock()
+    parameter_service.get_version.return_value = ("config-1-0", 1740823200.0)
+    parameter_service.get_config.return_value = {"stations": ["ARO"] * 200}
+    app.config["PARAMETER_SERVICE"] = parameter_service
+    app.register_blueprint(api_bp, url_prefix="/api")
+    client = app.test_client()
+
+    plain = client.get("/api/config")
+    assert "Content-Encoding" not in plain.headers
+    assert "Accept-Encoding" in plain.headers["Vary"]
+
+    with patch("routes.api.gzip.compress", wraps=gzip.compress) as compress:
+        first = client.get("/api/config", headers={"Accept-Encoding": "gzip"})
+        second = client.get("/api/config", headers={"Accept-Encoding": "gzip"})
+    assert first.headers["Content-Encoding"] == "gzip"
+    assert json.loads(gzip.decompress(first.data)) == {"stations": ["ARO"] * 200}
+    assert second.data == first.data
+    assert compress.call_count == 1
+    # Eigenes ETag fuer die gzip-Variante; If-None-Match passt auf beide Varianten
+    assert first.headers["ETag"] == '"config-1-0-gzip"' and plain.headers["ETag"] == '"config-1-0"'
+    for etag in ('"config-1-0-gzip"', '"config-1-0"'):
+        revalidated = client.get("/api/config", headers={"Accept-Encoding": "gzip", "If-None-Match": etag})
+        assert revalidated.status_code == 304 and revalidated.headers["ETag"] == etag
+
+    parameter_service.get_config.return_value = {"stations": ["ARO"]}
+    parameter_service.get_version.return_value = ("config-1-1", 1740823300.0)
+    small = client.get("/api/config", headers={"Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in small.headers
+
+def test_dashboard_bad_input():
+    """
+    Testet, dass ungültige Parameter bei /api/dashboard 400 statt 500 ergeben.
+    """
+    from unittest.mock import MagicMock
+    app = Flask(__name__)
+    log_reader = MagicMock()
+    log_reader.get_log_version.return_value = ("log-1", 1740823200.0)
+    app.config["LOG_READER_SERVICE"] = log_reader
+    app.register_blueprint(api_bp, url_prefix="/api")
+    client = app.test_client()
+
+    assert client.get("/api/dashboard?since=gestern").status_code == 400
+    assert client.get("/api/dashboard?limit=viele").status_code == 400
+    log_reader.get_status_since.side_effect = ValueError("Invalid date format")
+    assert client.get("/api/dashboard?since=5").status_code == 400
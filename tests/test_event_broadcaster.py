@@ -0,0 +1,86 @@
+import pytest
+import json
+from unittest.mock import patch
+from services.event_broadcaster import EventBroadcaster
+
+def _events(chunk):
+    """
+    Zerlegt einen SSE-Block in (Ereignis, Daten)-Paare.
+    """
+    result = []
+    for block in chunk.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.split("\n"))
+        result.append((lines["event"], json.loads(lines["data"])))
+    return result
+
+def test_snapshot_on_subscribe():
+    """
+    Testet, dass ein neuer Client zuerst den letzten Stand jedes Ereignisses erhaelt.
+    """
+    broadcaster = EventBroadcaster()
+    broadcaster.publish("status", {"difference": 1.0})
+    broadcaster.publish("status", {"difference": 2.0})
+    broadcaster.publish("relay", {"state": True, "mode": "Auto"})
+
+    subscription = broadcaster.subscribe()
+    chunk = next(subscription.messages(keepalive_interval=0.01))
+    assert _events(chunk) == [("status", {"difference": 2.0}), ("relay", {"state": True, "mode": "Auto"})]
+
+def test_publish_serializes_once():
+    """
+    Testet, dass eine Nachricht fuer alle Clients nur einmal serialisiert wird.
+    """
+    broadcaster = EventBroadcaster()
+    subscriptions = [broadcaster.subscribe() for _ in range(5)]
+    with patch("services.event_broadcaster.json.dumps", wraps=json.dumps) as dumps:
+        broadcaster.publish("relay", {"state": False, "mode": "Aus"})
+    assert dumps.call_count == 1
+    for subscription in subscriptions:
+        assert _events(next(subscription.messages(0.01))) == [("relay", {"state": False, "mode": "Aus"})]
+
+def test_slow_client_disconnected():
+    """
+    Testet, dass ein Client mit vollem Puffer getrennt wird, ohne andere zu beeinflussen.
+    """
+    broadcaster = EventBroadcaster({"client_queue_size": 3})
+    slow = broadcaster.subscribe()
+    fast = broadcaster.subscribe()
+    fast_messages = fast.messages(0.01)
+    for i in range(5):
+        broadcaster.publish("status", {"i": i})
+        assert _events(next(fast_messages)) == [("status", {"i": i})]
+
+    assert slow.closed
+    assert list(slow.messages(0.01)) == []
+    stats = broadcaster.get_stats()
+    assert stats["clients"] == 1
+    assert stats["disconnected_slow_clients"] == 1
+
+def test_drop_oldest_policy():
+    """
+    Testet, dass mit "drop_oldest" nur die neuesten Nachrichten im Puffer bleiben.
+    """
+    broadcaster = EventBroadcaster({"client_queue_size": 2, "slow_client_policy": "drop_oldest"})
+    subscription = broadcaster.subscribe()
+    for i in range(5):
+        broadcaster.publish("status", {"i": i})
+    assert not subscription.closed
+    assert subscription.dropped == 3
+    assert _events(next(subscription.messages(0.01))) == [("status", {"i": 3}), ("status", {"i": 4})]
+
+def test_max_clients_and_keepalive():
+    """
+    Testet die Begrenzung der Clientanzahl und den Keepalive-Kommentar ohne Nachrichten.
+    """
+    broadcaster = EventBroadcaster({"max_clients": 1})
+    subscription = broadcaster.subscribe()
+    with pytest.raises(RuntimeError):
+        broadcaster.subscribe()
+    assert next(subscription.messages(0.01)) == ": keepalive\n\n"
+
+    broadcaster.unsubscribe(subscription)
+    broadcaster.subscribe()
+
+def test_invalid_policy():
+    with pytest.raises(ValueError):
+        EventBroadcaster({"slow_client_policy": "ignore"})
@@ -0,0 +1,413 @@
+import pytest
+import json
+import gzip
+import time
+from datetime import datetime, timezone
+from unittest.mock import MagicMock
+from services.log_reader_service import LogReaderService
+from services import log_segments
+
+BASE = 1740823200.0  # 2025-03-01T10:00Z
+
+def _iso(ts):
+    return datetime.fromtimestamp(ts, tz=timezone.utc).isoformat()
+
+@pytest.fixture
+def segmented_log(tmp_path):
+    """
+    Legt ein komprimiertes, ein unkomprimiertes rotiertes und ein aktives Segment an.
+    """
+    log_file = str(tmp_path / "log.json")
+
+    def write(f, start, events):
+        for i, event in enumerate(events):
+            f.write(json.dumps({"event": event, "timestamp": start + i * 60}) + "\n")
+
+    with gzip.open(log_segments.rotated_path(log_file, BASE) + ".gz", "wt") as f:
+        write(f, BASE, ["status_update", "relay_turned_on", "status_update"])
+    with open(log_segments.rotated_path(log_file, BASE + 3600), "w") as f:
+        write(f, BASE + 3600, ["status_update", "relay_turned_off"])
+    with open(log_file, "w") as f:
+        write(f, BASE + 7200, ["status_update", "status_update"])
+    return log_file
+
+@pytest.fixture
+def reader(segmented_log):
+    parameter_service = MagicMock()
+    parameter_service.get_config.return_value = {"logging": {"log_file": segmented_log}}
+    return LogReaderService(parameter_service)
+
+def test_reads_across_segments(reader):
+    """
+    Testet, dass die neuesten Eintraege ueber alle Segmente hinweg in Reihenfolge kommen.
+    """
+    logs = reader.get_filtered_logs(limit=100)
+    assert [e["timestamp"] for e in logs] == [BASE, BASE + 60, BASE + 120,
+                                             BASE + 3600, BASE + 3660,
+                                             BASE + 7200, BASE + 7260]
+
+def test_limit_keeps_newest(reader):
+    logs = reader.get_filtered_logs(limit=3)
+    assert [e["timestamp"] for e in logs] == [BASE + 3660, BASE + 7200, BASE + 7260]
+
+def test_event_filter_in_compressed_segment(reader):
+    logs = reader.get_filtered_logs(event_filter="relay_turned_on")
+    assert len(logs) == 1
+    assert logs[0]["timestamp"] == BASE + 60
+
+def test_time_range(reader):
+    logs = reader.get_filtered_logs(_iso(BASE + 100), _iso(BASE + 3600))
+    assert [e["timestamp"] for e in logs] == [BASE + 120, BASE + 3600]
+
+def test_invalid_date(reader):
+    with pytest.raises(ValueError):
+        reader.get_filtered_logs("gestern")
+
+def test_time_index_limits_decoding(tmp_path):
+    """
+    Testet, dass bei einer Zeitbereichsabfrage ueber den Zeitindex nur
+    die Zeilen im Bereich dekodiert werden.
+    """
+    from services.logging_service import LoggingService
+    log_file = str(tmp_path / "log.json")
+    logger = LoggingService(log_file, {"rotation": "none", "index_stride": 512})
+    entries = [{"event": "status_update", "n": i, "timestamp": BASE + i} for i in range(2000)]
+    logger._enqueue([(e["timestamp"], e["event"], json.dumps(e), None, e) for e in entries])
+    logger.close()
+    assert (tmp_path / "log.json.tsidx").exists()
+
+    parameter_service = MagicMock()
+    parameter_service.get_config.return_value = {"logging": {"log_file": log_file}}
+    reader = LogReaderService(parameter_service)
+    decoded = []
+    original_match = reader._match
+    def counting_match(line, *args):
+        decoded.append(line)
+        return original_match(line, *args)
+    reader._match = counting_match
+
+    logs = reader.get_filtered_logs(_iso(BASE + 100), _iso(BASE + 109))
+    assert [e["n"] for e in logs] == list(range(100, 110))
+    assert len(decoded) < 50, "Nur der indexierte Bereich sollte gelesen werden"
+
+def test_time_index_rebuilt_for_rotated_segment(segmented_log, reader):
+    """
+    Testet, dass fehlende Indizes rotierter Segmente bei Bedarf neu gebaut werden.
+    """
+    import os
+    logs = reader.get_filtered_logs(_iso(BASE + 3600), _iso(BASE + 3600))
+    assert [e["timestamp"] for e in logs] == [BASE + 3600]
+    rotated = log_segments.rotated_path(segmented_log, BASE + 3600)
+    assert os.path.exists(rotated + ".tsidx")
+
+def test_event_index_reads_only_postings(tmp_path):
+    """
+    Testet, dass ein seltenes Ereignis ueber die Posting-Liste gefunden wird,
+    ohne die status_update-Zeilen zu dekodieren.
+    """
+    from services.logging_service import LoggingService
+    log_file = str(tmp_path / "log.json")
+    logger = LoggingService(log_file, {"rotation": "none"})
+    items = []
+    for i in range(1000):
+        event = "relay_turned_on" if i % 250 == 0 else "status_update"
+        entry = {"event": event, "n": i, "timestamp": BASE + i}
+        items.append((BASE + i, event, json.dumps(entry), None, entry))
+    logger._enqueue(items)
+    logger.close()
+
+    parameter_service = MagicMock()
+    parameter_service.get_config.return_value = {"logging": {"log_file": log_file}}
+    reader = LogReaderService(parameter_service)
+    decoded = []
+    original_match = reader._match
+    def counting_match(line, *args):
+        decoded.append(line)
+        return original_match(line, *args)
+    reader._match = counting_match
+
+    logs = reader.get_filtered_logs(event_filter="relay_turned_on", limit=3)
+    assert [e["n"] for e in logs] == [250, 500, 750]
+    assert len(decoded) == 3
+    assert reader.get_event_counts() == {"status_update": 996, "relay_turned_on": 4}
+
+def test_event_counts_across_segments(reader):
+    assert reader.get_event_counts() == {"status_update": 5, "relay_turned_on": 1, "relay_turned_off": 1}
+
+def test_status_series_from_sparse_samples(tmp_path):
+    """
+    Testet die Rekonstruktion einer Treppenfunktion aus spaerlichen Messungen.
+    """
+    log_file = tmp_path / "log.json"
+    with open(log_file, "w") as f:
+        for ts, diff in [(BASE - 30, 1.0), (BASE + 25, 2.0), (BASE + 50, 3.0)]:
+            f.write(json.dumps({"event": "status_update", "status": {"difference": diff}, "timestamp": ts}) + "\n")
+    parameter_service = MagicMock()
+    parameter_service.get_config.return_value = {"logging": {"log_file": str(log_file)}}
+    reader = LogReaderService(parameter_service)
+
+    series = reader.get_status_series(_iso(BASE), _iso(BASE + 60), step=10)
+    assert [e["timestamp"] for e in series] == [BASE + i * 10 for i in range(7)]
+    assert [e["status"]["difference"] for e in series] == [1.0, 1.0, 1.0, 2.0, 2.0, 3.0, 3.0]
+
+    with pytest.raises(ValueError):
+        reader.get_status_series(_iso(BASE), _iso(BASE + 60), step=0)
+
+def test_status_series_streams_whole_range(tmp_path):
+    """
+    Testet, dass die Treppenfunktion den ganzen Bereich vorwaerts liest: auch die
+    fruehesten Rasterpunkte tragen die echten Messungen, ohne alle Messungen zu laden.
+    """
+    log_file = tmp_path / "log.json"
+    with open(log_file, "w") as f:
+        for i in range(500):
+            f.write(json.dumps({"event": "status_update", "status": {"difference": float(i)},
+                                "timestamp": BASE + i}) + "\n")
+    parameter_service = MagicMock()
+    parameter_service.get_config.return_value = {"logging": {"log_file": str(log_file)}}
+    reader = LogReaderService(parameter_service)
+    filtered = reader.get_filtered_logs
+
+    def only_before(*args, **kwargs):
+        assert kwargs.get("limit") == 1, "Bereich darf nicht als Liste geladen werden"
+        return filtered(*args, **kwargs)
+
+    reader.get_filtered_logs = only_before
+    series = reader.get_status_series(_iso(BASE), _iso(BASE + 499), step=100)
+    assert [e["status"]["difference"] for e in series] == [0.0, 100.0, 200.0, 300.0, 400.0]
+    assert [e["sample_timestamp"] for e in series] == [BASE + i * 100 for i in range(5)]
+
+def test_cursor_pages_cover_all_entries(tmp_path):
+    """
+    Testet, dass die Seiten per Cursor lueckenlos und ohne Duplikate aufeinander folgen,
+    auch wenn mehrere Eintraege denselben Zeitstempel haben.
+    """
+    log_file = tmp_path / "log.json"
+    timestamps = [BASE, BASE + 1, BASE + 1, BASE + 1, BASE + 2, BASE + 3, BASE + 3]
+    log_file.write_text("".join(json.dumps({"event": "status_update", "n": i, "timestamp": ts}) + "\n"
+                                for i, ts in enumerate(timestamps)))
+    parameter_service = MagicMock()
+    parameter_service.get_config.return_value = {"logging": {"log_file": str(log_file)}}
+    reader = LogReaderService(parameter_service)
+
+    seen = []
+    cursor = None
+    for _ in range(10):
+        page = reader.get_logs_page(limit=2, cursor=cursor)
+        seen.extend(entry["n"] for entry in page)
+        cursor = page.next_cursor
+        if cursor is None:
+            break
+    assert seen == [6, 5, 4, 3, 2, 1, 0]
+
+def test_invalid_cursor(reader):
+    with pytest.raises(ValueError):
+        reader.get_logs_page(cursor="kein-cursor")
+
+def test_prefilter_on_raw_line():
+    """
+    Testet die Vorpruefung auf der Rohzeile: Ereignis und Zeitstempel werden ohne
+    Dekodieren verworfen, fremde Formate werden durchgelassen.
+    """
+    from services.log_reader_service import prefilter, event_token
+    line = json.dumps({"event": "status_update", "status": {"event": "x"}, "timestamp": BASE}).encode() + b"\n"
+    assert prefilter(line, token=event_token("status_update"))
+    assert not prefilter(line, token=event_token("relay_turned_on"))
+    assert prefilter(line, BASE - 1, BASE + 1)
+    assert not prefilter(line, start_time=BASE + 1)
+    assert not prefilter(line, end_time=BASE - 1)
+    # Ereignis nicht an erster Stelle, Zeitstempel nicht am Ende: Entscheidung beim Dekodieren
+    other = json.dumps({"timestamp": BASE, "event": "status_update"}).encode()
+    assert prefilter(other, start_time=BASE + 1, token=event_token("relay_turned_on"))
+
+def test_prefilter_skips_decoding(reader, monkeypatch):
+    """
+    Testet, dass bei einem Ereignisfilter nur passende Zeilen mit json.loads dekodiert werden.
+    """
+    import services.log_reader_service as module
+    decoded = []
+    original_loads = json.loads
+    monkeypatch.setattr(module.json, "loads", lambda data, *a, **kw: decoded.append(data) or original_loads(data, *a, **kw))
+    logs = reader.get_filtered_logs(event_filter="relay_turned_off")
+    assert [e["timestamp"] for e in logs] == [BASE + 3660]
+    assert all(b"relay_turned_off" in line for line in decoded if isinstance(line, bytes) and b'"event"' in line)
+
+def test_recent_queries_served_from_ring(tmp_path):
+    """
+    Testet, dass Dashboard und juengste Log-Abfragen ohne Dateizugriff beantwortet werden.
+    """
+    from services.logging_service import LoggingService
+    log_file = str(tmp_path / "log.json")
+    logger = LoggingService(log_file, {"rotation": "none", "telemetry": False, "rollups": False})
+    for i in range(3):
+        logger.log({"event": "status_update", "status": {"difference": i}})
+    logger.flush()
+
+    parameter_service = MagicMock()
+    parameter_service.get_config.return_value = {"logging": {"log_file": log_file}}
+    reader = LogReaderService(parameter_service, logger)
+    reader._read_segment = MagicMock(side_effect=AssertionError("Plattenzugriff"))
+    history = reader.get_status_history(limit=2)
+    assert [e["status"]["difference"] for e in history] == [1, 2]
+    assert len(reader.get_filtered_logs(start_param=_iso(time.time() - 60))) == 3
+    logger.close()
+
+def test_aggregate_buckets(tmp_path):
+    """
+    Testet die Aggregation eines verschachtelten Feldes in Zeitfenstern.
+    """
+    log_file = tmp_path / "log.json"
+    lines = [{"event": "status_update", "status": {"difference": float(i)}, "timestamp": BASE + i * 60}
+             for i in range(10)]
+    lines.insert(3, {"event": "relay_turned_on", "timestamp": BASE + 130})
+    log_file.write_text("".join(json.dumps(line) + "\n" for line in lines))
+    parameter_service = MagicMock()
+    parameter_service.get_config.return_value = {"logging": {"log_file": str(log_file)}}
+    reader = LogReaderService(parameter_service)
+
+    result = reader.get_aggregate("status.difference", 300, ["mean", "min", "max", "count"],
+                                  _iso(BASE), _iso(BASE + 600))
+    assert [b["start"] for b in result["buckets"]] == [BASE, BASE + 300]
+    assert result["buckets"][0] == {"start": BASE, "mean": 2.0, "min": 0.0, "max": 4.0, "count": 5}
+    assert result["buckets"][1]["mean"] == 7.0
+
+    with pytest.raises(ValueError):
+        reader.get_aggregate("status.difference", 300, ["median"], _iso(BASE), _iso(BASE + 600))
+
+def test_aggregate_streams_forward(reader):
+    """
+    Testet, dass die Aggregation vorwaerts ueber alle Segmente liest, ohne die Treffer
+    eines komprimierten Segments zu puffern.
+    """
+    reader._read_segment = MagicMock(side_effect=AssertionError("Rueckwaertspfad verwendet"))
+    result = reader.get_aggregate("timestamp", 3600, ["count"], _iso(BASE), _iso(BASE + 7260))
+    assert [b["count"] for b in result["buckets"]] == [3, 2, 2]
+
+def test_export_csv_across_segments(reader):
+    """
+    Testet den CSV-Export ueber alle Segmente (aelteste zuerst) mit abgeflachten Statusfeldern.
+    """
+    import csv, io
+    text = "".join(reader.export_csv(_iso(BASE + 60), _iso(BASE + 3600), rows_per_chunk=1))
+    rows = list(csv.reader(io.StringIO(text)))
+    assert rows[0][:3] == ["timestamp", "time", "event"]
+    assert "status.difference" in rows[0]
+    assert [float(r[0]) for r in rows[1:]] == [BASE + 60, BASE + 120, BASE + 3600]
+
+def test_csv_row_flattens_status():
+    from services.log_reader_service import csv_row, CSV_COLUMNS
+    row = dict(zip(CSV_COLUMNS, csv_row({"event": "status_update", "timestamp": BASE,
+                                         "status": {"difference": 4.2, "extra": 1}, "message": "x"})))
+    assert row["status.difference"] == 4.2
+    assert row["status.local_humidity"] == ""
+    assert json.loads(row["details"]) == {"message": "x", "status": {"extra": 1}}
+
+def test_since_returns_only_newer_entries(reader):
+    """
+    Testet since-Abfragen: nur strikt neuere Eintraege, ohne aeltere Segmente zu lesen.
+    """
+    scan_forward = reader._scan_forward
+
+    def no_compressed(segment, *args):
+        assert segment.compression is None, "komprimiertes Segment gelesen"
+        return scan_forward(segment, *args)
+
+    reader._scan_forward = no_compressed
+    page = reader.get_logs_since(BASE + 3660)
+    assert [e["timestamp"] for e in page["entries"]] == [BASE + 7200, BASE + 7260]
+    assert page["cursor"] == BASE + 7260 and not page["more"]
+    history = reader.get_status_since(BASE + 7200)
+    assert [e["timestamp"] for e in history["entries"]] == [BASE + 7260]
+    assert reader.get_status_since(BASE + 7260) == {"entries": [], "cursor": BASE + 7260, "more": False}
+
+def test_since_pages_lose_nothing(reader):
+    """
+    Testet, dass bei mehr neuen Eintraegen als limit die aeltesten zuerst kommen und
+    ueber more/cursor alle nachgeladen werden, auch aus dem Telemetriespeicher.
+    """
+    seen, cursor, more = [], BASE + 60, True
+    while more:
+        page = reader.get_logs_since(cursor, limit=2)
+        seen += [e["timestamp"] for e in page["entries"]]
+        cursor, more = page["cursor"], page["more"]
+    assert seen == [BASE + 120, BASE + 3600, BASE + 3660, BASE + 7200, BASE + 7260]
+
+    from services.telemetry_store import TelemetryStore, pack_status
+    log_file = reader._log_file()
+    store = TelemetryStore(TelemetryStore.path_for(log_file))
+    store.append([pack_status(BASE + i, {}) for i in range(10)])
+    store.close()
+    seen, cursor, more = [], BASE + 2, True
+    while more:
+        page = reader.get_status_since(cursor, limit=3)
+        seen += [e["timestamp"] for e in page["entries"]]
+        cursor, more = page["cursor"], page["more"]
+    assert seen == [BASE + i for i in range(3, 10)]
+
+def test_since_page_keeps_equal_timestamps_together():
+    from services.log_reader_service import since_page
+    entries = [{"timestamp": ts} for ts in (1.0, 2.0, 2.0, 2.0, 3.0)]
+    page = since_page(iter(entries), 0.0, 2)
+    assert [e["timestamp"] for e in page["entries"]] == [1.0, 2.0, 2.0, 2.0]
+    assert page["cursor"] == 2.0 and page["more"]
+    assert since_page(iter(entries[4:]), 2.0, 2) == {"entries": [{"timestamp": 3.0}], "cursor": 3.0, "more": False}
+
+def test_non_monotonic_timestamps_in_range(tmp_path):
+    """
+    Testet, dass ein Uhrsprung (aelterer Zeitstempel mitten im Segment) die Bereichsabfrage
+    nicht vorzeitig beendet.
+    """
+    log_file = str(tmp_path / "log.json")
+    with open(log_file, "w") as f:
+        for ts in (BASE, BASE + 120, BASE - 3000, BASE + 180):
+            f.write(json.dumps({"event": "status_update", "timestamp": ts}) + "\n")
+    parameter_service = MagicMock()
+    parameter_service.get_config.return_value = {"logging": {"log_file": log_file}}
+    logs = LogReaderService(parameter_service).get_filtered_logs(_iso(BASE), limit=10)
+    assert [e["timestamp"] for e in logs] == [BASE, BASE + 120, BASE + 180]
+
+def test_parallel_scan_matches_sequential(tmp_path):
+    """
+    Testet, dass der parallele Scan grosser Segmente dieselben Eintraege in derselben
+    Reihenfolge liefert wie der sequentielle, inklusive limit.
+    """
+    from services.logging_service import LoggingService
+    log_file = str(tmp_path / "log.json")
+    logger = LoggingService(log_file, {"rotation": "none"})
+    items = []
+    for i in range(3000):
+        event = "relay_turned_on" if i % 3 == 0 else "status_update"
+        entry = {"event": event, "n": i, "timestamp": BASE + i}
+        items.append((BASE + i, event, json.dumps(entry), None, entry))
+    logger._enqueue(items)
+    logger.close()
+
+    sequential_service = MagicMock()
+    sequential_service.get_config.return_value = {"logging": {"log_file": log_file, "parallel_scan_threshold": 0}}
+    sequential = LogReaderService(sequential_service)
+    parallel_service = MagicMock()
+    parallel_service.get_config.return_value = {"logging": {"log_file": log_file, "parallel_scan_threshold": 1,
+                                                            "parallel_scan_workers": 2}}
+    parallel = LogReaderService(parallel_service)
+    parallel.PARALLEL_MIN_CHUNK = 4096
+    try:
+        for kwargs in ({"limit": 10}, {"limit": 2500}, {"event_filter": "status_update", "limit": 1500},
+                       {"start_param": _iso(BASE + 500), "end_param": _iso(BASE + 2600), "limit": 5000}):
+            assert parallel.get_filtered_logs(**kwargs) == sequential.get_filtered_logs(**kwargs)
+        assert parallel._pool is not None
+        # Vorwaerts (Export, Aggregation) immer sequentiell mit konstantem Speicher
+        parallel._scan_parallel = MagicMock(side_effect=AssertionError("paralleler Scan in iter_range"))
+        assert list(parallel.iter_range(BASE + 10)) == list(sequential.iter_range(BASE + 10))
+    finally:
+        parallel.close()
+
+def test_split_ranges_on_line_boundaries(tmp_path):
+    from services.log_reader_service import split_ranges
+    path = tmp_path / "lines.txt"
+    path.write_bytes(b"".join(b"%d\n" % i * (i % 7 + 1) for i in range(500)))
+    data = path.read_bytes()
+    with open(path, "rb") as f:
+        ranges = split_ranges(f, 0, len(data), 100)
+    assert ranges[0][0] == 0 and ranges[-1][1] == len(data)
+    assert all(a[1] == b[0] for a, b in zip(ranges, ranges[1:]))
+    assert all(data[hi - 1:hi] == b"\n" for lo, hi in ranges)
@@ -23,6 +23,7 @@ def test_log_single_entry(temp_log_file):
     """
     logger = LoggingService(temp_log_file)
     logger.log({"event": "test_event", "value": 123})
+    logger.flush()
 
     with open(temp_log_file, "r") as f:
         lines = f.readlines()
@@ -40,6 +41,7 @@ def test_log_multiple_entries(temp_log_file):
     logger = LoggingService(temp_log_file)
     for i in range(3):
         logger.log({"count": i})
+    logger.flush()
     with open(temp_log_file, "r") as f:
         lines = f.readlines()
     assert len(lines) == 3, "Drei Eintraege erwartet"
@@ -64,8 +66,197 @@ def test_log_thread_safety(temp_log_file):
 
     for t in threads:
         t.join()
+    logger.flush()
 
     # Pruefen, ob alle Eintraege vorhanden sind
     with open(temp_log_file, "r") as f:
         lines = f.readlines()
     assert len(lines) == 10, "Alle 10 Threads sollten geschrieben haben"
+
+def test_log_many_single_batch(temp_log_file):
+    """
+    Testet, dass log_many alle Eintraege annimmt und gemeinsam schreibt.
+    """
+    logger = LoggingService(temp_log_file, {"batch_size": 100, "flush_interval": 5})
+    accepted = logger.log_many([{"count": i} for i in range(20)])
+    assert accepted == 20
+    logger.flush()
+
+    with open(temp_log_file, "r") as f:
+        lines = f.readlines()
+    assert [json.loads(l)["count"] for l in lines] == list(range(20))
+    stats = logger.get_stats()
+    assert stats["written"] == 20
+    assert stats["batches"] == 1, "Ein Flush sollte einen einzigen Batch ergeben"
+    logger.close()
+
+def test_overflow_drop_newest(temp_log_file):
+    """
+    Testet, dass bei voller Warteschlange neue Eintraege verworfen werden,
+    ohne den Aufrufer zu blockieren.
+    """
+    logger = LoggingService(temp_log_file, {"queue_size": 5, "flush_interval": 5,
+                                            "batch_size": 1000, "overflow_policy": "drop_newest"})
+    # Der Writer sammelt bis flush_interval, die Warteschlange laeuft also voll
+    results = [logger.log({"count": i}) for i in range(8)]
+    assert results == [True] * 5 + [False] * 3
+    assert logger.get_stats()["dropped"] == 3
+    logger.close()
+
+def test_overflow_drop_oldest(temp_log_file):
+    """
+    Testet, dass bei "drop_oldest" die aeltesten wartenden Eintraege geopfert werden.
+    """
+    logger = LoggingService(temp_log_file, {"queue_size": 3, "flush_interval": 5,
+                                            "batch_size": 1000, "overflow_policy": "drop_oldest"})
+    logger.log_many([{"count": i} for i in range(6)])
+    logger.close()
+
+    with open(temp_log_file, "r") as f:
+        counts = [json.loads(l)["count"] for l in f]
+    assert counts == [3, 4, 5]
+    assert logger.get_stats()["dropped"] == 3
+
+def test_invalid_overflow_policy(temp_log_file):
+    with pytest.raises(ValueError):
+        LoggingService(temp_log_file, {"overflow_policy": "explode"})
+
+def _line(ts, **fields):
+    fields["timestamp"] = ts
+    return (ts, fields.get("event"), json.dumps(fields), None, fields)
+
+def test_rotation_into_segments(tmp_path):
+    """
+    Testet, dass beim Wechsel der Periode das aktive Segment umbenannt
+    und im Hintergrund komprimiert wird.
+    """
+    log_file = str(tmp_path / "log.json")
+    logger = LoggingService(log_file, {"rotation": "hour", "compression": "gzip"})
+    base = 1740823200.0  # 2025-03-01T10:00Z
+    logger._enqueue([_line(base + 10, event="a"), _line(base + 3610, event="b")])
+    logger.flush()
+
+    with open(log_file) as f:
+        assert [json.loads(l)["event"] for l in f] == ["b"]
+    rotated = tmp_path / "log-20250301T1000Z.json.gz"
+    deadline = time.time() + 5
+    while not rotated.exists() and time.time() < deadline:
+        time.sleep(0.05)
+    logger.close()
+    assert rotated.exists(), "Rotiertes Segment sollte komprimiert vorliegen"
+    import gzip
+    with gzip.open(rotated, "rt") as f:
+        assert [json.loads(l)["event"] for l in f] == ["a"]
+
+def test_budget_thins_then_drops(tmp_path):
+    """
+    Testet das Groessenbudget: alte Segmente werden erst ausgeduennt, dann geloescht.
+    """
+    from services import log_segments
+    log_file = str(tmp_path / "log.json")
+    base = 1740823200.0
+    for hour in range(3):
+        start = base + hour * 3600
+        with open(log_segments.rotated_path(log_file, start), "w") as f:
+            for i in range(600):
+                f.write(json.dumps({"event": "status_update", "timestamp": start + i}) + "\n")
+    with open(log_file, "w") as f:
+        f.write(json.dumps({"event": "x", "timestamp": base + 4 * 3600}) + "\n")
+
+    log_segments.run_maintenance(log_file, "none", 1, "thin", 300)
+    names = sorted(os.listdir(tmp_path))
+    # Budget von 1 Byte ist nicht erreichbar: alle rotierten Segmente sind weg, aktives bleibt
+    assert names == ["log.json"]
+
+    with open(log_segments.rotated_path(log_file, base), "w") as f:
+        for i in range(600):
+            f.write(json.dumps({"event": "status_update", "timestamp": base + i}) + "\n")
+    log_segments.run_maintenance(log_file, "none", 2000, "thin", 300)
+    thinned = log_segments.rotated_path(log_file, base, thinned=True)
+    with open(thinned) as f:
+        assert len(f.readlines()) == 2, "Nur eine status_update-Zeile pro 300 s"
+
+def test_deadband_mode_writes_only_changes(tmp_path):
+    """
+    Testet den Totband-Modus: Rauschen wird nicht geloggt, Zustandswechsel
+    und Heartbeats schon; Telemetrie erhaelt trotzdem jede Messung.
+    """
+    from services.telemetry_store import TelemetryStore
+    log_file = str(tmp_path / "log.json")
+    logger = LoggingService(log_file, {"status_mode": "deadband", "heartbeat_interval": 3600})
+
+    def status(temp, state="idle"):
+        return {"event": "status_update", "status": {"local_temperature": temp, "regulation_state": state}}
+
+    logger.log(status(20.0))                  # erste Messung: schreiben
+    logger.log(status(20.05))                 # Rauschen: unterdruecken
+    logger.log(status(20.3))                  # > 0.1 Totband: schreiben
+    logger.log(status(20.3, "pending_on"))    # Zustandswechsel: schreiben
+    logger.log(status(20.32, "pending_on"))   # Rauschen: unterdruecken
+    logger.log({"event": "relay_turned_on"})  # andere Ereignisse immer
+    logger.close()
+
+    with open(log_file) as f:
+        lines = [json.loads(l) for l in f]
+    assert [(e["event"], e.get("status", {}).get("local_temperature")) for e in lines] == [
+        ("status_update", 20.0), ("status_update", 20.3), ("status_update", 20.3), ("relay_turned_on", None)]
+    assert logger.get_stats()["suppressed"] == 2
+    assert len(TelemetryStore(TelemetryStore.path_for(log_file))) == 5
+
+def test_deadband_heartbeat():
+    from services.deadband_filter import DeadbandFilter
+    deadband = DeadbandFilter(heartbeat_interval=10)
+    assert deadband.should_write(0, {"difference": 1.0})
+    assert not deadband.should_write(5, {"difference": 1.01})
+    assert deadband.should_write(10, {"difference": 1.01})
+    assert deadband.should_write(11, {"difference": None})
+
+def test_recent_entries_seeded_from_tail(tmp_path):
+    """
+    Testet, dass der Ringpuffer beim Start aus dem Log-Ende geladen wird und nur
+    dann antwortet, wenn er alle passenden Eintraege sicher enthaelt.
+    """
+    log_file = tmp_path / "log.json"
+    log_file.write_text("".join(json.dumps({"event": "status_update" if i % 10 else "relay_turned_on",
+                                            "timestamp": 1000.0 + i}) + "\n" for i in range(100)))
+    logger = LoggingService(str(log_file), {"recent_size": 5, "recent_seed_lines": 50,
+                                            "rotation": "none", "telemetry": False, "rollups": False})
+    logger.log({"event": "status_update"})
+    logger.flush()
+
+    recent = logger.recent_entries("status_update", limit=3)
+    assert len(recent) == 3 and recent[1]["timestamp"] == 1099.0
+    # Nur 5 relay_turned_on liegen im geladenen Bereich (ab 1050): 3 neueste sind sicher
+    assert [e["timestamp"] for e in logger.recent_entries("relay_turned_on", limit=3)] == [1090.0, 1080.0, 1070.0]
+    # Mehr als der Puffer haelt oder aelter als der geladene Bereich: zurueck auf die Platte
+    assert logger.recent_entries("relay_turned_on", limit=10) is None
+    assert logger.recent_entries("status_update", start_time=1000.0) is None
+    assert [e["timestamp"] for e in logger.recent_entries("relay_turned_on", start_time=1060.0)] == [1090.0, 1080.0, 1070.0, 1060.0]
+    logger.close()
+
+def test_recent_entries_without_reparsing(temp_log_file):
+    """
+    Testet, dass der Ringpuffer den Eintrag ohne erneutes json.loads uebernimmt und
+    Aufrufer weder ueber das Original noch ueber das Ergebnis den Puffer veraendern.
+    """
+    from unittest.mock import patch
+    logger = LoggingService(temp_log_file, {"rotation": "none", "telemetry": False, "rollups": False})
+    entry = {"event": "test_event", "value": 1}
+    with patch("services.logging_service.json.loads", side_effect=AssertionError("json.loads")):
+        logger.log(entry)
+        logger.flush()
+    entry["value"] = 2
+    recent = logger.recent_entries("test_event", limit=1)
+    assert recent[0]["value"] == 1
+    recent[0]["value"] = 3
+    assert logger.recent_entries("test_event", limit=1)[0]["value"] == 1
+    logger.close()
+
+def test_write_version_changes_with_writes(temp_log_file):
+    logger = LoggingService(temp_log_file)
+    before, _ = logger.get_write_version()
+    assert logger.get_write_version()[0] == before
+    logger.log({"event": "test_event"})
+    logger.flush()
+    assert logger.get_write_version()[0] != before
+    logger.close()
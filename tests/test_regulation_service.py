@@ -19,6 +19,8 @@ def mock_station_service():
     mock_station.temperature = 10.0
     mock_station.humidity = 80.0
     station_service.fetch_stations.return_value = [mock_station]
+    station_service.get_station.side_effect = lambda station_id: next(
+        (s for s in station_service.fetch_stations.return_value if s.station_id == station_id), None)
     return station_service
 
 @pytest.fixture
@@ -0,0 +1,58 @@
+import pytest
+from services.rollup_store import RollupStore
+from services.telemetry_store import FLOAT_FIELDS, STATE_CODES
+
+BASE = 1740823200.0  # volle Stunde
+
+def _values(difference):
+    values = [20.0] * len(FLOAT_FIELDS)
+    values[FLOAT_FIELDS.index("difference")] = difference
+    return values
+
+@pytest.fixture
+def store(tmp_path):
+    store = RollupStore(str(tmp_path / "log.json"), tiers=[[60, 0], [600, 0], [3600, 0]])
+    yield store
+    store.close()
+
+def test_bucket_statistics(store):
+    """
+    Testet min/max/mean/last und die Relais-Laufzeit eines abgeschlossenen 1-min-Fensters.
+    """
+    for i in range(60):
+        state = STATE_CODES["relay_on"] if i < 30 else STATE_CODES["idle"]
+        store.add(BASE + i, _values(float(i)), state)
+    # Erste Messung der naechsten Minute schliesst das Fenster
+    store.add(BASE + 60, _values(0.0), STATE_CODES["idle"])
+
+    buckets = store.tiers[0].read_range()
+    assert len(buckets) == 1
+    diff = buckets[0]["difference"]
+    assert (diff["min"], diff["max"], diff["mean"], diff["last"]) == (0.0, 59.0, 29.5, 59.0)
+    assert buckets[0]["count"] == 60
+    assert buckets[0]["relay_on_seconds"] == 30.0
+
+def test_missing_values_ignored(store):
+    store.add(BASE, _values(float("nan")), 0)
+    store.add(BASE + 60, _values(1.0), 0)
+    assert store.tiers[0].read_range()[0]["difference"]["mean"] is None
+
+def test_query_picks_coarsest_tier(store):
+    """
+    Testet die Auswahl der Stufe und das angebrochene Fenster im Ergebnis.
+    """
+    for i in range(0, 7200, 10):
+        store.add(BASE + i, _values(1.0), STATE_CODES["idle"])
+
+    day = store.query(BASE, BASE + 86400, max_points=100)
+    assert day["resolution"] == 3600
+    assert [b["start"] for b in day["buckets"]] == [BASE, BASE + 3600]
+    assert day["buckets"][-1]["partial"] is True
+
+    fine = store.query(BASE, BASE + 7200, resolution=300)
+    assert fine["resolution"] == 60
+    assert len(fine["buckets"]) == 120
+
+def test_query_skips_expired_tier(tmp_path):
+    store = RollupStore(str(tmp_path / "log.json"), tiers=[[60, 1], [3600, 0]])
+    assert store.pick_tier(0, 3600, resolution=60).resolution == 3600
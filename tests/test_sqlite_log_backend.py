@@ -0,0 +1,79 @@
+import pytest
+import json
+from datetime import datetime, timezone
+from unittest.mock import MagicMock
+from services.sqlite_log_backend import SqliteLogStore, import_log_file
+from services.logging_service import LoggingService
+from services.log_reader_service import LogReaderService
+
+BASE = 1740823200.0  # 2025-03-01T10:00Z
+
+def _iso(ts):
+    return datetime.fromtimestamp(ts, tz=timezone.utc).isoformat()
+
+def _rows(events, start=BASE):
+    rows = []
+    for i, event in enumerate(events):
+        ts = start + i * 60
+        rows.append((ts, event, json.dumps({"event": event, "timestamp": ts})))
+    return rows
+
+@pytest.fixture
+def store(tmp_path):
+    store = SqliteLogStore(str(tmp_path / "log.db"))
+    store.insert_many(_rows(["status_update", "relay_turned_on", "status_update", "relay_turned_off"]))
+    yield store
+    store.close()
+
+def test_query_newest_first(store):
+    logs = store.query(limit=2)
+    assert [e["timestamp"] for e in logs] == [BASE + 180, BASE + 120]
+
+def test_query_filters(store):
+    assert [e["timestamp"] for e in store.query(event_filter="status_update")] == [BASE + 120, BASE]
+    assert [e["timestamp"] for e in store.query(BASE + 60, BASE + 120)] == [BASE + 120, BASE + 60]
+
+def test_event_counts(store):
+    assert store.event_counts() == {"status_update": 2, "relay_turned_on": 1, "relay_turned_off": 1}
+
+def test_logging_service_writes_to_sqlite(tmp_path):
+    """
+    Testet, dass mit backend "sqlite" keine JSON-Datei entsteht und der Reader die Datenbank abfragt.
+    """
+    log_file = str(tmp_path / "log.json")
+    logger = LoggingService(log_file, {"backend": "sqlite", "telemetry": False, "rollups": False})
+    logger.log({"event": "relay_turned_on"})
+    logger.log({"event": "status_update", "status": {}})
+    logger.close()
+    assert not (tmp_path / "log.json").exists()
+    assert logger.get_stats()["written"] == 2
+
+    parameter_service = MagicMock()
+    parameter_service.get_config.return_value = {"logging": {"log_file": log_file, "backend": "sqlite"}}
+    reader = LogReaderService(parameter_service)
+    logs = reader.get_filtered_logs(event_filter="relay_turned_on")
+    assert len(logs) == 1
+    assert reader.get_event_counts() == {"relay_turned_on": 1, "status_update": 1}
+
+def test_import_is_idempotent(tmp_path):
+    """
+    Testet, dass ein zweiter Import keine Duplikate erzeugt und neuere Eintraege nicht doppelt kommen.
+    """
+    log_file = tmp_path / "log.json"
+    log_file.write_text("\n".join(row[2] for row in _rows(["status_update"] * 5)) + "\n")
+    db = str(tmp_path / "log.db")
+    assert import_log_file(str(log_file), db) == 5
+    assert import_log_file(str(log_file), db) == 0
+    assert len(SqliteLogStore(db).query(limit=100)) == 5
+
+def test_enforce_budget_deletes_oldest(tmp_path):
+    store = SqliteLogStore(str(tmp_path / "log.db"))
+    store.insert_many(_rows(["status_update"] * 2000))
+    store.enforce_budget(64 * 1024)
+    remaining = store.query(limit=5000)
+    store.close()
+    assert 0 < len(remaining) < 2000
+    assert remaining[0]["timestamp"] == BASE + 1999 * 60
+
+def test_iter_range_oldest_first(store):
+    assert [e["timestamp"] for e in store.iter_range(BASE + 60, chunk_size=1)] == [BASE + 60, BASE + 120, BASE + 180]
@@ -1,7 +1,7 @@
 import pytest
 import time
 from unittest.mock import patch, MagicMock
-from station_service import StationService
+from services.station_service import StationService
 
 class MockConfig:
     CACHE_EXPIRATION_SECONDS = 60
@@ -20,14 +20,18 @@ def station_service_instance():
         config=MockConfig
     )
 
-@patch("station_service.requests.get")
+@patch("services.station_service.requests.Session.get")
 def test_fetch_stations_cache(mock_get, station_service_instance):
     """
     Testet, ob der Cache greift, wenn bereits Daten vorhanden sind 
     und die Cache-Zeit noch nicht abgelaufen ist.
     """
-    # Zuerst: Mock-Daten zurueckgeben (1. Abruf)
-    mock_get.return_value = MagicMock(status_code=200, json=lambda: {"features": [{"id": "ABC", "properties": {"value": 55.0}}]})
+    # Zuerst: Mock-Daten zurueckgeben (1. Abruf), Temperatur nur fuer eine andere Station
+    def side_effect_first(url, timeout=5, headers=None):
+        if "temperature" in url:
+            return MagicMock(status_code=200, json=lambda: {"features": [{"id": "XYZ", "properties": {"value": 22.5}}]})
+        return MagicMock(status_code=200, json=lambda: {"features": [{"id": "ABC", "properties": {"value": 55.0}}]})
+    mock_get.side_effect = side_effect_first
     
     # Erster Aufruf: Fuehrt tatsaechlich einen Request aus
     stations_first = station_service_instance.fetch_stations()
@@ -44,7 +48,7 @@ def test_fetch_stations_cache(mock_get, station_service_instance):
     # Zeit vergeht, um Cache ablaufen zu lassen
     time.sleep(1)
     # Mock-Daten fuer Temperatur, damit es diesmal eine Kombination gibt
-    def side_effect(url, timeout=5):
+    def side_effect(url, timeout=5, headers=None):
         if "temperature" in url:
             return MagicMock(status_code=200, json=lambda: {"features": [{"id": "ABC", "properties": {"value": 22.5}}]})
         else:
@@ -61,14 +65,14 @@ def test_fetch_stations_cache(mock_get, station_service_instance):
     # Jetzt wurden 2 weitere Requests fuer Feuchte und Temperatur abgesetzt
     assert mock_get.call_count == 4
 
-@patch("station_service.requests.get")
+@patch("services.station_service.requests.Session.get")
 def test_fetch_stations_error_handling(mock_get, station_service_instance):
     """
     Testet, ob StationService bei Fehlern im Request
     die aktuellen Cachdaten (falls vorhanden) beibehalt.
     """
     # Legen wir einen initialen 'gueltigen' Cache an
-    def side_effect_first(url, timeout=5):
+    def side_effect_first(url, timeout=5, headers=None):
         if "humidity" in url:
             return MagicMock(status_code=200, json=lambda: {"features": [{"id": "XYZ", "properties": {"value": 50.0}}]})
         else:
@@ -79,7 +83,7 @@ def test_fetch_stations_error_handling(mock_get, station_service_instance):
     assert len(initial_stations) == 1
 
     # Nun Fehler simulieren (z.B. 404)
-    def side_effect_error(url, timeout=5):
+    def side_effect_error(url, timeout=5, headers=None):
         response_mock = MagicMock()
         response_mock.raise_for_status.side_effect = Exception("404 Not Found")
         return response_mock
@@ -91,14 +95,14 @@ def test_fetch_stations_error_handling(mock_get, station_service_instance):
     stations_after_error = station_service_instance.fetch_stations()
     assert len(stations_after_error) == 1, "Sollte immer noch 1 Station aus dem alten Cache sein"
 
-@patch("station_service.requests.get")
+@patch("services.station_service.requests.Session.get")
 def test_combine_data_no_match(mock_get, station_service_instance):
     """
     Testet den Fall, dass Temperatur- und Feuchte-Listen keine 
     uebereinstimmenden Station-IDs haben.
     """
     # Feuchte-Liste hat ID 'ABC', Temperatur-Liste ID 'XYZ'
-    def side_effect(url, timeout=5):
+    def side_effect(url, timeout=5, headers=None):
         if "humidity" in url:
             return MagicMock(status_code=200, json=lambda: {"features": [{"id": "ABC", "properties": {"value": 60.0}}]})
         else:
@@ -109,3 +113,250 @@ def test_combine_data_no_match(mock_get, station_service_instance):
     stations = station_service_instance.fetch_stations()
     # Keine einzige gemeinsame ID => Komplette Ergebnisliste leer
     assert len(stations) == 0
+
+@patch("services.station_service.requests.Session.get")
+def test_feeds_fetched_concurrently(mock_get, station_service_instance):
+    """
+    Testet, dass beide Feeds gleichzeitig abgerufen werden und die Dauer pro Abruf erfasst wird.
+    """
+    import threading
+    both_started = threading.Barrier(2, timeout=2)
+    def side_effect(url, timeout=5, headers=None):
+        # Wartet, bis auch der andere Abruf laeuft; bei sequentiellem Abruf laeuft die Barriere ab
+        both_started.wait()
+        return MagicMock(status_code=200, json=lambda: {"features": [{"id": "ABC", "properties": {"value": 50.0}}]})
+    mock_get.side_effect = side_effect
+
+    stations = station_service_instance.fetch_stations()
+    assert [s.station_id for s in stations] == ["ABC"]
+    fetches = station_service_instance.get_stats()["fetches"]
+    assert set(fetches) == {MockConfig.HUMIDITY_URL, MockConfig.TEMPERATURE_URL}
+    assert all(f["ok"] and f["seconds"] >= 0 for f in fetches.values())
+
+@patch("services.station_service.requests.Session.get")
+def test_conditional_get_not_modified(mock_get, station_service_instance):
+    """
+    Testet, dass ETag/Last-Modified mitgeschickt werden und ein 304 nur die
+    Cache-Gueltigkeit verlaengert, ohne erneut zu parsen.
+    """
+    def full_response(url, timeout=5, headers=None):
+        value = 20.0 if "temperature" in url else 50.0
+        response = MagicMock(status_code=200, headers={"ETag": f'"{url}-1"', "Last-Modified": "Sat, 01 Mar 2025 10:00:00 GMT"})
+        response.json.return_value = {"features": [{"id": "ABC", "properties": {"value": value}}]}
+        return response
+    mock_get.side_effect = full_response
+    first = station_service_instance.fetch_stations()
+    version = station_service_instance.get_cache_version()
+
+    sent_headers = []
+    def not_modified(url, timeout=5, headers=None):
+        sent_headers.append(headers)
+        response = MagicMock(status_code=304)
+        response.json.side_effect = AssertionError("304 darf nicht geparst werden")
+        return response
+    mock_get.side_effect = not_modified
+    station_service_instance.last_fetch_time -= 999
+    second = station_service_instance.fetch_stations()
+
+    assert second is first
+    assert time.time() - station_service_instance.last_fetch_time < 5, "Cache-Gueltigkeit sollte verlaengert sein"
+    assert station_service_instance.get_cache_version() == version
+    assert {h["If-None-Match"] for h in sent_headers} == {f'"{MockConfig.HUMIDITY_URL}-1"', f'"{MockConfig.TEMPERATURE_URL}-1"'}
+    assert all(h["If-Modified-Since"] == "Sat, 01 Mar 2025 10:00:00 GMT" for h in sent_headers)
+    assert station_service_instance.get_stats()["conditional"] == {"hits": 2, "misses": 2}
+
+@patch("services.station_service.requests.Session.get")
+def test_not_modified_after_partial_failure_recombines(mock_get, tmp_path):
+    """
+    Testet, dass ein 304 auf beide Feeds nach einem Abruf, bei dem nur die Feuchte neu
+    war und die Temperatur fehlschlug, die neuen Feuchtewerte noch kombiniert und speichert.
+    """
+    import json
+    import requests
+
+    class CachedConfig(MockConfig):
+        STATION_CACHE_FILE = str(tmp_path / "station_cache.json")
+    service = StationService(logging_service=MagicMock(), config=CachedConfig)
+
+    def responses(humidity, temperature_status):
+        def side_effect(url, timeout=5, headers=None):
+            if "temperature" in url:
+                response = MagicMock(status_code=temperature_status, headers={"ETag": '"t1"'})
+                if temperature_status >= 500:
+                    response.raise_for_status.side_effect = requests.HTTPError("503")
+                response.json.return_value = {"features": [{"id": "ABC", "properties": {"value": 20.0}}]}
+                return response
+            if humidity is None:
+                return MagicMock(status_code=304)
+            response = MagicMock(status_code=200, headers={"ETag": f'"h{humidity}"'})
+            response.json.return_value = {"features": [{"id": "ABC", "properties": {"value": humidity}}]}
+            return response
+        return side_effect
+
+    mock_get.side_effect = responses(50.0, 200)
+    assert service.refresh()
+    mock_get.side_effect = responses(60.0, 503)
+    assert not service.refresh()
+    assert service.get_station("ABC").humidity == 50.0
+    mock_get.side_effect = responses(None, 304)
+    assert service.refresh()
+
+    assert service.get_station("ABC").humidity == 60.0
+    with open(CachedConfig.STATION_CACHE_FILE) as f:
+        assert json.load(f)["stations"][0]["humidity"] == 60.0
+
+@patch("services.station_service.requests.Session.get")
+def test_station_index_lookup(mock_get, station_service_instance):
+    """
+    Testet den Hash-Join und den unveraenderlichen ID-Index.
+    """
+    def side_effect(url, timeout=5, headers=None):
+        if "temperature" in url:
+            features = [{"id": sid, "properties": {"value": 10.0 + i}} for i, sid in enumerate(["C", "B", "A"])]
+        else:
+            features = [{"id": sid, "properties": {"value": 50.0, "station_name": f"Station {sid}"}} for sid in ["A", "B", "D"]]
+        return MagicMock(status_code=200, json=lambda: {"features": features})
+    mock_get.side_effect = side_effect
+
+    stations = station_service_instance.fetch_stations()
+    assert [s.station_id for s in stations] == ["A", "B"]
+    assert station_service_instance.get_station("A").temperature == 12.0
+    assert station_service_instance.get_station("B").name == "Station B"
+    assert station_service_instance.get_station("D") is None
+    assert mock_get.call_count == 2
+    with pytest.raises(TypeError):
+        station_service_instance.stations_by_id["X"] = None
+
+def test_next_refresh_aligned_to_publication(station_service_instance):
+    """
+    Testet die Ausrichtung der Hintergrund-Abrufe auf das MeteoSwiss-Raster.
+    """
+    service = station_service_instance
+    service.REFRESH_JITTER = 0
+    base = 1740823200  # Rasterzeitpunkt (volle 10 Minuten)
+    assert service._next_refresh(base + 30, 600) == base + 120
+    assert service._next_refresh(base + 200, 600) == base + 720
+    # 15 Minuten werden auf 20 aufgerundet
+    assert service._next_refresh(base + 200, 900) % 1200 == 120
+    assert service._next_refresh(base + 200, 60) == base + 260
+
+@patch("services.station_service.requests.Session.get")
+def test_refresher_never_blocks_callers(mock_get, station_service_instance):
+    """
+    Testet, dass fetch_stations bei laufender Hintergrund-Aktualisierung sofort den
+    letzten Stand liefert, auch waehrend ein Abruf haengt.
+    """
+    import threading
+    release = threading.Event()
+    def side_effect(url, timeout=5, headers=None):
+        release.wait(2)
+        return MagicMock(status_code=200, json=lambda: {"features": [{"id": "ABC", "properties": {"value": 50.0}}]})
+    mock_get.side_effect = side_effect
+    parameter_service = MagicMock()
+    parameter_service.get_config.return_value = {"regulation": {"api_poll_interval": 600}}
+
+    service = station_service_instance
+    service.start_refresher(parameter_service)
+    try:
+        started = time.time()
+        assert service.fetch_stations() == []
+        assert service.get_station("ABC") is None
+        assert time.time() - started < 0.5, "Darf nicht auf den Abruf warten"
+
+        release.set()
+        deadline = time.time() + 2
+        while service.get_station("ABC") is None and time.time() < deadline:
+            time.sleep(0.01)
+        assert service.get_station("ABC").humidity == 50.0
+        assert service.next_refresh > time.time()
+    finally:
+        service.close()
+
+@patch("services.station_service.requests.Session.get")
+def test_persistent_cache_warm_start(mock_get, tmp_path):
+    """
+    Testet, dass der letzte Stand gespeichert und beim Start je nach Alter als
+    gueltig oder veraltet geladen wird.
+    """
+    import json
+
+    class CacheConfig(MockConfig):
+        STATION_CACHE_FILE = str(tmp_path / "station_cache.json")
+
+    def side_effect(url, timeout=5, headers=None):
+        value = 20.0 if "temperature" in url else 50.0
+        return MagicMock(status_code=200, json=lambda: {"features": [{"id": "ABC", "properties": {"value": value, "station_name": "Aarau"}}]})
+    mock_get.side_effect = side_effect
+    logging_service = MagicMock()
+
+    first = StationService(logging_service, CacheConfig)
+    assert first.get_cache_state() == "empty"
+    first.fetch_stations()
+    assert mock_get.call_count == 2
+    assert not (tmp_path / "station_cache.json.tmp").exists()
+
+    # Neustart: gueltiger Stand ohne Netzzugriff
+    warm = StationService(logging_service, CacheConfig)
+    assert warm.get_cache_state() == "valid"
+    station = warm.get_station("ABC")
+    assert (station.name, station.humidity, station.temperature) == ("Aarau", 50.0, 20.0)
+    assert mock_get.call_count == 2
+
+    # Veralteter Stand wird geliefert, wenn das Netz nicht erreichbar ist
+    data = json.loads((tmp_path / "station_cache.json").read_text())
+    data["fetch_time"] -= 3600
+    (tmp_path / "station_cache.json").write_text(json.dumps(data))
+    mock_get.side_effect = Exception("offline")
+    stale = StationService(logging_service, CacheConfig)
+    assert stale.get_cache_state() == "stale"
+    assert stale.get_station("ABC").humidity == 50.0
+
+    # Auch ein tagealter Stand wird (als veraltet, mit Alter) geliefert
+    data["fetch_time"] -= 3 * 86400
+    (tmp_path / "station_cache.json").write_text(json.dumps(data))
+    old = StationService(logging_service, CacheConfig)
+    assert old.get_cache_state() == "stale"
+    assert old.get_station("ABC").humidity == 50.0
+    assert old.get_stats()["cache_age"] > 3 * 86400
+
+    # Nur mit konfiguriertem Hoechstalter wird er verworfen
+    class MaxAgeConfig(CacheConfig):
+        STATION_CACHE_MAX_AGE = 86400
+    assert StationService(logging_service, MaxAgeConfig).get_cache_state() == "empty"
+
+@patch("services.station_service.requests.Session.get")
+def test_selective_streaming_parse(mock_get, station_service_instance):
+    """
+    Testet das gestreamte Parsen: Stuecke werden einzeln dekodiert und nur die
+    konfigurierte Station behaelt ihre Koordinaten.
+    """
+    import json
+
+    def feed(value):
+        return json.dumps({
+            "type": "FeatureCollection",
+            "crs": {"type": "name", "properties": {"name": "EPSG:2056"}},
+            "features": [{"type": "Feature", "id": sid, "geometry": {"type": "Point", "coordinates": [1, i]},
+                          "properties": {"station_name": f"Station {sid}", "value": value, "unit": "x"}}
+                         for i, sid in enumerate(["ABC", "ARO", "ZUE"])],
+        }).encode()
+
+    def side_effect(url, timeout=5, headers=None, stream=False):
+        assert stream, "Im Modus selective muss gestreamt werden"
+        data = feed(20.0 if "temperature" in url else 55.0)
+        response = MagicMock(status_code=200, headers={})
+        response.iter_content.side_effect = lambda chunk_size: iter([data[i:i + 10] for i in range(0, len(data), 10)])
+        response.json.side_effect = AssertionError("Antwort darf nicht komplett geparst werden")
+        return response
+    mock_get.side_effect = side_effect
+
+    service = station_service_instance
+    service.parse_mode = "selective"
+    service.parameter_service = MagicMock()
+    service.parameter_service.get_config.return_value = {"api_station_id": "ARO"}
+
+    stations = service.fetch_stations()
+    assert [s.station_id for s in stations] == ["ABC", "ARO", "ZUE"]
+    aro = service.get_station("ARO")
+    assert (aro.name, aro.humidity, aro.temperature, aro.coordinates) == ("Station ARO", 55.0, 20.0, [1, 1])
+    assert service.get_station("ABC").coordinates is None
@@ -0,0 +1,85 @@
+import pytest
+import json
+import gzip
+from services.telemetry_store import TelemetryStore, pack_status, unpack_entry, convert
+
+STATUS = {
+    "local_temperature": 24.67, "local_humidity": 32.42, "inside_absolute_humidity": 7.33,
+    "api_station": "ARO", "api_temperature": -2.7, "api_humidity": 69.6,
+    "outside_absolute_humidity": 2.8, "difference": 4.53, "regulation_state": "relay_on",
+}
+
+@pytest.fixture
+def store(tmp_path):
+    store = TelemetryStore(str(tmp_path / "log.telemetry.bin"))
+    store.append([pack_status(1000.0 + i, dict(STATUS, difference=float(i))) for i in range(10)])
+    store.close()
+    return store
+
+def test_pack_roundtrip():
+    """
+    Testet, dass ein Datensatz wieder denselben Log-Eintrag ergibt.
+    """
+    entry = unpack_entry(pack_status(1740823009.25, STATUS))
+    assert entry == {"event": "status_update", "status": STATUS, "timestamp": 1740823009.25}
+
+def test_missing_values_are_none():
+    status = dict(STATUS, api_station=None, api_temperature=None, outside_absolute_humidity=None,
+                  difference=None, regulation_state="idle")
+    assert unpack_entry(pack_status(1.0, status))["status"] == status
+
+def test_latest_and_range(store):
+    assert len(store) == 10
+    assert [e["status"]["difference"] for e in store.latest(3)] == [7.0, 8.0, 9.0]
+    assert [e["timestamp"] for e in store.read_range(1002.0, 1004.0)] == [1002.0, 1003.0, 1004.0]
+    assert store.read_range(2000.0) == []
+
+def test_trim_keeps_newest(store):
+    store.trim(4)
+    assert [e["timestamp"] for e in store.latest(100)] == [1006.0, 1007.0, 1008.0, 1009.0]
+
+def test_convert_existing_logs(tmp_path):
+    """
+    Testet den Konverter fuer bestehende (auch komprimierte) Logdateien.
+    """
+    old = tmp_path / "log-20250301T0000Z.json.gz"
+    with gzip.open(old, "wt") as f:
+        f.write(json.dumps({"event": "status_update", "status": STATUS, "timestamp": 1.0}) + "\n")
+        f.write(json.dumps({"event": "relay_turned_on", "message": "x", "timestamp": 2.0}) + "\n")
+    current = tmp_path / "log.json"
+    with open(current, "w") as f:
+        f.write(json.dumps({"event": "status_update", "status": STATUS, "timestamp": 3.0}) + "\n")
+        f.write("kaputt\n")
+
+    target = str(tmp_path / "out.bin")
+    assert convert([str(old), str(current)], target) == 2
+    assert [e["timestamp"] for e in TelemetryStore(target).latest(10)] == [1.0, 3.0]
+
+def test_convert_into_live_store(store, tmp_path):
+    """
+    Testet, dass die Konvertierung in einen Speicher mit laufenden Datensaetzen nur die
+    aelteren Eintraege davor einfuegt und die Reihenfolge aufsteigend bleibt.
+    """
+    log_file = tmp_path / "log.json"
+    with open(log_file, "w") as f:
+        for ts in (990.0, 991.0, 995.0, 993.0, 999.0, 1000.0, 1005.0):
+            f.write(json.dumps({"event": "status_update", "status": STATUS, "timestamp": ts}) + "\n")
+
+    assert convert([str(log_file)], store.path) == 4
+    timestamps = [e["timestamp"] for e in store.latest(100)]
+    assert timestamps == [990.0, 991.0, 995.0, 999.0] + [1000.0 + i for i in range(10)]
+    assert [e["timestamp"] for e in store.read_range(995.0, 1001.0)] == [995.0, 999.0, 1000.0, 1001.0]
+    # Erneut konvertieren fuegt nichts doppelt ein
+    assert convert([str(log_file)], store.path) == 0
+    assert len(store) == 14
+
+def test_logging_service_feeds_store(tmp_path):
+    from services.logging_service import LoggingService
+    log_file = str(tmp_path / "log.json")
+    logger = LoggingService(log_file)
+    logger.log({"event": "status_update", "status": dict(STATUS)})
+    logger.log({"event": "relay_turned_on", "message": "Relay turned on"})
+    logger.close()
+    entries = TelemetryStore(TelemetryStore.path_for(log_file)).latest(10)
+    assert len(entries) == 1
+    assert entries[0]["status"] == STATUS